@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks
+    ~~~~~~~~~~
+    Micro-benchmarks for the hot paths of the backend. Each module can be
+    run on its own, e.g. ``python -m benchmarks.bench_auth``.
+
+    Functions:
+
+        measure(fn, repeat) -> dict
+        report(title, rows)
+
+"""
+import os
+import time
+import statistics
+
+os.environ.setdefault("APP_SETTINGS", "src.config.TestingConfig")
+
+
+def measure(fn, repeat: int = 100) -> dict:
+    """Calls ``fn`` ``repeat`` times and returns timing stats in ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean": statistics.mean(samples),
+        "p50": statistics.median(samples),
+        "max": max(samples),
+        "total": sum(samples)
+    }
+
+
+def report(title: str, rows: dict):
+    """Prints a table of ``{label: measure(...)}`` rows"""
+    print(f"\n{title}")
+    print(f"{'':<32}{'mean ms':>12}{'p50 ms':>12}{'max ms':>12}")
+    for label, stats in rows.items():
+        print(f"{label:<32}{stats['mean']:>12.3f}"
+              f"{stats['p50']:>12.3f}{stats['max']:>12.3f}")
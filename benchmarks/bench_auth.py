@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_auth
+    ~~~~~~~~~~~~~~~~~~~~~
+    Latency of an authenticated request with and without the JWKS cache
+    and the verified token cache.
+
+    The JWKS stand-in adds a fixed delay to every fetch to stand in for the
+    TLS round trip to ``login.microsoftonline.com``.
+
+"""
+import logging
+from benchmarks import measure, report
+from tests.standins import SigningKey, jwks_standin
+
+TENANT_ID = "00000000-0000-0000-0000-000000000000"
+AUDIENCE = "api://knighthacks-backend"
+
+
+def main(repeat: int = 50, delay: float = 0.05):
+    from src import app
+    app.logger.setLevel(logging.WARNING)
+
+    key = SigningKey("key-1")
+    token = key.sign(TENANT_ID, AUDIENCE, roles=["Hacker_Read"])
+    headers = [("Authorization", f"Bearer {token}")]
+
+    rows = {}
+    with jwks_standin(key, delay=delay) as server:
+        app.config.update(
+            TESTING=False,
+            AZURE_TENANT_ID=TENANT_ID,
+            AZURE_API_AUDIENCE=AUDIENCE,
+            AZURE_JWKS_URL=server.url + "/discovery/v2.0/keys"
+        )
+        client = app.test_client()
+
+        for label, ttl, cache_size in (
+                ("fetch per request (ttl=0)", 0, 0),
+                ("cached key store", 3600, 0),
+                ("cached key + verified token", 3600, 1024)):
+            app.extensions.pop("jwks", None)
+            app.extensions.pop("verified_tokens", None)
+            app.config["AZURE_JWKS_CACHE_SECONDS"] = ttl
+            app.config["AZURE_TOKEN_CACHE_SIZE"] = cache_size
+
+            def call():
+                res = client.get("/api/auth/me", headers=headers)
+                assert res.status_code == 200, res.data
+
+            rows[label] = measure(call, repeat)
+            rows[label]["fetches"] = server.hits.pop(
+                "/discovery/v2.0/keys", 0)
+
+    report(f"GET /api/auth/me, JWKS delay {delay * 1000:.0f}ms", rows)
+    for label, stats in rows.items():
+        print(f"{label:<32}{stats['fetches']:>12} JWKS fetches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_club_events
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    Response size and latency of ``GET /api/club/get_events/`` with the
+    thumbnails inlined as base64 versus returned as URLs, for a growing
+    number of events that each have their own image and presenter image.
+    Each is measured building the events on every request (before the
+    first refresh) and served from the ClubEventSnapshot, checking for a
+    newer one on every request or only every 10 seconds.
+
+    Events from before renditions read two GridFS files each to inline
+    their thumbnails; GridFS doesn't run under mongomock, so that path
+    isn't measured here.
+
+"""
+from datetime import datetime
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+from benchmarks import measure
+from tests.standins import png_image
+
+
+def main(counts=(50, 200, 1000), repeat: int = 10):
+    from src import app
+    from src.models.club_event import (
+        ClubEvent,
+        ClubEventSnapshot,
+        ImageRendition
+    )
+    from src.common.images import image_id, make_renditions
+    from src.common.club_event_snapshot import build_snapshot
+
+    disconnect_all()
+    connect("bench", host="mongomock://localhost")
+
+    sizes = {"thumbnail": app.config["CLUB_EVENT_IMAGE_SIZES"]["thumbnail"]}
+    formats = app.config["CLUB_EVENT_IMAGE_FORMATS"]
+    client = app.test_client()
+
+    print("\nGET /api/club/get_events/")
+    print(f"{'':<32}{'bytes':>12}{'mean ms':>12}{'p50 ms':>12}")
+    for n in counts:
+        ClubEvent.drop_collection()
+        ImageRendition.drop_collection()
+        ClubEventSnapshot.drop_collection()
+        for i in range(n):
+            ids = []
+            for color in ((i % 256, i // 256, 0), (i % 256, i // 256, 255)):
+                data = png_image((200, 100), color)
+                ids.append(image_id(data))
+                for r in make_renditions(data, sizes, formats):
+                    ImageRendition.createOne(image_id=ids[-1], **r)
+            ClubEvent.createOne(start=datetime.now(), end=datetime.now(),
+                                name=f"Event {i}", image_id=ids[0],
+                                presenter={"name": "Foo Bar",
+                                           "image_id": ids[1]})
+
+        for source, cache in (("live", 0), ("snapshot", 0),
+                              ("snapshot, cached", 10)):
+            if source != "live":
+                with app.app_context():
+                    build_snapshot()
+            app.config["CLUB_EVENTS_SNAPSHOT_CACHE_SECONDS"] = cache
+            for images in ("inline", "url"):
+                url = f"/api/club/get_events/?confirmed=false&images={images}"
+                size = len(client.get(url).data)
+                stats = measure(lambda: client.get(url), repeat)
+                label = f"{n} {source}, {images}"
+                print(f"{label:<32}{size:>12}{stats['mean']:>12.1f}"
+                      f"{stats['p50']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
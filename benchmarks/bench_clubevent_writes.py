@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_clubevent_writes
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    Time ``sync_clubevents`` spends writing events, without images: every
+    page created, then every page edited, for batches of 100 pages.
+
+    mongomock has no network round trip, so against a real Mongo every
+    write saved here is worth one more round trip on top.
+
+"""
+import time
+from unittest import mock
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+from tests.standins import notion_page
+
+
+def main(counts=(100, 1000), batch_size: int = 100):
+    from src import app
+    from src.models.club_event import ClubEvent
+    from src.tasks.clubevent_tasks import sync_clubevents
+
+    disconnect_all()
+    connect("bench", host="mongomock://localhost")
+
+    def batches(pages):
+        return [pages[i:i + batch_size]
+                for i in range(0, len(pages), batch_size)]
+
+    print(f"\nsync_clubevents, batches of {batch_size}")
+    print(f"{'':<32}{'wall s':>12}{'events/s':>12}")
+    with app.app_context(), mock.patch(
+            "src.tasks.clubevent_tasks._download", return_value=None):
+        for n in counts:
+            ClubEvent.drop_collection()
+            ClubEvent.ensure_indexes()
+            for label, edited in (("created", "2021-10-01T12:00:00.000Z"),
+                                  ("updated", "2021-10-02T12:00:00.000Z")):
+                pages = [notion_page(f"page-{i}", edited=edited)
+                         for i in range(n)]
+                start = time.perf_counter()
+                result = sync_clubevents(batches(pages))
+                elapsed = time.perf_counter() - start
+
+                assert result[label] == n
+                row = f"{n} events {label}"
+                print(f"{row:<32}{elapsed:>12.2f}{n / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
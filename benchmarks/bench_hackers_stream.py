@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_hackers_stream
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    Peak Python memory of ``GET /api/hackers/get_all_hackers/`` with and
+    without ``?stream``, measured with tracemalloc while the body is read
+    chunk by chunk like a WSGI server would.
+
+    mongomock keeps the collection in the same process, so the numbers
+    only cover what the request allocates on top of it.
+
+"""
+import logging
+import time
+import tracemalloc
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+from benchmarks.bench_json import make_hackers
+
+URLS = {
+    "buffered": "/api/hackers/get_all_hackers/",
+    "?stream=json": "/api/hackers/get_all_hackers/?stream=json",
+    "?stream=ndjson": "/api/hackers/get_all_hackers/?stream=ndjson"
+}
+
+
+def main(sizes=(1000, 5000)):
+    from src import app
+    from src.models.hacker import Hacker
+    app.logger.setLevel(logging.WARNING)
+    client = app.test_client()
+
+    disconnect_all()
+    connect("bench", host="mongomock://localhost")
+
+    for n in sizes:
+        Hacker.drop_collection()
+        Hacker._get_collection().insert_many(
+            [h.to_mongo() for h in make_hackers(n)])
+
+        print(f"\n{n} hackers")
+        print(f"{'':<32}{'peak MiB':>12}{'time ms':>12}{'body MiB':>12}")
+        for label, url in URLS.items():
+            tracemalloc.start()
+            start = time.perf_counter()
+
+            res = client.get(url, buffered=False)
+            size = sum(len(chunk) for chunk in res.response)
+            res.close()
+
+            elapsed = (time.perf_counter() - start) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{label:<32}{peak / 2 ** 20:>12.1f}{elapsed:>12.0f}"
+                  f"{size / 2 ** 20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_json
+    ~~~~~~~~~~~~~~~~~~~~~
+    Encoding time of the ``get_all_hackers`` payload for synthetic lists of
+    ``Hacker`` documents with the stdlib and orjson encoders.
+
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from benchmarks import measure, report
+
+FIRST_NAMES = ["Ana", "José", "Zoë", "Li", "Sam", "Priya", "Chidi", "Mia"]
+
+
+def make_hackers(n: int) -> list:
+    from src.models.hacker import Hacker
+    rng = random.Random(n)
+    return [
+        Hacker(
+            email=f"hacker{i}@knighthacks.org",
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=f"Hacker{i}",
+            birthday=(datetime(2000, 1, 1) +
+                      timedelta(days=rng.randrange(2000))),
+            country="United States",
+            phone_number="407-555-0100",
+            isaccepted=rng.random() < 0.5,
+            ethnicity="Prefer not to say",
+            pronouns="they/them",
+            edu_info={"college": "University of Central Florida",
+                      "major": "Computer Science",
+                      "graduation_date": "2024-05",
+                      "level_of_study": "Undergraduate"},
+            socials={"github": f"hacker{i}"},
+            why_attend="To learn " * 20,
+            what_learn=["python", "mongo", "react"],
+            in_person=rng.random() < 0.5,
+            mlh={"mlh_code_of_conduct": True,
+                 "mlh_privacy_and_contest_terms": True,
+                 "mlh_send_messages": False}
+        )
+        for i in range(n)
+    ]
+
+
+def main(sizes=(5000, 20000), repeat: int = 5):
+    from bson import ObjectId
+    from src import app
+    from src.common.json import JSONEncoderBase, JSONEncoderFast
+
+    options = dict(separators=(",", ":"), sort_keys=True, ensure_ascii=True)
+
+    for n in sizes:
+        """Unsaved documents, so we time encoding and not the database"""
+        hackers = make_hackers(n)
+        for hacker in hackers:
+            hacker.id = ObjectId()
+        payload = {"hackers": hackers, "status": "success"}
+
+        with app.app_context():
+            rows = {}
+            outputs = {}
+            for label, cls in (("stdlib (JSONEncoderBase)", JSONEncoderBase),
+                               ("orjson (JSONEncoderFast)", JSONEncoderFast)):
+                rows[label] = measure(
+                    lambda: outputs.__setitem__(
+                        label, json.dumps(payload, cls=cls, **options)),
+                    repeat)
+
+            assert len(set(outputs.values())) == 1, "outputs differ"
+            size = len(next(iter(outputs.values()))) / 1024 / 1024
+            report(f"{n} hackers, {size:.1f} MiB of JSON", rows)
+
+
+if __name__ == "__main__":
+    main()
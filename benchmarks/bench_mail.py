@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_mail
+    ~~~~~~~~~~~~~~~~~~~~~
+    Time spent in the request and size of the Celery message body when
+    enqueuing an acceptance email, rendering in the request (the previous
+    ``send_async_email`` path) versus adding it to the outbox, which the
+    worker renders from (``enqueue_emails`` and ``drain_email_outbox``).
+
+    ``apply_async`` is replaced by a stub that serializes the message body
+    like Celery's json serializer, the broker round trip is the same for
+    both paths. The outbox write goes to mongomock, so it has no network
+    round trip.
+
+"""
+from unittest import mock
+from kombu.utils.json import dumps
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+from benchmarks import measure, report
+
+
+def main(repeat: int = 500):
+    from src import app
+    from src.common.outbox import enqueue_emails
+    from src.models.email_outbox import EmailOutbox
+    from src.models.hacker import Hacker
+    from src.tasks.mail_tasks import (
+        drain_email_outbox,
+        render_email,
+        send_async_email
+    )
+
+    disconnect_all()
+    connect("bench", host="mongomock://localhost")
+    Hacker.drop_collection()
+    hacker = Hacker.createOne(
+        email="foobar@email.com", first_name="Foo", last_name="Bar",
+        mlh=dict(mlh_code_of_conduct=True,
+                 mlh_privacy_and_contest_terms=True))
+
+    sizes = {}
+
+    def publish(label):
+        def apply_async(args=(), kwargs=None, **options):
+            sizes[label] = len(dumps([list(args), kwargs or {}, {}]))
+        return apply_async
+
+    app.config.update(TESTING=False, SEND_MAIL=True)
+    with app.test_request_context():
+        def render_in_request():
+            send_async_email.apply_async((), render_email(
+                "hacker_acceptance", hacker,
+                {"deadline": app.config["HACKER_CONFIRM_DEADLINE"]}))
+
+        rows = {}
+        with mock.patch.object(send_async_email, "apply_async",
+                               publish("render in request")):
+            rows["render in request"] = measure(render_in_request, repeat)
+
+        def outbox():
+            EmailOutbox.drop_collection()
+            enqueue_emails("hacker_acceptance", [hacker], {
+                "deadline": app.config["HACKER_CONFIRM_DEADLINE"]
+                .isoformat()})
+            drain_email_outbox.delay()
+
+        with mock.patch.object(drain_email_outbox, "apply_async",
+                               publish("outbox")):
+            rows["outbox"] = measure(outbox, repeat)
+
+    report("Enqueue one acceptance email (request side)", rows)
+    print(f"{'':<32}{'body bytes':>12}")
+    for label, size in sizes.items():
+        print(f"{label:<32}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_notion_refresh
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    Wall time of ``refresh_notion_clubevents`` against a local Notion
+    stand-in whose images each take ``delay`` to serve, downloading them
+    one at a time with a bare ``requests.get`` (the previous behaviour)
+    versus through the pooled session with more and more concurrency.
+
+    Every event has its own image. The first run renders them all, the
+    others find their renditions by content and only download them.
+
+"""
+import logging
+import time
+from unittest import mock
+import requests
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+from tests.standins import (
+    StandinServer,
+    notion_page,
+    notion_standin,
+    png_image
+)
+
+
+def main(n: int = 100, delay: float = 0.02, concurrency=(1, 4, 8, 16)):
+    from src import app
+    from src.models.club_event import ClubEvent, ImageRendition
+    from src.tasks.clubevent_tasks import refresh_notion_clubevents
+    app.logger.setLevel(logging.WARNING)
+
+    disconnect_all()
+    connect("bench", host="mongomock://localhost")
+
+    def bare_get(session, url, timeout, headers=None):
+        return requests.get(url, allow_redirects=True) if url else None
+
+    def image(data):
+        return lambda handler: (200, {"Content-Type": "image/png"}, data)
+
+    with StandinServer(delay=delay) as images:
+        pages = []
+        for i in range(n):
+            color = (i % 256, i // 256, 0)
+            images.routes[("GET", f"/image-{i}")] = image(
+                png_image((600, 400), color))
+            images.routes[("GET", f"/presenter-{i}")] = image(
+                png_image((200, 200), color))
+            pages.append(notion_page(
+                f"page-{i}", image=f"{images.url}/image-{i}",
+                presenter_image=f"{images.url}/presenter-{i}"))
+
+        runs = {"rendering, 8 concurrent": (8, None),
+                "requests.get, one at a time": (1, bare_get)}
+        for size in concurrency:
+            runs[f"session, {size} concurrent"] = (size, None)
+
+        print(f"\nRefresh {n} events, {2 * n} images, "
+              f"{delay * 1000:.0f}ms per image")
+        print(f"{'':<32}{'wall s':>12}{'images/s':>12}")
+        with notion_standin(pages) as notion, app.app_context():
+            app.config.update(NOTION_API_URI=notion.url + "/v1",
+                              NOTION_DB_ID="db")
+            ImageRendition.drop_collection()
+            for label, (size, download) in runs.items():
+                ClubEvent.drop_collection()
+                app.config["NOTION_IMAGE_CONCURRENCY"] = size
+                patch = (mock.patch("src.tasks.clubevent_tasks._download",
+                                    bare_get)
+                         if download else mock.patch.dict({}))
+
+                with patch:
+                    start = time.perf_counter()
+                    refresh_notion_clubevents()
+                    elapsed = time.perf_counter() - start
+
+                assert ClubEvent.objects.count() == n
+                print(f"{label:<32}{elapsed:>12.2f}{2 * n / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
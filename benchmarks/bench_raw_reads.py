@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_raw_reads
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+    Throughput and allocations of reading the ``get_all_hackers`` list as
+    hydrated Documents versus ``BaseDocument.listRaw()``, with and without
+    encoding the response body.
+
+    mongomock's own query cost is part of both paths, against a real
+    server the difference is a larger share of the request.
+
+"""
+import tracemalloc
+from flask import json
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+from benchmarks import measure, report
+from benchmarks.bench_json import make_hackers
+
+
+def main(sizes=(1000, 5000), repeat: int = 5):
+    from src import app
+    from src.models.hacker import Hacker
+
+    disconnect_all()
+    connect("bench", host="mongomock://localhost")
+
+    excludes = Hacker.private_fields
+    paths = {
+        "documents": lambda: list(Hacker.objects().exclude(*excludes)),
+        "listRaw": lambda: Hacker.listRaw(excludes=excludes)
+    }
+
+    for n in sizes:
+        Hacker.drop_collection()
+        Hacker._get_collection().insert_many(
+            [h.to_mongo() for h in make_hackers(n)])
+
+        with app.app_context():
+            rows = {}
+            peaks = {}
+            for label, read in paths.items():
+                rows[f"{label}, read"] = measure(read, repeat)
+                rows[f"{label}, read + encode"] = measure(
+                    lambda: json.dumps({"hackers": read()},
+                                       separators=(",", ":")),
+                    repeat)
+
+                tracemalloc.start()
+                read()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                rate = n / rows[f"{label}, read"]["p50"] * 1000
+                peaks[label] = (peak / 2 ** 20, rate)
+
+        report(f"{n} hackers", rows)
+        print(f"{'':<32}{'peak MiB':>12}{'docs/s':>12}")
+        for label, (peak, rate) in peaks.items():
+            print(f"{label:<32}{peak:>12.1f}{rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_scope
+    ~~~~~~~~~~~~~~~~~~~~~~
+    Cost of the ``requires_scope`` check: the ``Scope`` enum union against
+    the compiled integer bitmask.
+
+"""
+import timeit
+from src.common.scope import Scope
+
+
+def main(number: int = 100000):
+    required = Scope.Hacker_Read
+    required_bits = required.value
+    roles = ["Hacker_Read", "Hacker_Accept", "Email_Send",
+             "ClubEvent_Refresh", "Event_Create"]
+
+    rows = {
+        "Scope(roles) & scope": lambda: required & Scope(roles),
+        "Scope.mask(roles) & int": (
+            lambda: required_bits & Scope.mask(roles)),
+        "scope.names": lambda: required.names
+    }
+
+    print(f"\nrequires_scope check, {len(roles)} roles, {number} calls")
+    print(f"{'':<32}{'us/call':>12}")
+    for label, fn in rows.items():
+        seconds = min(timeit.repeat(fn, number=number, repeat=3))
+        print(f"{label:<32}{seconds / number * 1e6:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
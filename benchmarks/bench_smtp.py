@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_smtp
+    ~~~~~~~~~~~~~~~~~~~~~
+    Messages per second through a local aiosmtpd stand-in when every email
+    opens its own SMTP session versus one session per batch of
+    ``MAIL_BATCH_SIZE`` (``drain_email_outbox``).
+
+    The stand-in delays every EHLO to stand in for the TLS handshake and
+    login of a real SMTP session.
+
+"""
+import logging
+import time
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+from tests.standins import SMTPStandin
+
+
+def main(n: int = 100, delays=(0, 0.03)):
+    from src import app, mail
+    from src.common.outbox import enqueue_emails
+    from src.models.email_outbox import EmailOutbox
+    from src.models.hacker import Hacker
+    from src.tasks.mail_tasks import (
+        _message,
+        _send_messages,
+        drain_email_outbox,
+        render_email
+    )
+    app.logger.setLevel(logging.WARNING)
+
+    disconnect_all()
+    connect("bench", host="mongomock://localhost")
+    Hacker.drop_collection()
+    hackers = [
+        Hacker.createOne(email=f"hacker{i}@knighthacks.org",
+                         first_name="Foo",
+                         mlh=dict(mlh_code_of_conduct=True,
+                                  mlh_privacy_and_contest_terms=True))
+        for i in range(n)
+    ]
+
+    def session_per_email():
+        for hacker in hackers:
+            _send_messages([_message(**render_email(
+                "hacker_confirmation_success", hacker))])
+
+    def drain():
+        EmailOutbox.drop_collection()
+        enqueue_emails("hacker_confirmation_success", hackers)
+        drain_email_outbox()
+
+    paths = {
+        "session per email": session_per_email,
+        "drain_email_outbox": drain
+    }
+
+    for delay in delays:
+        print(f"\n{n} emails, {delay * 1000:.0f}ms session setup")
+        print(f"{'':<32}{'msgs/s':>12}{'sessions':>12}")
+        for label, send in paths.items():
+            with SMTPStandin(delay=delay) as server, app.app_context():
+                app.config.update(
+                    DEBUG=False, TESTING=False, MAIL_SERVER="127.0.0.1",
+                    MAIL_PORT=server.port, MAIL_USE_TLS=False,
+                    MAIL_DEFAULT_SENDER="hackers@knighthacks.org",
+                    MAIL_SUPPRESS_SEND=False)
+                mail.init_app(app)
+
+                start = time.perf_counter()
+                send()
+                elapsed = time.perf_counter() - start
+
+                assert len(server.messages) == n, len(server.messages)
+            print(f"{label:<32}{n / elapsed:>12.0f}{server.sessions:>12}")
+
+
+if __name__ == "__main__":
+    main()
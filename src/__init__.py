@@ -17,17 +17,22 @@
 
 """
 from os import path, getenv, environ
-if not getenv("APP_SETTINGS", "src.config.TestingConfig"):
-    from gevent import monkey
-    monkey.patch_all()
-from flask import (
+from src.common.concurrency import (
+    configured_mode,
+    apply_mode,
+    check_concurrency_mode
+)
+apply_mode(configured_mode())
+import logging  # noqa: E402
+from flask import (  # noqa: E402
     g,
     Flask,
     json,
     before_render_template,
     template_rendered
-)  # noqa: E402
+)
 from werkzeug.exceptions import HTTPException  # noqa: E402
+from werkzeug.utils import import_string  # noqa: E402
 from flasgger import Swagger  # noqa: E402
 from flask_cors import CORS  # noqa: E402
 from flask_mongoengine import MongoEngine  # noqa: E402
@@ -119,10 +124,16 @@ def create_app():
     app_settings = getenv("APP_SETTINGS", "src.config.ProductionConfig")
     app.config.from_object(app_settings)
 
+    """Log startup info in production too"""
+    if not app.logger.level:
+        app.logger.setLevel(logging.INFO)
+
     if (app_settings == "src.config.ProductionConfig"
             and not app.config.get("SEND_MAIL")):
         app.logger.warning("Sending Emails disabled on production!")
 
+    check_concurrency_mode(app)
+
     """Set FLASK_ENV and FLASK_DEBUG cause that doesn't happen auto anymore"""
     if app.config.get("DEBUG"):
         environ["FLASK_ENV"] = "development"  # pragma: nocover
@@ -149,8 +160,7 @@ def create_app():
                       json=json,
                       message_queue=app.config.get("SOCKETIO_MESSAGE_QUEUE"))
 
-    from src.common.json import JSONEncoderBase
-    app.json_encoder = JSONEncoderBase
+    app.json_encoder = import_string(app.config["JSON_ENCODER"])
 
     """Register Blueprints"""
     from src.api.auth import auth_blueprint
@@ -8,14 +8,18 @@
         update_events()
 
 """
-from flask import request, make_response
+from flask import current_app as app, request, url_for
 from src.api import Blueprint
 from werkzeug.exceptions import BadRequest, NotFound
 import dateutil.parser
-from datetime import datetime, timedelta
-from src.models.club_event import ClubEvent
+from datetime import datetime, timedelta, timezone
+from src.models.club_event import ClubEvent, ImageRendition
+from src.common.club_event_snapshot import current_entries
+from src.common.images import parse_size, pick_format, pick_rendition
+from src.common.caching import cached_file, gridfs_validators
+from src.common.locks import acquire_lock, release_lock
 from src.common.decorators import authenticate, requires_scope
-import base64
+from uuid import uuid4
 from src.common.scope import Scope
 
 
@@ -32,20 +36,86 @@ def refresh_events():
     tags:
         - club
     summary: Refreshes Club Events
+    description: >
+        Queues a refresh, unless one is already queued or running. Either
+        way, the response describes the job that will refresh the events.
     responses:
         200:
-            description: OK
+            description: A refresh was already queued or running.
+            content:
+                application/json:
+                    schema:
+                        $ref: '#/components/schemas/RefreshJob'
+        201:
+            description: A refresh was queued.
+            content:
+                application/json:
+                    schema:
+                        $ref: '#/components/schemas/RefreshJob'
     """
 
-    from src.tasks.clubevent_tasks import refresh_notion_clubevents
-    refresh_notion_clubevents.apply_async()
+    from src.tasks.clubevent_tasks import (
+        REFRESH_LOCK,
+        refresh_notion_clubevents
+    )
+
+    """The queued job owns the lock, so no other refresh can start"""
+    job_id = str(uuid4())
+    queued, lock = acquire_lock(REFRESH_LOCK, job_id,
+                                app.config["NOTION_REFRESH_LOCK_SECONDS"],
+                                status="queued")
+    if queued:
+        try:
+            refresh_notion_clubevents.apply_async(task_id=job_id)
+        except Exception:
+            release_lock(REFRESH_LOCK, job_id)
+            raise
 
     res = {
         "status": "success",
-        "message": "Events successfully refreshed!"
+        "message": ("Events successfully refreshed!" if queued
+                    else "The events are already being refreshed."),
+        "job": {
+            "id": lock["owner"],
+            "status": lock["status"],
+            "since": lock["acquired"]
+        }
     }
 
-    return res, 201
+    return res, 201 if queued else 200
+
+
+def _thumbnail_url(endpoint: str, event_id, version: str):
+    """
+    The URL of an event's thumbnail on the host that was asked, so each
+    deployment links to itself. ``v`` changes with the image, so the URL
+    can be cached for as long as it's used.
+    """
+    if not version:
+        return None
+    return url_for(f"club_events.{endpoint}", id=str(event_id),
+                   size="thumbnail", v=version[:16], _external=True,
+                   _scheme=app.config["PREFERRED_URL_SCHEME"])
+
+
+def _utc(d: datetime) -> datetime:
+    """A naive UTC datetime to compare with the ones from Mongo"""
+    if d.tzinfo is not None:
+        d = d.astimezone(timezone.utc).replace(tzinfo=None)
+    return d
+
+
+def _with_urls(entry: dict) -> dict:
+    """A copy of an entry's event with thumbnail URLs instead of data URIs"""
+    event = dict(entry["event"])
+    event["image"] = _thumbnail_url("get_club_event_image", event["_id"],
+                                    entry["image_v"])
+    if "presenter" in event:
+        event["presenter"] = dict(event["presenter"])
+        event["presenter"]["image"] = _thumbnail_url(
+            "get_club_event_presenter_image", event["_id"],
+            entry["presenter_image_v"])
+    return event
 
 
 @club_events_blueprint.get("/club/get_events/")
@@ -106,6 +176,19 @@ def get_events():
             default: true
             required: false
             description: If true, the endpoint returns only confirmed events.
+        - in: query
+          name: images
+          required: false
+          schema:
+            type: string
+            enum:
+                - inline
+                - url
+            default: inline
+          description: >
+            `inline` embeds the thumbnails as base64 data URIs, `url`
+            returns the URL of each thumbnail instead. The URLs change
+            whenever the image does, so they can be cached.
     responses:
         200:
             content:
@@ -126,7 +209,10 @@ def get_events():
             description: Unexpected error.
     """
     args = request.args
-    query = {}
+
+    images = args.get("images", "inline")
+    if images not in ("inline", "url"):
+        raise BadRequest("Parameter `images` must be `inline` or `url`!")
 
     if args.get("rdate") and (
             args.get("start_date") or args.get("end_date")):
@@ -135,8 +221,8 @@ def get_events():
     if args.get("confirmed", "true") != "true" and (args.get("start_date") or args.get("end_date") or args.get("rdate")):  # noqa: E501
         raise BadRequest("Parameter `confirmed` must be true or undefined while using date parameters!")  # noqa: E501
 
-    if args.get("confirmed", "true") == "true":
-        query["start__type"] = "date"
+    confirmed = args.get("confirmed", "true") == "true"
+    start_gte = start_lte = start_lt = None
 
     if args.get("rdate"):
         now = datetime.now()
@@ -146,69 +232,95 @@ def get_events():
                           microsecond=0)
 
         if args.get("rdate") == "Today":
-            query["start__gte"] = now
+            start_gte = now
         elif args.get("rdate") == "NextWeek":
-            query["start__gte"] = now
-            query["start__lte"] = now + timedelta(days=7)
+            start_gte = now
+            start_lte = now + timedelta(days=7)
         elif args.get("rdate") == "NextMonth":
-            query["start__gte"] = now
-            query["start__lte"] = now + timedelta(days=30)
+            start_gte = now
+            start_lte = now + timedelta(days=30)
         elif args.get("rdate") == "NextYear":
-            query["start__gte"] = now
-            query["start__lte"] = now + timedelta(days=365)
+            start_gte = now
+            start_lte = now + timedelta(days=365)
 
     if args.get("start_date") and args.get("end_date"):
-        query |= {
-            "start__gte": dateutil.parser.parse(args["start_date"]),
-            "start__lt": dateutil.parser.parse(args["end_date"])
-        }
-
-    events = ClubEvent.objects(**query)
+        start_gte = _utc(dateutil.parser.parse(args["start_date"]))
+        start_lt = _utc(dateutil.parser.parse(args["end_date"]))
+
+    def matches(event: dict) -> bool:
+        start = event.get("start")
+        if not confirmed:
+            return True
+        if not isinstance(start, datetime):
+            return False
+        start = _utc(start)
+        return not ((start_gte and start < start_gte)
+                    or (start_lte and start > start_lte)
+                    or (start_lt and start >= start_lt))
+
+    """Filtered in memory from the snapshot of the last refresh"""
+    entries = [e for e in current_entries() if matches(e["event"])]
 
     count = args.get("count")
-    if count:
-        events = events[:int(count)]
-
-    event_array = []
-    for e in events:
-        if e.image:
-            img = e.image.thumbnail.read()
-            if img is not None:
-                image = (
-                    "data:image/png;base64," +
-                    base64.b64encode(img).decode("utf-8")
-                )
-            else:
-                image = None
-        else:
-            image = None
-        if e.presenter.image:
-            img = e.presenter.image.thumbnail.read()
-            if img is not None:
-                pres_image = (
-                    "data:image/png;base64," +
-                    base64.b64encode(img).decode("utf-8")
-                )
-            else:
-                pres_image = None
-        else:
-            pres_image = None
-        newE = e.to_mongo().to_dict()
-
-        newE["image"] = image
-
-        newE["presenter"]["image"] = pres_image
-
-        event_array.append(newE)
+    selected = entries[:int(count)] if count else entries
+
+    if images == "url":
+        event_array = [_with_urls(e) for e in selected]
+    else:
+        event_array = [e["event"] for e in selected]
 
     res = {
-        "count": events.count(),
+        "count": len(entries),
         "events": event_array
     }
 
     return res, 200
 
 
+def _image_response(image_id: str, legacy):
+    """
+    The rendition of ``image_id`` that best fits the ``size`` and
+    ``format`` query parameters, or the GridFS image of an event from
+    before renditions. Either can be revalidated by its ETag and is
+    immutable when requested with the ``v`` from ``get_events``.
+    """
+    if not image_id:
+        etag, modified = gridfs_validators(legacy)
+        if not etag:
+            raise NotFound("Specified Club Event does not have an image.")
+
+        return cached_file(legacy.read, etag, modified,
+                           content_type=legacy.content_type,
+                           version=str(legacy.grid_id))
+
+    formats = app.config["CLUB_EVENT_IMAGE_FORMATS"]
+    side = parse_size(request.args.get("size"),
+                      app.config["CLUB_EVENT_IMAGE_SIZES"])
+    fmt = pick_format(request.args.get("format"), request.accept_mimetypes,
+                      formats)
+
+    renditions = ImageRendition.listRaw(
+        image_id=image_id, format=fmt,
+        only=("id", "size", "width", "height", "content_type"))
+    if not renditions:
+        raise NotFound("Specified Club Event does not have an image.")
+
+    rendition = pick_rendition(renditions, side)
+
+    def load():
+        return ImageRendition.objects(
+            id=rendition["_id"]).scalar("data").first()
+
+    res = cached_file(load, f"{image_id}-{rendition['size']}.{fmt}",
+                      rendition["_id"].generation_time,
+                      content_type=rendition["content_type"],
+                      version=image_id)
+    if not request.args.get("format"):
+        res.vary.add("Accept")
+
+    return res
+
+
 @club_events_blueprint.get("/club/<id>/image/")
 def get_club_event_image(id):
     """
@@ -222,38 +334,67 @@ def get_club_event_image(id):
           required: true
           schema:
             type: string
+        - in: query
+          name: size
+          required: false
+          schema:
+            type: string
+          description: >
+            A rendition, `thumbnail`, `small`, `medium` or `large`, or
+            the number of pixels the longest side should have at least.
+            The smallest rendition that fits is returned. Defaults to
+            the largest.
+        - in: query
+          name: format
+          required: false
+          schema:
+            type: string
+            enum:
+                - webp
+                - jpeg
+          description: >
+            Defaults to webp if the Accept header lists image/webp,
+            jpeg otherwise.
+        - in: query
+          name: v
+          required: false
+          schema:
+            type: string
+          description: >
+            The image's version, as in the URLs from `get_events`. While
+            it matches, the response is cached as immutable.
     responses:
         200:
             content:
-                image/png:
+                image/webp:
                     schema:
                         type: string
                         format: binary
-                image/*:
+                image/jpeg:
                     schema:
                         type: string
                         format: binary
+        304:
+            description: >
+                The image matches the `If-None-Match` or
+                `If-Modified-Since` header.
+        400:
+            description: Invalid size or format.
+        404:
+            description: The Club Event or its image doesn't exist.
     """
-    event = ClubEvent.objects(id=id).first()
+    event = ClubEvent.objects(id=id).only("image", "image_id").first()
 
     if not event:
         raise NotFound("Club Event with the specified id was not found.")
 
-    img = event.image.read()
-
-    if not img:
-        raise NotFound("Specified Club Event does not have an image.")
-
-    res = make_response(img)
-    res.headers["Content-Type"] = event.image.content_type
-
-    return res
+    return _image_response(event.image_id, event.image)
 
 
 @club_events_blueprint.get("/club/<id>/presenter/image/")
 def get_club_event_presenter_image(id):
     """
-    Gets the presenter image for the specified Club Event
+    Gets the presenter's image for the specified Club Event
     ---
     tags:
         - club
@@ -263,29 +404,52 @@ def get_club_event_presenter_image(id):
           required: true
           schema:
             type: string
+        - in: query
+          name: size
+          required: false
+          schema:
+            type: string
+          description: Same as for the event's image.
+        - in: query
+          name: format
+          required: false
+          schema:
+            type: string
+            enum:
+                - webp
+                - jpeg
+          description: Same as for the event's image.
+        - in: query
+          name: v
+          required: false
+          schema:
+            type: string
+          description: Same as for the event's image.
     responses:
         200:
             content:
-                image/png:
+                image/webp:
                     schema:
                         type: string
                         format: binary
-                image/*:
+                image/jpeg:
                     schema:
                         type: string
                         format: binary
+        304:
+            description: >
+                The image matches the `If-None-Match` or
+                `If-Modified-Since` header.
+        400:
+            description: Invalid size or format.
+        404:
+            description: The Club Event or its image doesn't exist.
     """
-    event = ClubEvent.objects(id=id).first()
+    event = ClubEvent.objects(id=id).only("presenter").first()
 
     if not event:
         raise NotFound("Club Event with the specified id was not found.")
 
-    img = event.presenter.image.read()
-
-    if not img:
-        raise NotFound("Specified Club Event does not have an image.")
-
-    res = make_response(img)
-    res.headers["Content-Type"] = event.presenter.image.content_type
-
-    return res
+    presenter = event.presenter
+    return _image_response(presenter and presenter.image_id,
+                           presenter and presenter.image)
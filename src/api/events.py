@@ -166,7 +166,7 @@ def get_all_events():
         5XX:
             description: Unexpected error (the API issue).
     """
-    events = Event.objects()
+    events = Event.listRaw()
 
     if not events:
         raise NotFound("There are no events created.")
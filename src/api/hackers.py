@@ -8,13 +8,14 @@
         create_hacker()
 
 """
-from flask import request, make_response, json
+from flask import current_app as app, request, make_response, json
 from src.api import Blueprint
 from mongoengine.errors import (
     NotUniqueError,
     ValidationError,
     FieldDoesNotExist,
-    DoesNotExist
+    DoesNotExist,
+    InvalidQueryError
 )
 from werkzeug.exceptions import (
     BadRequest,
@@ -24,12 +25,17 @@ from werkzeug.exceptions import (
     UnprocessableEntity,
     ImATeapot
 )
+from mongoengine.queryset.visitor import Q
 from src.models.hacker import Hacker
 from src.models.resume import Resume
 from src.common.decorators import authenticate, requires_scope
 from src.common.scope import Scope
+from src.common.pagination import parse_limit, encode_cursor, cursor_filter
+from src.common.streaming import FORMATS, stream_response
+from src.common.caching import cached_file, gridfs_validators
 from json import JSONDecodeError
 from datetime import datetime, timedelta
+from itertools import chain
 import sentry_sdk
 import dateutil.parser
 from dateutil.parser import ParserError
@@ -348,6 +354,10 @@ def get_hacker_resume(_, email: str):
                     schema:
                         type: string
                         format: binary
+        304:
+            description: >
+                The resume matches the `If-None-Match` or
+                `If-Modified-Since` header.
     """
 
     hacker = Hacker.objects(
@@ -360,12 +370,13 @@ def get_hacker_resume(_, email: str):
     if not hacker.resume:
         raise NotFound("There is no resume for this hacker")
 
-    resume = hacker.resume.file.read()
-
-    res = make_response(resume)
-    res.headers["Content-Type"] = "application/pdf"
+    file = hacker.resume.file
+    etag, modified = gridfs_validators(file)
+    if not etag:
+        raise NotFound("There is no resume for this hacker")
 
-    return res
+    return cached_file(file.read, etag, modified,
+                       content_type="application/pdf", public=False)
 
 
 @hackers_blueprint.put("/hackers/<email>/accept/")
@@ -411,6 +422,114 @@ def accept_hacker(email: str):
     return res, 201
 
 
+@hackers_blueprint.put("/hackers/accept/")
+@authenticate
+@requires_scope(Scope.Hacker_Accept)
+def accept_hackers():
+    """
+    Accepts Hackers in bulk
+    ---
+    tags:
+        - hacker
+    summary: Accepts a list of hackers, or every hacker matching a filter
+    requestBody:
+        content:
+            application/json:
+                schema:
+                    type: object
+                    properties:
+                        emails:
+                            type: array
+                            items:
+                                type: string
+                        filter:
+                            type: object
+                            description: >
+                                Field values to match, e.g.
+                                `{"in_person": true, "isaccepted": false}`.
+                                Mongoengine operators such as
+                                `date__lt` are supported. Values are
+                                strings, numbers, booleans or null, and
+                                lists of them for `__in`, `__nin` and
+                                `__all`. At most
+                                `HACKERS_BULK_ACCEPT_MAX` hackers can
+                                match.
+    responses:
+        201:
+            description: >
+                OK, `results` maps each email to `accepted`,
+                `already_accepted` or `not_found`. `email_queue` has the
+                number of acceptance emails in each outbox status and, if
+                outbound email is rate limited, the `drain_seconds` of the
+                pending ones.
+        400:
+            description: Neither a list of emails nor a valid filter.
+        5XX:
+            description: Unexpected error.
+    """
+    data = request.get_json(silent=True) or {}
+    emails = data.get("emails")
+    query = data.get("filter")
+
+    if (emails is None) == (query is None):
+        raise BadRequest("Expected either emails or filter.")
+
+    if emails is not None:
+        if (not isinstance(emails, list)
+                or not all(isinstance(e, str) for e in emails)):
+            raise BadRequest("emails must be a list of strings.")
+        if len(emails) > app.config["HACKERS_BULK_ACCEPT_MAX"]:
+            raise BadRequest("Too many emails, at most "
+                             f"{app.config['HACKERS_BULK_ACCEPT_MAX']} "
+                             "can be accepted at once.")
+        query = {"email__in": emails}
+    else:
+        query = _parse_hacker_filter(query)
+
+    """One read for every hacker, one write for the ones to accept"""
+    most = app.config["HACKERS_BULK_ACCEPT_MAX"]
+    try:
+        hackers = list(Hacker.objects(**query).only("email", "isaccepted")
+                       .limit(most + 1))
+    except (InvalidQueryError, ValidationError) as e:
+        raise BadRequest(f"Invalid filter: {e}")
+
+    if len(hackers) > most:
+        raise BadRequest(f"The filter matches more than {most} hackers, "
+                         "at most that many can be accepted at once.")
+
+    results = {email: "not_found" for email in emails or ()}
+    accepted = []
+    for hacker in hackers:
+        if hacker.isaccepted:
+            results[hacker.email] = "already_accepted"
+        else:
+            results[hacker.email] = "accepted"
+            accepted.append(hacker)
+
+    email_queue = None
+    if accepted:
+        """Only the hackers read, as they're the ones that get an email"""
+        Hacker.objects(Q(**query) & Q(isaccepted=False)
+                       & Q(id__in=[h.id for h in accepted])).update(
+            isaccepted=True)
+
+        """Send Acceptance Emails"""
+        from src.common.mail import send_hacker_acceptance_emails
+        email_queue = send_hacker_acceptance_emails(accepted)
+
+    res = {
+        "status": "success",
+        "message": f"{len(accepted)} hackers have been accepted!",
+        "results": results
+    }
+
+    if email_queue is not None:
+        res["email_queue"] = email_queue
+
+    return res, 201
+
+
 @hackers_blueprint.get("/hackers/get_all_hackers/")
 @authenticate
 @requires_scope(Scope.Hacker_Read)
@@ -421,15 +540,84 @@ def get_all_hackers():
     tags:
         - hacker
     summary: returns an array of hacker documents
+    parameters:
+        - in: query
+          name: limit
+          schema:
+            type: integer
+            minimum: 1
+          description: >
+            Returns a page of at most `limit` hackers and the cursor of the
+            next page in `next`. Without `limit` or `after` every hacker is
+            returned.
+        - in: query
+          name: after
+          schema:
+            type: string
+          description: The `next` cursor of the previous page.
+        - in: query
+          name: sort
+          schema:
+            type: string
+            enum: [_id, date]
+            default: _id
+          description: Page order, `date` is the registration date.
+        - in: query
+          name: fields
+          schema:
+            type: string
+          example: first_name,last_name,email
+          description: Comma separated fields to return.
+        - in: query
+          name: stream
+          schema:
+            type: string
+            enum: [json, ndjson]
+          allowEmptyValue: true
+          description: >
+            Streams the hackers in chunks instead of building the whole
+            body in memory. `json` (or an empty value) keeps the same
+            body, `ndjson` returns one hacker per line. Can't be combined
+            with `limit` or `after`.
     responses:
         201:
             description: OK
+        400:
+            description: Invalid query parameters.
         404:
             description: No hacker documents are created.
         5XX:
             description: Unexpected error (the API issue).
     """
-    hackers = Hacker.objects().exclude(*Hacker.private_fields)
+    args = request.args
+    only = _parse_hacker_fields(args.get("fields"))
+
+    if "limit" in args or "after" in args:
+        if "stream" in args:
+            raise BadRequest("stream can't be combined with limit or after.")
+        return _get_hackers_page(only), 201
+
+    fmt = args.get("stream")
+    if fmt is not None:
+        fmt = fmt or "json"
+        if fmt not in FORMATS:
+            raise BadRequest(f"Unknown stream format `{fmt}`, must be one of "
+                             f"{', '.join(FORMATS)}")
+
+        batch_size = app.config["HACKERS_STREAM_BATCH_SIZE"]
+        hackers = Hacker.iterRaw(excludes=Hacker.private_fields, only=only,
+                                 batch_size=batch_size)
+
+        """Peek so we can still 404 before the response starts"""
+        first = next(hackers, None)
+        if first is None:
+            raise NotFound("There are no hackers created.")
+
+        return stream_response("hackers", chain([first], hackers), fmt,
+                               batch_size=batch_size, status=201,
+                               extra={"status": "success"})
+
+    hackers = Hacker.listRaw(excludes=Hacker.private_fields, only=only)
 
     if not hackers:
         raise NotFound("There are no hackers created.")
@@ -440,3 +628,112 @@ def get_all_hackers():
     }
 
     return res, 201
+
+
+"""Sort orders of the hackers list, each ends in _id to be unique"""
+HACKER_SORTS = {
+    "_id": ("_id",),
+    "date": ("date", "_id")
+}
+
+
+def _parse_hacker_fields(fields: str):
+    """Validates the ``fields`` query parameter"""
+    if fields is None:
+        return None
+
+    fields = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in fields
+               if f not in Hacker._fields or f in Hacker.private_fields]
+    if not fields:
+        raise BadRequest("fields must name at least one field.")
+    if invalid:
+        raise BadRequest(f"Invalid fields: {', '.join(invalid)}")
+
+    return fields
+
+
+"""Filter operators whose value is a list"""
+LIST_OPERATORS = ("in", "nin", "all")
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _parse_hacker_filter(query: dict) -> dict:
+    """
+    Validates the filter of accept_hackers(). Values are plain JSON values,
+    or lists of them for LIST_OPERATORS, so a filter can't smuggle in
+    Mongo operators such as ``{"$ne": 1}``.
+    """
+    if not isinstance(query, dict) or not query:
+        raise BadRequest("filter must be a non-empty object.")
+
+    invalid = [k for k in query
+               if k.split("__")[0] not in Hacker._fields
+               or k.split("__")[0] in Hacker.private_fields]
+    if invalid:
+        raise BadRequest(f"Invalid filter fields: {', '.join(invalid)}")
+
+    for key, value in query.items():
+        if key.split("__")[-1] in LIST_OPERATORS:
+            valid = (isinstance(value, list)
+                     and all(isinstance(v, _SCALARS) for v in value))
+        else:
+            valid = isinstance(value, _SCALARS)
+        if not valid:
+            raise BadRequest(f"Invalid filter value for {key}.")
+
+    return query
+
+
+def _get_hackers_page(only: list = None) -> dict:
+    """A page of the hackers list, see get_all_hackers()"""
+    args = request.args
+    limit = parse_limit(args.get("limit", app.config["HACKERS_PAGE_SIZE"]),
+                        app.config["HACKERS_PAGE_MAX_SIZE"])
+
+    sort = args.get("sort", "_id")
+    keys = HACKER_SORTS.get(sort)
+    if keys is None:
+        raise BadRequest(f"Unknown sort `{sort}`, must be one of "
+                         f"{', '.join(HACKER_SORTS)}")
+
+    query = {}
+    after = args.get("after")
+    if after is not None:
+        query = cursor_filter(sort, keys, after)
+
+    """The sort keys are needed for the cursor, even if they're private"""
+    excludes = [f for f in Hacker.private_fields if f != "id"]
+    fetch = only
+    if only is not None:
+        fetch = [*only, *(k for k in keys if k != "_id" and k not in only)]
+
+    """Fetch one more to know whether there's a next page"""
+    hackers = Hacker.listRaw(
+        __raw__=query,
+        excludes=excludes,
+        only=fetch,
+        order_by=[k.replace("_id", "id") for k in keys],
+        limit=limit + 1
+    )
+
+    if not hackers and after is None:
+        raise NotFound("There are no hackers created.")
+
+    next_cursor = None
+    if len(hackers) > limit:
+        hackers = hackers[:limit]
+        next_cursor = encode_cursor(sort, keys, hackers[-1])
+
+    hidden = {"_id", *Hacker.private_fields}
+    if only is not None:
+        hidden.update(k for k in keys if k not in only)
+    for hacker in hackers:
+        for k in hidden:
+            hacker.pop(k, None)
+
+    return {
+        "hackers": hackers,
+        "next": next_cursor,
+        "status": "success"
+    }
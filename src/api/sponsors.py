@@ -141,7 +141,7 @@ def get_all_sponsors():
         5XX:
             description: Unexpected error (the API issue).
     """
-    sponsors = Sponsor.objects().exclude(*Sponsor.private_fields)
+    sponsors = Sponsor.listRaw(excludes=Sponsor.private_fields)
 
     if not sponsors:
         raise NotFound("There are no sponsors created.")
@@ -6,9 +6,15 @@
     Functions:
 
         count_users()
+        email_outbox_status()
 
 """
+from flask import request
+from werkzeug.exceptions import BadRequest
 from src.api import Blueprint
+from src.common.decorators import authenticate, requires_scope
+from src.common.outbox import outbox_status
+from src.common.scope import Scope
 from src.models.hacker import Hacker
 
 
@@ -43,3 +49,52 @@ def count_users():
         "hackers": hacker_count
     }
     return res, 200
+
+
+@stats_blueprint.get("/stats/email_outbox/")
+@authenticate
+@requires_scope(Scope.Email_Send | Scope.Hacker_Accept)
+def email_outbox_status():
+    """
+    Returns the progress of outbound email
+    ---
+    tags:
+        - stats
+    parameters:
+        - in: query
+          name: template
+          schema:
+            type: string
+            enum: [hacker_acceptance, hacker_confirmation_success]
+          description: Only count emails of this template.
+    responses:
+        200:
+            content:
+                application/json:
+                    schema:
+                        type: object
+                        properties:
+                            counts:
+                                type: object
+                                description: Emails in each status.
+                                additionalProperties:
+                                    type: integer
+                            drain_seconds:
+                                type: number
+                                nullable: true
+                                description: >
+                                    Time to send the pending emails, if
+                                    outbound email is rate limited.
+        400:
+            description: Unknown template.
+    """
+    from src.tasks.mail_tasks import EMAIL_TEMPLATES
+
+    template = request.args.get("template")
+    if template is not None and template not in EMAIL_TEMPLATES:
+        raise BadRequest(f"Unknown template `{template}`.")
+
+    res = outbox_status(template)
+    res["status"] = "success"
+
+    return res, 200
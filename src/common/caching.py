@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.caching
+    ~~~~~~~~~~~~~~~~~~
+    Validators and Cache-Control for files served from the database, so
+    clients and proxies revalidate with a 304 instead of downloading an
+    unchanged file again.
+
+    A URL with a ``v`` query parameter names one version of a file. While
+    ``v`` matches that version the response can't change, so it's cached
+    as immutable. Any other request must be revalidated before reuse.
+
+    Functions:
+
+        cached_file(load, etag, last_modified, content_type, version,
+                    public) -> Response
+        gridfs_validators(proxy) -> tuple
+
+"""
+from datetime import datetime
+from typing import Callable, Optional
+from flask import current_app as app, request, Response, make_response
+from werkzeug.http import is_resource_modified
+
+
+def _is_versioned(version: Optional[str]) -> bool:
+    """Whether the request asked for ``version`` with ``v``"""
+    v = request.args.get("v")
+    return bool(v and version and version.startswith(v))
+
+
+def cached_file(load: Callable[[], bytes], etag: str,
+                last_modified: datetime = None, content_type: str = None,
+                version: str = None, public: bool = True) -> Response:
+    """
+    Responds with the file returned by ``load`` or, if the client's
+    ``If-None-Match`` or ``If-Modified-Since`` still match, a 304 without
+    calling ``load``. ``etag`` must change whenever the bytes do.
+
+    Files that need authentication should be served with ``public=False``
+    so shared caches don't keep them.
+    """
+    if is_resource_modified(request.environ, etag=etag,
+                            last_modified=last_modified):
+        res = make_response(load())
+        if content_type:
+            res.headers["Content-Type"] = content_type
+    else:
+        res = Response(status=304)
+
+    res.set_etag(etag)
+    if last_modified:
+        res.last_modified = last_modified
+
+    if public:
+        res.cache_control.public = True
+    else:
+        res.cache_control.private = True
+
+    if _is_versioned(version):
+        res.cache_control.max_age = app.config["CACHE_IMMUTABLE_MAX_AGE"]
+        res.cache_control.immutable = True
+    else:
+        res.cache_control.no_cache = True
+
+    return res
+
+
+def gridfs_validators(proxy) -> tuple:
+    """
+    The ETag and Last-Modified of a GridFS file, from its MD5 and upload
+    date, without reading its chunks. ``(None, None)`` if there's no file.
+    """
+    grid_out = proxy.get() if proxy else None
+    if grid_out is None:
+        return None, None
+    return grid_out.md5 or str(grid_out._id), grid_out.upload_date
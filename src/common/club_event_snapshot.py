@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.club_event_snapshot
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    The club events as get_events serves them, materialized by the Notion
+    refresh so a request doesn't query the events or read their images.
+
+    Each process keeps the latest ClubEventSnapshot and only checks for a
+    newer one every ``CLUB_EVENTS_SNAPSHOT_CACHE_SECONDS``. Without any
+    snapshot, e.g. before the first refresh, the entries are built from
+    the events on every call.
+
+    Functions:
+
+        build_entries() -> list
+        build_snapshot() -> Optional[ClubEventSnapshot]
+        current_entries() -> list
+
+"""
+import base64
+import time
+from typing import Optional
+from flask import current_app as app
+from pymongo.errors import DocumentTooLarge
+from src.models.club_event import ClubEvent, ClubEventSnapshot, ImageRendition
+
+
+def _thumbnails(image_ids: set) -> dict:
+    """The thumbnail renditions of ``image_ids`` as data URIs, in one query"""
+    fmt = app.config["CLUB_EVENT_IMAGE_FORMATS"][0]
+    return {
+        r["image_id"]: (f"data:{r['content_type']};base64,"
+                        + base64.b64encode(r["data"]).decode("utf-8"))
+        for r in ImageRendition.iterRaw(
+            image_id__in=list(filter(None, image_ids)),
+            size="thumbnail", format=fmt,
+            only=("image_id", "content_type", "data"))
+    }
+
+
+def _legacy_thumbnail(image):
+    """The GridFS thumbnail of an event from before renditions"""
+    if not image:
+        return None
+    img = image.thumbnail.read()
+    if img is None:
+        return None
+    return "data:image/png;base64," + base64.b64encode(img).decode("utf-8")
+
+
+def _image(image_id: str, legacy, thumbnails: dict) -> tuple:
+    """The inline thumbnail and the version of an image"""
+    if image_id:
+        return thumbnails.get(image_id), image_id
+    version = legacy.grid_id and str(legacy.grid_id) if legacy else None
+    return _legacy_thumbnail(legacy), version
+
+
+def build_entries() -> list:
+    """The snapshot entries of the events, in their order"""
+    events = list(ClubEvent.objects)
+    thumbnails = _thumbnails(
+        {e.image_id for e in events}
+        | {e.presenter.image_id for e in events if e.presenter})
+
+    entries = []
+    for e in events:
+        event = e.to_mongo().to_dict()
+        event["image"], image_v = _image(e.image_id, e.image, thumbnails)
+
+        presenter_v = None
+        if e.presenter:
+            event["presenter"]["image"], presenter_v = _image(
+                e.presenter.image_id, e.presenter.image, thumbnails)
+
+        entries.append({
+            "event": event,
+            "image_v": image_v,
+            "presenter_image_v": presenter_v
+        })
+
+    return entries
+
+
+def build_snapshot() -> Optional[ClubEventSnapshot]:
+    """
+    Saves the events as the latest snapshot and deletes the older ones.
+    If the snapshot is over Mongo's document size limit, all are deleted
+    so get_events builds the entries itself instead of serving old ones.
+    """
+    snapshot = ClubEventSnapshot(events=build_entries())
+    try:
+        snapshot.save()
+    except DocumentTooLarge:
+        app.logger.warning("The Club Events are too large for a snapshot, "
+                           "get_events will query them on every request")
+        ClubEventSnapshot.objects.delete()
+        return None
+
+    ClubEventSnapshot.objects(id__ne=snapshot.id).delete()
+    return snapshot
+
+
+def current_entries() -> list:
+    """
+    The entries of the latest snapshot. They're shared by every request
+    of the process, so treat them as read-only.
+    """
+    cached = app.extensions.get("club_event_snapshot")
+    now = time.monotonic()
+    if cached and now - cached["checked"] \
+            < app.config["CLUB_EVENTS_SNAPSHOT_CACHE_SECONDS"]:
+        return cached["events"]
+
+    latest = next(ClubEventSnapshot.iterRaw(only=("id",), order_by=("-id",),
+                                            limit=1), None)
+    if latest and cached and cached["version"] == latest["_id"]:
+        cached["checked"] = now
+        return cached["events"]
+
+    """A newer refresh can delete the snapshot before it's read"""
+    snapshot = latest and ClubEventSnapshot.findRaw(id=latest["_id"])
+    if not snapshot:
+        app.extensions.pop("club_event_snapshot", None)
+        return build_entries()
+
+    app.extensions["club_event_snapshot"] = {
+        "version": latest["_id"],
+        "events": snapshot["events"],
+        "checked": now
+    }
+    return snapshot["events"]
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.concurrency
+    ~~~~~~~~~~~~~~~~~~~~~~
+    Selects how the process handles blocking I/O. This module is imported
+    before anything else in ``src`` so it must only depend on the stdlib.
+
+    Modes:
+
+        gevent      Monkey-patch the stdlib so pymongo, SMTP and HTTP calls
+                    yield to other greenlets (production).
+        threaded    Rely on OS threads (e.g. the Flask dev server).
+        sync        No concurrency, one request at a time.
+
+    Functions:
+
+        configured_mode() -> str
+        apply_mode(mode)
+        is_gevent_patched() -> bool
+        check_concurrency_mode(app) -> str
+
+"""
+from os import getenv
+
+MODES = ("gevent", "threaded", "sync")
+
+
+def configured_mode() -> str:
+    """Reads the concurrency mode from the ``CONCURRENCY_MODE`` env var"""
+    mode = getenv("CONCURRENCY_MODE", "sync").strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"Invalid CONCURRENCY_MODE `{mode}`, "
+                         f"must be one of {', '.join(MODES)}")
+    return mode
+
+
+def apply_mode(mode: str):
+    """Patches the stdlib if ``mode`` requires it"""
+    if mode == "gevent" and not is_gevent_patched():
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def is_gevent_patched() -> bool:
+    """True if gevent has patched the socket module"""
+    try:
+        from gevent import monkey
+    except ImportError:  # pragma: no cover
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def check_concurrency_mode(app) -> str:
+    """
+    Verifies that the process runs in the configured mode and logs it.
+    Raises a RuntimeError if gevent was configured but never patched.
+    """
+    mode = app.config.get("CONCURRENCY_MODE", "sync")
+    if mode not in MODES:
+        raise RuntimeError(f"Invalid CONCURRENCY_MODE `{mode}`, "
+                           f"must be one of {', '.join(MODES)}")
+
+    patched = is_gevent_patched()
+
+    if mode == "gevent" and not patched:
+        raise RuntimeError("CONCURRENCY_MODE is gevent but the stdlib was "
+                           "not monkey-patched, set the CONCURRENCY_MODE "
+                           "environment variable before importing src.")
+
+    if mode != "gevent" and patched:
+        app.logger.warning(f"CONCURRENCY_MODE is {mode} but the stdlib has "
+                           "been monkey-patched by gevent (e.g. by a gevent "
+                           "worker), I/O is cooperative.")
+
+    app.logger.info(f"Concurrency mode: {mode}"
+                    + (" (gevent monkey-patched)" if patched else ""))
+
+    return mode
@@ -4,11 +4,12 @@
     ~~~~~~~~~~~~~~~~~~~~~
 
 """
-from flask import current_app as app, json, _request_ctx_stack
+from flask import current_app as app, _request_ctx_stack
 from functools import wraps
 from werkzeug.exceptions import Unauthorized, Forbidden
 from src.common.utils import _get_token_auth_header
-from six.moves.urllib.request import urlopen
+from src.common.jwks import get_key_store
+from src.common.token_cache import get_token_cache
 from jose import jwt
 from src.common.scope import Scope
 from sentry_sdk import set_user, add_breadcrumb
@@ -33,27 +34,20 @@ def authenticate(f):
             }
             return f(*args, **kwargs)
 
+        token_cache = get_token_cache()
         try:
             token = _get_token_auth_header()
-            jsonurl = urlopen("https://login.microsoftonline.com/" +
-                              app.config.get("AZURE_TENANT_ID") +
-                              "/discovery/v2.0/keys")
-            jwks = json.loads(jsonurl.read())
-            unverified_header = jwt.get_unverified_header(token)
-            rsa_key = {}
-            for key in jwks["keys"]:
-                if key["kid"] == unverified_header["kid"]:
-                    rsa_key = {
-                        "kty": key["kty"],
-                        "kid": key["kid"],
-                        "use": key["use"],
-                        "n": key["n"],
-                        "e": key["e"]
-                    }
+            payload = token_cache.get(token)
+            if payload is None:
+                unverified_header = jwt.get_unverified_header(token)
+                rsa_key = get_key_store().get_key(unverified_header["kid"])
         except Exception:
             raise Unauthorized("Unable to parse authentication")
 
-        if rsa_key:
+        if payload is None:
+            if not rsa_key:
+                raise Unauthorized("Unable to find appropriate key")
+
             try:
                 payload = jwt.decode(
                     token,
@@ -74,25 +68,27 @@ def authenticate(f):
             except Exception:
                 raise Unauthorized("Unable to parse authentication token")
 
-            _request_ctx_stack.top.current_user = payload
+            """Skip verification the next time we see this token"""
+            token_cache.put(token, payload)
 
-            """Set the authenticated user in Sentry"""
-            set_user({
-                "id": payload.get("unique_id"),
-                "username": payload.get("preferred_username"),
-                "roles": payload.get("roles", [])
-            })
+        _request_ctx_stack.top.current_user = payload
 
-            """Add breadcrumb"""
-            add_breadcrumb(
-                category="auth",
-                message=("Authenticated user " +
-                         payload.get("preferred_username", "")),
-                level="info"
-            )
+        """Set the authenticated user in Sentry"""
+        set_user({
+            "id": payload.get("unique_id"),
+            "username": payload.get("preferred_username"),
+            "roles": payload.get("roles", [])
+        })
 
-            return f(*args, **kwargs)
-        raise Unauthorized("Unable to find appropriate key")
+        """Add breadcrumb"""
+        add_breadcrumb(
+            category="auth",
+            message=("Authenticated user " +
+                     payload.get("preferred_username", "")),
+            level="info"
+        )
+
+        return f(*args, **kwargs)
 
     return decorator
 
@@ -110,14 +106,14 @@ def requires_scope(scope: Scope):
                                            for i in scope.names) +
                                    "    "))
 
+        required = scope.value
+
         @wraps(f)
         def decorated_function(*args, **kwargs):
             cu = _request_ctx_stack.top.current_user
 
-            s = Scope(cu.get("roles"))
-
             """ Check if the user has the required scope(s) """
-            if not(scope & s):
+            if not (required & Scope.mask(cu.get("roles"))):
                 raise Forbidden()
 
             return f(*args, **kwargs)
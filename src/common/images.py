@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.images
+    ~~~~~~~~~~~~~~~~~
+    Resized and compressed renditions of uploaded images.
+
+    A rendition is named after its size, e.g. ``small``, which sets the
+    longest side in pixels. Images are never scaled up, so a rendition of
+    a small source can be smaller than its name says.
+
+    Functions:
+
+        image_id(data) -> str
+        make_renditions(data, sizes, formats, quality) -> list
+        parse_size(value, sizes) -> int
+        pick_format(value, accept, formats) -> str
+        pick_rendition(renditions, side) -> dict
+
+    Variables:
+
+        CONTENT_TYPES
+
+"""
+import hashlib
+from io import BytesIO
+from PIL import Image, ImageOps
+from werkzeug.exceptions import BadRequest
+
+CONTENT_TYPES = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png"
+}
+
+"""Formats without an alpha channel"""
+_OPAQUE = ("jpeg",)
+
+
+def image_id(data: bytes) -> str:
+    """Identifies an image by its content, so equal images share renditions"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """Puts an image with transparency on a white background"""
+    if img.mode in ("RGBA", "LA") or "transparency" in img.info:
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def make_renditions(data: bytes, sizes: dict, formats: tuple,
+                    quality: int = 80) -> list:
+    """
+    Renders ``data`` at each of ``sizes`` (``{name: longest side}``) in
+    each of ``formats``. Returns dicts of ``size``, ``format``, ``width``,
+    ``height``, ``content_type`` and ``data``.
+
+    Raises PIL.UnidentifiedImageError if ``data`` isn't an image.
+    """
+    with Image.open(BytesIO(data)) as source:
+        img = ImageOps.exif_transpose(source)
+        if img.mode not in ("RGB", "RGBA"):
+            has_alpha = img.mode in ("LA", "PA") or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+
+        """Largest first, each size is resized from the previous one"""
+        renditions = []
+        for name, side in sorted(sizes.items(), key=lambda s: -s[1]):
+            img = img.copy()
+            img.thumbnail((side, side), Image.LANCZOS)
+            for fmt in formats:
+                out = _flatten(img) if fmt in _OPAQUE else img
+                buf = BytesIO()
+                out.save(buf, format=fmt.upper(), quality=quality,
+                         optimize=fmt != "webp")
+                renditions.append({
+                    "size": name,
+                    "format": fmt,
+                    "width": img.width,
+                    "height": img.height,
+                    "content_type": CONTENT_TYPES[fmt],
+                    "data": buf.getvalue()
+                })
+
+    return renditions
+
+
+def parse_size(value: str, sizes: dict) -> int:
+    """
+    The longest side asked for by the ``size`` query parameter, either a
+    rendition name or a number of pixels. Without one, the largest.
+    """
+    if not value:
+        return max(sizes.values())
+    if value in sizes:
+        return sizes[value]
+    try:
+        side = int(value)
+    except ValueError:
+        side = 0
+    if side <= 0:
+        raise BadRequest(f"size must be one of {', '.join(sizes)} or a "
+                         "number of pixels.")
+    return side
+
+
+def pick_format(value: str, accept, formats: tuple) -> str:
+    """
+    The ``format`` query parameter or, without one, the first of
+    ``formats`` the client lists in its ``accept`` header. A wildcard
+    doesn't count, so clients that don't ask get the last, most widely
+    supported, format.
+    """
+    if value:
+        if value not in formats:
+            raise BadRequest(f"format must be one of {', '.join(formats)}.")
+        return value
+
+    listed = {mimetype for mimetype, quality in accept if quality > 0}
+    for fmt in formats:
+        if CONTENT_TYPES[fmt] in listed:
+            return fmt
+    return formats[-1]
+
+
+def pick_rendition(renditions: list, side: int) -> dict:
+    """
+    The smallest of ``renditions`` that is at least ``side`` pixels on its
+    longest side, or the largest if none is
+    """
+    by_side = sorted(renditions, key=lambda r: max(r["width"], r["height"]))
+    for r in by_side:
+        if max(r["width"], r["height"]) >= side:
+            return r
+    return by_side[-1]
@@ -7,13 +7,32 @@
     Classes:
 
         JSONEncoderBase
+        JSONEncoderFast
 
 """
+import re
+import math
 import datetime
 from flask.json import JSONEncoder
+from mongoengine import Document, EmbeddedDocument
 from mongoengine.base import BaseDocument
+from mongoengine.fields import (
+    StringField,
+    URLField,
+    EmailField,
+    BooleanField,
+    IntField,
+    DateTimeField,
+    ObjectIdField,
+    EmbeddedDocumentField,
+    ListField
+)
 from mongoengine.queryset import QuerySet
 from bson.objectid import ObjectId
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 
 class JSONEncoderBase(JSONEncoder):
@@ -33,3 +52,189 @@ class JSONEncoderBase(JSONEncoder):
         else:
             return list(iterable)
         return JSONEncoder.default(self, obj)
+
+
+"""Fields whose to_mongo() returns values of these types unchanged"""
+_PLAIN_FIELDS = {
+    StringField: str,
+    URLField: str,
+    EmailField: str,
+    BooleanField: bool,
+    IntField: int,
+    DateTimeField: datetime.datetime,
+    ObjectIdField: ObjectId
+}
+_STRING_FIELDS = (StringField, URLField, EmailField)
+_STOCK_TO_MONGO = (Document.to_mongo, EmbeddedDocument.to_mongo)
+
+
+def _document_to_dict(doc: BaseDocument) -> dict:
+    """
+    Same as ``doc.to_mongo(use_db_field=False)``, but plain values and
+    embedded documents are passed through as they are instead of calling
+    each field's ``to_mongo``. Embedded documents are converted when the
+    encoder reaches them.
+    """
+    cls = type(doc)
+    if (cls.to_mongo not in _STOCK_TO_MONGO
+            or doc._meta.get("allow_inheritance")
+            or doc._meta.get("id_field", "id") != "id"):
+        return doc.to_mongo(use_db_field=False)
+
+    values = doc._data
+    fields = doc._fields
+    data = {}
+
+    if isinstance(doc, Document) and values.get("id") is not None:
+        data["_id"] = values["id"]
+
+    for name in doc._fields_ordered:
+        value = values.get(name)
+        field = fields.get(name)
+        if field is None:
+            field = doc._dynamic_fields[name]
+
+        if value is None:
+            if field._auto_gen:
+                return doc.to_mongo(use_db_field=False)
+            if field.null:
+                data[field.name] = None
+            continue
+
+        ftype = type(field)
+        if type(value) is _PLAIN_FIELDS.get(ftype):
+            pass
+        elif (ftype is EmbeddedDocumentField
+                and type(value) is field.document_type):
+            pass
+        elif (ftype is ListField
+                and (field.field is None
+                     or type(field.field) in _STRING_FIELDS)
+                and all(type(v) is str for v in value)):
+            pass
+        else:
+            value = field._to_mongo_safe_call(value, use_db_field=False)
+
+        data[field.name] = value
+
+    return data
+
+
+"""Characters the stdlib escapes when ensure_ascii is set"""
+_NON_ASCII = re.compile("[\x7f-\U0010ffff]")
+
+"""
+Floats orjson and the stdlib format differently: the stdlib switches to
+exponent notation below 1e-4 (orjson writes ``0.00001``) and writes
+``1e+16`` where orjson writes ``1e16``, also when the float is all there
+is to encode. Both patterns start with a literal so they're cheap to scan
+for, and a match inside a string just takes the slow path.
+"""
+_SMALL_FLOAT = re.compile(rb"0\.0000")
+_EXPONENT = re.compile(rb"e-?\d+(?=[,}\]\s]|$)")
+_DIGITS = b"0123456789"
+
+
+def _has_mismatched_float(rv: bytes) -> bool:
+    for match in _SMALL_FLOAT.finditer(rv):
+        """Skip e.g. the seconds of a timestamp, 00:00:00.000012"""
+        if match.start() == 0 or rv[match.start() - 1] not in _DIGITS:
+            return True
+    for match in _EXPONENT.finditer(rv):
+        if rv[match.start() - 1] in _DIGITS:
+            return True
+    return False
+
+
+def _has_non_finite(values: list) -> bool:
+    """
+    Whether ``values`` hold a NaN or an Infinity, which orjson encodes as
+    ``null``. Values orjson doesn't handle natively are skipped, they're
+    checked as what ``default`` converted them to.
+    """
+    stack = list(values)
+    while stack:
+        obj = stack.pop()
+        cls = type(obj)
+        if cls is str:
+            continue
+        if cls is dict or isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif cls is list or isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, float) and not math.isfinite(obj):
+            return True
+    return False
+
+
+def _escape_non_ascii(match) -> str:
+    c = ord(match.group())
+    if c < 0x10000:
+        return "\\u%04x" % c
+    c -= 0x10000
+    return "\\u%04x\\u%04x" % (0xd800 | (c >> 10), 0xdc00 | (c & 0x3ff))
+
+
+class JSONEncoderFast(JSONEncoderBase):
+    """
+    Encodes with orjson, producing the same output as JSONEncoderBase.
+
+    Documents are converted field by field without going through
+    ``to_mongo`` for plain values, everything else orjson can't handle
+    natively goes through ``JSONEncoderBase.default``. Falls back to
+    the stdlib encoder when orjson isn't installed, for formats orjson
+    can't reproduce (e.g. ``", "`` separators) and for values it would
+    format differently, e.g. NaN and Infinity.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, BaseDocument):
+            return _document_to_dict(obj)
+        return super().default(obj)
+
+    def encode(self, o) -> str:
+        option = self._orjson_option()
+        if option is None:
+            return super().encode(o)
+
+        converted = [o]
+
+        def default(obj):
+            value = self.default(obj)
+            converted.append(value)
+            return value
+
+        try:
+            rv = orjson.dumps(o, default=default, option=option)
+        except orjson.JSONEncodeError:
+            """Let the stdlib encoder handle it or raise its own error"""
+            return super().encode(o)
+
+        if _has_mismatched_float(rv) or (
+                b"null" in rv and _has_non_finite(converted)):
+            return super().encode(o)
+
+        rv = rv.decode("utf-8")
+
+        """DEL is ASCII, but the stdlib escapes it too"""
+        if self.ensure_ascii and (not rv.isascii() or "\x7f" in rv):
+            rv = _NON_ASCII.sub(_escape_non_ascii, rv)
+
+        return rv
+
+    def _orjson_option(self):
+        """The orjson option matching this encoder's settings, or None"""
+        if orjson is None or self.skipkeys or not self.check_circular:
+            return None
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+        if self.indent is None and (
+                self.item_separator, self.key_separator) == (",", ":"):
+            return option
+        if self.indent in (2, "  ") and (
+                self.item_separator, self.key_separator) == (",", ": "):
+            return option | orjson.OPT_INDENT_2
+        return None
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.jwks
+    ~~~~~~~~~~~~~~~
+    In-process cache for the Azure AD JSON Web Key Set
+
+    Classes:
+
+        JWKSKeyStore
+
+    Functions:
+
+        get_key_store() -> JWKSKeyStore
+
+"""
+import threading
+import time
+from flask import current_app as app, json
+from six.moves.urllib.request import urlopen
+
+
+class JWKSKeyStore:
+    """
+    Caches the signing keys of a JWKS endpoint by their ``kid``.
+
+    The key set is refetched once the TTL runs out, or when a token names
+    a ``kid`` we don't know yet (Azure rotates its signing keys). Threads
+    that need a refresh at the same time wait on a single fetch instead of
+    each hitting the endpoint. If a refresh fails, the stale keys are
+    used without fetching again for ``min_refresh_interval``.
+    """
+
+    def __init__(self, url: str, ttl: float = 3600,
+                 min_refresh_interval: float = 60, timeout: float = 10):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys = {}
+        self._fetched_at = None
+        self._generation = 0
+        self._retry_at = None
+        self._lock = threading.Lock()
+
+    def get_key(self, kid: str) -> dict:
+        """Returns the key with the given ``kid``, or None if there is none"""
+        keys = self._keys
+        generation = self._generation
+        fetched_at = self._fetched_at
+        now = time.monotonic()
+
+        expired = fetched_at is None or now - fetched_at >= self.ttl
+        if not expired and kid in keys:
+            return keys[kid]
+
+        """Don't let unknown kids or an outage make us hammer the endpoint"""
+        retry_at = self._retry_at
+        if (expired or now - fetched_at >= self.min_refresh_interval) \
+                and (retry_at is None or now >= retry_at):
+            self._refresh(generation)
+
+        return self._keys.get(kid)
+
+    def clear(self):
+        """Forgets all cached keys"""
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = None
+            self._retry_at = None
+            self._generation += 1
+
+    def _refresh(self, seen_generation: int):
+        with self._lock:
+            if self._generation != seen_generation:
+                """Another thread refreshed while we waited on the lock"""
+                return
+
+            try:
+                keys = self._fetch()
+            except Exception:
+                if not self._keys:
+                    raise
+                app.logger.warning("Unable to refresh the JWKS from "
+                                   f"{self.url}, using cached keys",
+                                   exc_info=True)
+                """Threads waiting on the lock use the stale keys too"""
+                self._retry_at = time.monotonic() + self.min_refresh_interval
+                self._generation += 1
+                return
+
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            self._retry_at = None
+            self._generation += 1
+
+    def _fetch(self) -> dict:
+        jsonurl = urlopen(self.url, timeout=self.timeout)
+        jwks = json.loads(jsonurl.read())
+
+        return {
+            key["kid"]: {
+                "kty": key["kty"],
+                "kid": key["kid"],
+                "use": key.get("use"),
+                "n": key["n"],
+                "e": key["e"]
+            }
+            for key in jwks["keys"]
+        }
+
+
+def get_key_store() -> JWKSKeyStore:
+    """Returns the key store for the current app's Azure AD tenant"""
+    store = app.extensions.get("jwks")
+    if store is None:
+        url = app.config.get("AZURE_JWKS_URL") or (
+            "https://login.microsoftonline.com/" +
+            app.config.get("AZURE_TENANT_ID") +
+            "/discovery/v2.0/keys")
+        store = app.extensions.setdefault("jwks", JWKSKeyStore(
+            url,
+            ttl=app.config.get("AZURE_JWKS_CACHE_SECONDS", 3600),
+            min_refresh_interval=app.config.get(
+                "AZURE_JWKS_MIN_REFRESH_SECONDS", 60)
+        ))
+    return store
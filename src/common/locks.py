@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.locks
+    ~~~~~~~~~~~~~~~~
+    Locks stored in Mongo, so a task runs once at a time across every
+    worker and request that could start it.
+
+    A lock is held by an ``owner``, the id of the job holding it, until
+    it's released or it expires. Mongo only deletes expired locks about
+    once a minute, so an expired lock is free to take even if it's still
+    there. Long jobs extend theirs as they make progress.
+
+    Functions:
+
+        acquire_lock(name, owner, ttl, status) -> Tuple[bool, dict]
+        extend_lock(name, owner, ttl) -> bool
+        release_lock(name, owner) -> bool
+        current_lock(name) -> Optional[dict]
+
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.models.task_lock import TaskLock
+
+
+def _collection():
+    return TaskLock._get_collection()
+
+
+def acquire_lock(name: str, owner: str, ttl: float,
+                 status: str = "running") -> Tuple[bool, dict]:
+    """
+    Takes the lock ``name`` for ``ttl`` seconds unless another owner
+    holds it. Its own ``owner`` can take it again, e.g. a queued job once
+    it starts running. Returns whether it was taken and the lock.
+    """
+    for _ in range(2):
+        now = datetime.utcnow()
+        try:
+            lock = _collection().find_one_and_update(
+                {"name": name,
+                 "$or": [{"owner": owner}, {"expires": {"$lte": now}}]},
+                {"$set": {"owner": owner,
+                          "status": status,
+                          "acquired": now,
+                          "expires": now + timedelta(seconds=ttl)}},
+                upsert=True, return_document=ReturnDocument.AFTER)
+            return True, lock
+        except DuplicateKeyError:
+            lock = current_lock(name)
+            if lock:
+                return False, lock
+            """Released since, try again"""
+
+    return False, current_lock(name)
+
+
+def extend_lock(name: str, owner: str, ttl: float) -> bool:
+    """Keeps the lock for ``ttl`` seconds from now, if ``owner`` has it"""
+    expires = datetime.utcnow() + timedelta(seconds=ttl)
+    return bool(_collection().update_one(
+        {"name": name, "owner": owner},
+        {"$set": {"expires": expires}}).modified_count)
+
+
+def release_lock(name: str, owner: str) -> bool:
+    """Releases the lock, unless it's been taken by another owner since"""
+    return bool(_collection().delete_one(
+        {"name": name, "owner": owner}).deleted_count)
+
+
+def current_lock(name: str) -> Optional[dict]:
+    """The lock ``name`` if it's held"""
+    return _collection().find_one(
+        {"name": name, "expires": {"$gt": datetime.utcnow()}})
@@ -2,38 +2,53 @@
 """
     src.common.mail
     ~~~~~~~~~~~~~~~
+    Queues emails in the outbox, they're rendered and sent by the worker,
+    see src.common.outbox and src.tasks.mail_tasks.drain_email_outbox
 
 """
-from flask import render_template, current_app as currapp
-from src.tasks.mail_tasks import send_async_email
+from typing import Optional
+from flask import current_app as currapp
+from src.common.outbox import enqueue_emails, outbox_status
+from src.tasks.mail_tasks import drain_email_outbox
+
+
+def _acceptance_context() -> dict:
+    return {"deadline": currapp.config["HACKER_CONFIRM_DEADLINE"].isoformat()}
+
+
+def send_emails(template_id: str, hackers: list,
+                context: dict = None) -> Optional[dict]:
+    """
+    Queues an email to each hacker that hasn't been sent ``template_id``
+    yet and has the worker drain the outbox. Returns the outbox status of
+    the template, see outbox_status().
+    """
+    if not currapp.config["SEND_MAIL"] or not hackers:
+        return None
+
+    enqueue_emails(template_id, hackers, context)
+
+    if not currapp.config.get("TESTING"):
+        drain_email_outbox.delay()
+
+    return outbox_status(template_id)
 
 
 def send_hacker_acceptance_email(hacker):
     """Sends an acceptance email to the hacker"""
-    if not currapp.config["SEND_MAIL"]:
-        return
-    if not currapp.config.get("TESTING"):
-        send_async_email.apply_async((), dict(
-            subject="Knight Hacks - You're in!",
-            recipient=hacker.email,
-            text_body=render_template("emails/hacker_acceptance.txt",
-                                      hacker=hacker),
-            html_body=render_template(
-                "emails/hacker_acceptance.html",
-                hacker=hacker,
-                deadline=currapp.config["HACKER_CONFIRM_DEADLINE"])))
+    send_hacker_acceptance_emails([hacker])
+
+
+def send_hacker_acceptance_emails(hackers: list) -> Optional[dict]:
+    """Sends an acceptance email to each hacker, see send_emails()"""
+    return send_emails("hacker_acceptance", hackers, _acceptance_context())
 
 
 def send_hacker_confirmation_success_email(hacker):
     """Sends an confirmation success email to the hacker"""
-    if not currapp.config["SEND_MAIL"]:
-        return
-    if not currapp.config.get("TESTING"):
-        send_async_email.apply_async((), dict(
-            subject="Knight Hacks - Thank you for Confirming!",
-            recipient=hacker.email,
-            text_body=render_template("emails/hacker_confirmation_success.txt",
-                                      hacker=hacker),
-            html_body=render_template(
-                "emails/hacker_confirmation_success.html",
-                hacker=hacker)))
+    send_hacker_confirmation_success_emails([hacker])
+
+
+def send_hacker_confirmation_success_emails(hackers: list) -> Optional[dict]:
+    """Sends a confirmation success email to each hacker, see send_emails()"""
+    return send_emails("hacker_confirmation_success", hackers)
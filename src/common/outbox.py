@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.outbox
+    ~~~~~~~~~~~~~~~~~
+    Durable outbox of emails to hackers, drained by
+    src.tasks.mail_tasks.drain_email_outbox
+
+    An email is ``pending`` until a worker claims it, it's then
+    ``sending`` until the worker records the result: ``sent``,
+    ``suppressed`` (sending is disabled), back to ``pending`` with an
+    exponential backoff, or ``failed`` once it ran out of attempts. A
+    claim is a lease, if the worker dies the email is claimed again once
+    the lease runs out.
+
+    Functions:
+
+        enqueue_emails(template_id, hackers, context) -> int
+        claim_batch(size) -> Tuple[str, list]
+        extend_lease(claim, wait) -> bool
+        record_results(claim, results)
+        next_due() -> Optional[datetime]
+        outbox_status(template_id) -> dict
+
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from uuid import uuid4
+from flask import current_app as app
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from src.common.rate_limit import get_mail_rate_limiter
+from src.models.email_outbox import EmailOutbox, STATUSES
+
+
+def _collection():
+    return EmailOutbox._get_collection()
+
+
+def enqueue_emails(template_id: str, hackers: list,
+                   context: dict = None) -> int:
+    """
+    Adds an email to each hacker to the outbox, unless the hacker already
+    has one for ``template_id``. Returns the number of emails added.
+    """
+    now = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {"key": EmailOutbox.make_key(template_id, h.id)},
+            {"$setOnInsert": {
+                "hacker": h.id,
+                "template": template_id,
+                "context": context or {},
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt": now,
+                "created": now
+            }},
+            upsert=True
+        )
+        for h in hackers
+    ]
+    if not ops:
+        return 0
+
+    try:
+        result = _collection().bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        """Another request enqueued the same email at the same time"""
+        if any(err["code"] != 11000 for err in e.details["writeErrors"]):
+            raise
+        return e.details["nUpserted"]
+
+    return result.upserted_count
+
+
+def _due(now: datetime) -> dict:
+    return {"$or": [
+        {"status": "pending", "next_attempt": {"$lte": now}},
+        {"status": "sending", "lease_until": {"$lte": now}}
+    ]}
+
+
+def claim_batch(size: int) -> Tuple[str, list]:
+    """
+    Claims up to ``size`` emails that are due. Returns the claim and the
+    raw outbox documents.
+    """
+    now = datetime.utcnow()
+    ids = [d["_id"] for d in _collection().find(_due(now), {"_id": 1})
+           .sort("next_attempt", 1).limit(size)]
+    if not ids:
+        return None, []
+
+    """Emails claimed by someone else since the find() no longer match"""
+    claim = uuid4().hex
+    lease = timedelta(seconds=app.config["MAIL_OUTBOX_LEASE_SECONDS"])
+    _collection().update_many(
+        {"_id": {"$in": ids}, **_due(now)},
+        {"$set": {"status": "sending", "claim": claim,
+                  "lease_until": now + lease}}
+    )
+
+    return claim, list(_collection().find({"claim": claim}))
+
+
+def extend_lease(claim: str, wait: float = 0) -> bool:
+    """
+    Extends the lease of a claim to ``MAIL_OUTBOX_LEASE_SECONDS`` after
+    ``wait`` seconds from now. False if none of its emails are claimed by
+    it anymore.
+    """
+    lease = timedelta(seconds=wait + app.config["MAIL_OUTBOX_LEASE_SECONDS"])
+    return bool(_collection().update_many(
+        {"claim": claim, "status": "sending"},
+        {"$set": {"lease_until": datetime.utcnow() + lease}}
+    ).matched_count)
+
+
+def _backoff(attempts: int) -> timedelta:
+    base = app.config["MAIL_OUTBOX_BACKOFF_SECONDS"]
+    cap = app.config["MAIL_OUTBOX_BACKOFF_MAX_SECONDS"]
+    return timedelta(seconds=min(cap, base * 2 ** (attempts - 1)))
+
+
+def record_results(claim: str, results: list):
+    """
+    Records ``[(document, status), ...]`` of a claimed batch, ``status``
+    being ``sent``, ``suppressed``, ``not_found`` or ``error: ...``.
+    Results of a claim that has since expired and been reclaimed are
+    ignored.
+    """
+    now = datetime.utcnow()
+    max_attempts = app.config["MAIL_OUTBOX_MAX_ATTEMPTS"]
+
+    ops = []
+    for doc, status in results:
+        update = {"claim": None, "lease_until": None}
+        if status in ("sent", "suppressed"):
+            update.update(status=status, sent_at=now, last_error=None)
+        else:
+            attempts = doc.get("attempts", 0) + 1
+            update.update(attempts=attempts, last_error=status)
+            if status == "not_found" or attempts >= max_attempts:
+                update["status"] = "failed"
+            else:
+                update.update(status="pending",
+                              next_attempt=now + _backoff(attempts))
+        ops.append(UpdateOne({"_id": doc["_id"], "claim": claim},
+                             {"$set": update}))
+
+    if ops:
+        _collection().bulk_write(ops, ordered=False)
+
+
+def next_due() -> Optional[datetime]:
+    """When the next pending email is due"""
+    doc = _collection().find_one({"status": "pending"}, {"next_attempt": 1},
+                                 sort=[("next_attempt", 1)])
+    return doc and doc["next_attempt"]
+
+
+def outbox_status(template_id: str = None) -> dict:
+    """
+    The number of emails in each status and, if outbound email is rate
+    limited, the seconds it takes to send the pending ones
+    """
+    match = {"template": template_id} if template_id else {}
+    counts = {status: 0 for status in STATUSES}
+    for row in _collection().aggregate([
+            {"$match": match},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["count"]
+
+    status = {"counts": counts, "drain_seconds": None}
+
+    limiter = get_mail_rate_limiter()
+    if limiter is not None:
+        queued = counts["pending"] + counts["sending"]
+        status["drain_seconds"] = limiter.status(queued)["drain_seconds"]
+
+    return status
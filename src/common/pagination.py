@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.pagination
+    ~~~~~~~~~~~~~~~~~~~~~
+    Keyset pagination with opaque cursors.
+
+    A page is sorted by a tuple of keys that ends in ``_id`` so it's
+    unique, and the cursor holds the sort key values of the last document
+    of the previous page. Each page is then a range scan on an index of
+    the sort keys, however deep it is.
+
+    Functions:
+
+        parse_limit(value, maximum) -> int
+        encode_cursor(sort, keys, doc) -> str
+        cursor_filter(sort, keys, cursor) -> dict
+
+"""
+import base64
+import binascii
+from bson import json_util
+from bson.json_util import JSONOptions
+from werkzeug.exceptions import BadRequest
+
+_JSON_OPTIONS = JSONOptions(tz_aware=False)
+
+
+def parse_limit(value: str, maximum: int) -> int:
+    """Validates the ``limit`` query parameter"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise BadRequest("limit must be an integer.")
+
+    if not 0 < limit <= maximum:
+        raise BadRequest(f"limit must be between 1 and {maximum}.")
+
+    return limit
+
+
+def encode_cursor(sort: str, keys: tuple, doc: dict) -> str:
+    """The cursor of the page that starts after ``doc``"""
+    raw = json_util.dumps({"s": sort, "v": [doc.get(k) for k in keys]})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def cursor_filter(sort: str, keys: tuple, cursor: str) -> dict:
+    """
+    A raw query matching the documents after ``cursor`` in ascending
+    ``keys`` order. Raises a BadRequest if the cursor is malformed or was
+    issued for another sort.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json_util.loads(raw, json_options=_JSON_OPTIONS)
+        values = data["v"]
+        valid = data["s"] == sort and len(values) == len(keys)
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        valid = False
+
+    if not valid:
+        raise BadRequest("Invalid cursor.")
+
+    """(a > x) or (a == x and b > y) or ..."""
+    clauses = []
+    for i, key in enumerate(keys):
+        clause = {k: v for k, v in zip(keys[:i], values[:i])}
+        clause[key] = {"$gt": values[i]}
+        clauses.append(clause)
+
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
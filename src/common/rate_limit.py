@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.rate_limit
+    ~~~~~~~~~~~~~~~~~~~~~
+    Token bucket rate limiter shared by every greenlet and worker process
+    through MongoDB
+
+    Classes:
+
+        TokenBucket
+
+    Functions:
+
+        get_mail_rate_limiter() -> Optional[TokenBucket]
+
+"""
+import time
+from typing import Callable, Optional
+from flask import current_app as app
+from mongoengine.errors import NotUniqueError
+from src.models.rate_limit import RateLimitBucket
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` messages per second with bursts of up to ``burst``.
+
+    Callers reserve tokens before sending and sleep for the returned
+    delay. Reservations may run the bucket into debt, so waiting callers
+    are served in the order they reserved instead of polling.
+
+    Updates are optimistic: they only apply if the bucket's ``version``
+    hasn't changed since it was read, and are retried otherwise.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1,
+                 clock: Callable[[], float] = time.time,
+                 max_retries: int = 20):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.max_retries = max_retries
+
+    def _load(self) -> RateLimitBucket:
+        bucket = RateLimitBucket.objects(name=self.name).first()
+        if bucket is None:
+            try:
+                bucket = RateLimitBucket.createOne(
+                    name=self.name, tokens=self.burst, updated=self.clock())
+            except NotUniqueError:
+                bucket = RateLimitBucket.objects(name=self.name).first()
+        return bucket
+
+    def _tokens(self, bucket: RateLimitBucket, now: float) -> float:
+        elapsed = max(0.0, now - bucket.updated)
+        return min(self.burst, bucket.tokens + elapsed * self.rate)
+
+    def _update(self, bucket: RateLimitBucket, **kwargs) -> bool:
+        return bool(RateLimitBucket.objects(
+            name=self.name, version=bucket.version
+        ).update_one(inc__version=1, **kwargs))
+
+    def reserve(self, n: int = 1) -> float:
+        """Reserves ``n`` tokens, returns the seconds to wait before using
+        them"""
+        for _ in range(self.max_retries):
+            bucket = self._load()
+            now = self.clock()
+            tokens = self._tokens(bucket, now) - n
+            if self._update(bucket, set__tokens=tokens, set__updated=now):
+                return max(0.0, -tokens / self.rate)
+
+        raise RuntimeError(f"Unable to reserve from rate limit {self.name}, "
+                           "too much contention")
+
+    def acquire(self, n: int = 1, sleep: Callable = None) -> float:
+        """Reserves ``n`` tokens and waits until they can be used"""
+        wait = self.reserve(n)
+        if wait:
+            (sleep or time.sleep)(wait)
+        return wait
+
+    def status(self, queued: int = 0) -> dict:
+        """
+        The queue depth (``queued`` plus reserved but not sent) and the
+        seconds it takes to drain at ``rate``
+        """
+        bucket = self._load()
+        tokens = self._tokens(bucket, self.clock())
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "depth": queued + int(max(0.0, -tokens) + 0.5),
+            "drain_seconds": max(0.0, queued - tokens) / self.rate
+        }
+
+
+def get_mail_rate_limiter() -> Optional[TokenBucket]:
+    """
+    The limiter of outbound email, or None if ``MAIL_RATE_LIMIT`` is not
+    set
+    """
+    if not app.config.get("MAIL_RATE_LIMIT"):
+        return None
+
+    limiter = app.extensions.get("mail_rate_limit")
+    if limiter is None:
+        limiter = app.extensions.setdefault("mail_rate_limit", TokenBucket(
+            "mail",
+            rate=float(app.config["MAIL_RATE_LIMIT"]),
+            burst=int(app.config.get("MAIL_RATE_BURST", 1))
+        ))
+    return limiter
@@ -5,7 +5,8 @@
     Defines authorization scopes
 """
 from enum import Flag, auto
-from typing import List
+from functools import lru_cache
+from typing import Iterable, List
 
 
 class Scope(Flag):
@@ -22,15 +23,25 @@ class Scope(Flag):
     @property
     def names(self) -> List[str]:
         """A list of the names of all the enums this value matches"""
-        return [k for k, v in self.members().items() if v & self]
+        return list(_names(self.value))
 
     @staticmethod
     def members() -> dict:
-        return {r.name: r for r in Scope}
+        return dict(_members)
+
+    @staticmethod
+    def mask(roles: Iterable[str]) -> int:
+        """
+        Resolves a list of role names to the integer value of their union.
+        Unknown roles are ignored.
+        """
+        if not roles:
+            return 0
+        return _compile_roles(frozenset(roles))
 
     @classmethod
     def _missing_(cls, value):
-        members = cls.members()
+        members = _members
         if isinstance(value, list):
             resolved = None
             for v in value:
@@ -43,3 +54,21 @@ class Scope(Flag):
         if value in members.keys():
             return cls(members[value])
         return super()._missing_(value)
+
+
+"""Compiled once, Scope members never change at runtime"""
+_members = {r.name: r for r in Scope}
+_role_bits = {name: r.value for name, r in _members.items()}
+
+
+@lru_cache(maxsize=256)
+def _compile_roles(roles: frozenset) -> int:
+    bits = 0
+    for role in roles:
+        bits |= _role_bits.get(role, 0)
+    return bits
+
+
+@lru_cache(maxsize=None)
+def _names(value: int) -> tuple:
+    return tuple(k for k, v in _role_bits.items() if v & value)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.streaming
+    ~~~~~~~~~~~~~~~~~~~~
+    Streams large lists as chunked JSON or NDJSON so a response never has
+    to hold every document in memory
+
+    Functions:
+
+        stream_response(key, items, fmt, batch_size, status, extra)
+        iter_json(key, items, batch_size, extra) -> Iterator[str]
+        iter_ndjson(items, batch_size) -> Iterator[str]
+
+"""
+from itertools import islice
+from typing import Iterable, Iterator
+from flask import Response, json, stream_with_context
+
+FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson"
+}
+
+
+def _dumps(obj) -> str:
+    """Same format as jsonify outside of debug mode"""
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_json(key: str, items: Iterable, batch_size: int = 100,
+              extra: dict = None) -> Iterator[str]:
+    """
+    Yields ``{key: [*items], **extra}`` as JSON, one chunk per batch of
+    ``batch_size`` items.
+    """
+    yield "{" + _dumps(key) + ":["
+
+    sep = ""
+    for batch in _batches(items, batch_size):
+        yield sep + ",".join(_dumps(item) for item in batch)
+        sep = ","
+
+    yield "]"
+    for k, v in (extra or {}).items():
+        yield "," + _dumps(k) + ":" + _dumps(v)
+    yield "}\n"
+
+
+def iter_ndjson(items: Iterable, batch_size: int = 100) -> Iterator[str]:
+    """Yields one JSON document per line, one chunk per batch"""
+    for batch in _batches(items, batch_size):
+        yield "".join(_dumps(item) + "\n" for item in batch)
+
+
+def stream_response(key: str, items: Iterable, fmt: str = "json",
+                    batch_size: int = 100, status: int = 200,
+                    extra: dict = None) -> Response:
+    """
+    Returns a chunked response of ``items``. ``extra`` is only included in
+    the json format, ndjson only has the items.
+    """
+    if fmt == "ndjson":
+        body = iter_ndjson(items, batch_size)
+    else:
+        body = iter_json(key, items, batch_size, extra)
+
+    return Response(stream_with_context(body), status=status,
+                    mimetype=FORMATS[fmt])
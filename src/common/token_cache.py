@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    src.common.token_cache
+    ~~~~~~~~~~~~~~~~~~~~~~
+    Bounded cache of bearer tokens that already passed verification
+
+    Classes:
+
+        VerifiedTokenCache
+
+    Functions:
+
+        get_token_cache() -> VerifiedTokenCache
+
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from flask import current_app as app
+
+
+class VerifiedTokenCache:
+    """
+    LRU of verified tokens, keyed by the SHA-256 digest of the token.
+
+    Each entry holds the decoded payload and is dropped once the token's
+    ``exp`` claim has passed. Payloads are shared between requests, so
+    treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Returns the cached payload for ``token`` if it hasn't expired"""
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            exp, payload = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token: str, payload: dict):
+        """Caches a verified payload until its ``exp``"""
+        exp = payload.get("exp")
+        if not exp or self.maxsize <= 0:
+            return
+
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (exp, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def get_token_cache() -> VerifiedTokenCache:
+    """Returns the verified token cache for the current app"""
+    cache = app.extensions.get("verified_tokens")
+    if cache is None:
+        cache = app.extensions.setdefault(
+            "verified_tokens",
+            VerifiedTokenCache(
+                maxsize=app.config.get("AZURE_TOKEN_CACHE_SIZE", 1024))
+        )
+    return cache
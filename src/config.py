@@ -24,6 +24,10 @@ class BaseConfig:
     LOGGING_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     LOGGING_LOCATION = "flask-base.log"
     LOGGING_LEVEL = logging.DEBUG
+    """One of gevent, threaded or sync, see src.common.concurrency"""
+    CONCURRENCY_MODE = os.getenv("CONCURRENCY_MODE", "sync").strip().lower()
+    """Falls back to the stdlib encoder if orjson isn't installed"""
+    JSON_ENCODER = os.getenv("JSON_ENCODER", "src.common.json.JSONEncoderFast")
     MONGODB_HOST = os.getenv("MONGO_URI", "mongodb://localhost:27017/test")
     SWAGGER = {
         "specs": [
@@ -49,16 +53,81 @@ class BaseConfig:
     MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER")
     FRONTEND_URL = os.getenv("FRONTEND_URL", "https://knighthacks.org/")
     BACKEND_URL = os.getenv("BACKEND_URL", "https://api.knighthacks.org/")
+    """Scheme of the URLs built for the request's host, TLS ends before us"""
+    PREFERRED_URL_SCHEME = os.getenv("PREFERRED_URL_SCHEME", "https")
     BCRYPT_LOG_ROUNDS = 13
     TOKEN_EXPIRATION_MINUTES = 15
     TOKEN_EXPIRATION_SECONDS = 0
-    NOTION_CRONJOB_USERNAME = os.getenv("NOTION_CRONJOB_USERNAME")
-    NOTION_CRONJOB_PASSWORD = os.getenv("NOTION_CRONJOB_PASSWORD")
     NOTION_DB_ID = os.getenv("NOTION_DB_ID")
     NOTION_TOKEN = os.getenv("NOTION_TOKEN")
     NOTION_VERSION = os.getenv("NOTION_VERSION")
     NOTION_API_URI = os.getenv("NOTION_API_URI", "https://api.notion.com/v1")
+    """Pages per Notion query, at most 100"""
+    NOTION_PAGE_SIZE = 100
+    """Image downloads in flight during a refresh, and the HTTP policy"""
+    NOTION_IMAGE_CONCURRENCY = int(os.getenv("NOTION_IMAGE_CONCURRENCY", 8))
+    NOTION_TIMEOUT_SECONDS = (5, 30)
+    NOTION_RETRIES = 3
+    NOTION_RETRY_BACKOFF = 0.5
+    """A refresh holds its lock this long past its last batch of pages"""
+    NOTION_REFRESH_LOCK_SECONDS = 15 * 60
+    """Renditions of club event images, by name: the longest side in px"""
+    CLUB_EVENT_IMAGE_SIZES = {
+        "thumbnail": 20,
+        "small": 160,
+        "medium": 320,
+        "large": 500
+    }
+    """Served by preference when the client accepts them, the last always"""
+    CLUB_EVENT_IMAGE_FORMATS = ("webp", "jpeg")
+    CLUB_EVENT_IMAGE_QUALITY = 80
+    """How long a process serves its club events snapshot before checking"""
+    CLUB_EVENTS_SNAPSHOT_CACHE_SECONDS = int(
+        os.getenv("CLUB_EVENTS_SNAPSHOT_CACHE_SECONDS", 10))
+    """Max age of files requested by version, e.g. ``?v=``"""
+    CACHE_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
     SEND_MAIL = True
+    """Emails the outbox claims and sends over one SMTP session at a time"""
+    MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+    """Outbound emails per second across all workers, 0 to disable"""
+    MAIL_RATE_LIMIT = float(os.getenv("MAIL_RATE_LIMIT", 0))
+    MAIL_RATE_BURST = int(os.getenv("MAIL_RATE_BURST", 10))
+    """Retries of the email outbox back off exponentially from the base"""
+    MAIL_OUTBOX_MAX_ATTEMPTS = 5
+    MAIL_OUTBOX_BACKOFF_SECONDS = 30
+    MAIL_OUTBOX_BACKOFF_MAX_SECONDS = 3600
+    MAIL_OUTBOX_LEASE_SECONDS = 600
+    """Celery queues and the worker concurrency of each"""
+    CELERY_QUEUE_CONCURRENCY = {
+        "celery": int(os.getenv("CELERY_DEFAULT_CONCURRENCY", 2)),
+        "mail": int(os.getenv("CELERY_MAIL_CONCURRENCY", 4)),
+        "notion": int(os.getenv("CELERY_NOTION_CONCURRENCY", 1))
+    }
+    """Queue and priority of each task, the first matching name wins"""
+    CELERY_TASK_ROUTES = {
+        "src.tasks.mail_tasks.send_async_email": {
+            "queue": "mail", "priority": 9},
+        "src.tasks.mail_tasks.*": {"queue": "mail", "priority": 5},
+        "src.tasks.clubevent_tasks.*": {"queue": "notion", "priority": 0}
+    }
+    CELERY_MAX_PRIORITY = 10
+    """
+    Maintenance tasks run by src.tasks.beat, every ``every`` seconds plus
+    a random delay of up to ``jitter`` seconds
+    """
+    CELERY_PERIODIC_TASKS = {
+        "refresh-notion-clubevents": {
+            "task": "src.tasks.clubevent_tasks.refresh_notion_clubevents",
+            "every": int(os.getenv("NOTION_REFRESH_INTERVAL_SECONDS",
+                                   24 * 60 * 60)),
+            "jitter": int(os.getenv("NOTION_REFRESH_JITTER_SECONDS", 10 * 60))
+        },
+        "drain-email-outbox": {
+            "task": "src.tasks.mail_tasks.drain_email_outbox",
+            "every": 5 * 60,
+            "jitter": 30
+        }
+    }
     """Max payload of 20mb"""
     MAX_CONTENT_LENGTH = 20 * 1024 * 1024
     CORS_ALLOW_LOCALHOST = os.getenv("CORS_ALLOW_LOCALHOST")
@@ -72,11 +141,24 @@ class BaseConfig:
     HACKER_CONFIRM_DEADLINE = datetime(year=2021, month=11, day=11)
     AZURE_TENANT_ID = os.getenv("AZURE_TENANT_ID")
     AZURE_API_AUDIENCE = os.getenv("AZURE_API_AUDIENCE")
+    AZURE_JWKS_URL = os.getenv("AZURE_JWKS_URL")
+    AZURE_JWKS_CACHE_SECONDS = int(os.getenv("AZURE_JWKS_CACHE_SECONDS",
+                                             3600))
+    AZURE_JWKS_MIN_REFRESH_SECONDS = 60
+    AZURE_TOKEN_CACHE_SIZE = int(os.getenv("AZURE_TOKEN_CACHE_SIZE", 1024))
+    """Hackers fetched and encoded per chunk by ?stream"""
+    HACKERS_STREAM_BATCH_SIZE = int(os.getenv("HACKERS_STREAM_BATCH_SIZE",
+                                              100))
+    """Page size of the hackers list with ?after but no ?limit"""
+    HACKERS_PAGE_SIZE = 100
+    HACKERS_PAGE_MAX_SIZE = 1000
+    HACKERS_BULK_ACCEPT_MAX = 1000
 
 
 class DevelopmentConfig(BaseConfig):
     """Development Configuration"""
     DEBUG = True
+    PREFERRED_URL_SCHEME = "http"
     BCRYPT_LOG_ROUNDS = 4
     MAIL_SUPPRESS_SEND = False
     SUPPRESS_EMAIL = True
@@ -94,6 +176,7 @@ class TestingConfig(BaseConfig):
     """Testing Configuration"""
     DEBUG = True
     TESTING = True
+    PREFERRED_URL_SCHEME = "http"
     BCRYPT_LOG_ROUNDS = 4
     SECRET_KEY = "pluto is a planet"
     TOKEN_EXPIRATION_MINUTES = 1440
@@ -101,6 +184,7 @@ class TestingConfig(BaseConfig):
     SUPPRESS_EMAIL = True
     PRESERVE_CONTEXT_ON_EXCEPTION = False
     SEND_MAIL = False
+    CLUB_EVENTS_SNAPSHOT_CACHE_SECONDS = 0
     CORS_ORIGINS = [
         r"http://localhost(:[0-9]*)?",
         r"https://(.*)?admin-tool.pages.dev",
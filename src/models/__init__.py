@@ -9,6 +9,8 @@
         BaseDocument
 
 """
+from typing import Iterator, Optional
+from mongoengine.fields import EmbeddedDocumentField
 from src import db
 
 
@@ -24,9 +26,88 @@ class BaseDocument(db.DynamicDocument):
         excludes = kwargs.pop("excludes", [])
         return cls.objects(*args, **kwargs).exclude("id", *excludes).first()
 
+    @classmethod
+    def findRaw(cls, *args, **kwargs) -> Optional[dict]:
+        """Finds one document as a plain dict, see iterRaw()"""
+        excludes = kwargs.pop("excludes", [])
+        return next(cls.iterRaw(*args, excludes=["id", *excludes], **kwargs),
+                    None)
+
+    @classmethod
+    def listRaw(cls, *args, **kwargs) -> list:
+        """Finds documents as plain dicts, see iterRaw()"""
+        return list(cls.iterRaw(*args, **kwargs))
+
+    @classmethod
+    def iterRaw(cls, *args, **kwargs) -> Iterator[dict]:
+        """
+        Finds documents straight from pymongo, without building Document
+        instances. Yields dicts in the same shape as
+        ``to_mongo(use_db_field=False)`` of the hydrated document: missing
+        fields get their defaults and ``_id`` is mirrored in ``id``.
+
+        Accepts ``excludes`` and ``only`` projections, ``order_by``,
+        ``limit`` and ``batch_size`` besides the query itself.
+        """
+        excludes = kwargs.pop("excludes", [])
+        only = kwargs.pop("only", None)
+        order_by = kwargs.pop("order_by", None)
+        limit = kwargs.pop("limit", None)
+        batch_size = kwargs.pop("batch_size", None)
+
+        queryset = cls.objects(*args, **kwargs)
+        if only:
+            queryset = queryset.only(*only)
+        if excludes:
+            queryset = queryset.exclude(*excludes)
+        if order_by:
+            queryset = queryset.order_by(*order_by)
+        if limit:
+            queryset = queryset.limit(limit)
+        if batch_size:
+            queryset = queryset.batch_size(batch_size)
+
+        defaults = _raw_defaults(cls, excludes, only)
+        for data in queryset.no_cache().as_pymongo():
+            if "_id" in data:
+                data["id"] = data["_id"]
+            _fill_defaults(data, defaults)
+            yield data
+
     @classmethod
     def createOne(cls, *args, **kwargs):
         """Creates a new document"""
         doc = cls(*args, **kwargs)
         doc.save()
         return doc
+
+
+def _raw_defaults(cls, excludes=(), only=None) -> list:
+    """
+    ``(name, default, embedded_defaults)`` for the projected fields that
+    hydration would fill in. Fields with a db_field other than their name
+    aren't supported, none of the models use one.
+    """
+    defaults = []
+    for name, field in cls._fields.items():
+        if name in excludes or name == "id":
+            continue
+        if only is not None and name not in only:
+            continue
+        embedded = None
+        if isinstance(field, EmbeddedDocumentField):
+            embedded = _raw_defaults(field.document_type)
+        if field.default is not None or embedded:
+            defaults.append((name, field.default, embedded))
+    return defaults
+
+
+def _fill_defaults(data: dict, defaults: list):
+    for name, default, embedded in defaults:
+        value = data.get(name)
+        if value is None:
+            if default is None:
+                continue
+            value = data[name] = default() if callable(default) else default
+        if embedded and isinstance(value, dict):
+            _fill_defaults(value, embedded)
@@ -7,8 +7,12 @@
     Classes:
 
         ClubEvent
+        ImageRendition
+        ImageSource
+        ClubEventSnapshot
 
 """
+from datetime import datetime
 from src import db
 from src.models import BaseDocument
 
@@ -19,6 +23,8 @@ class Presenter(db.EmbeddedDocument):
         size=(500, 500),
         thumbnail_size=(20, 20)
     )
+    """The ImageRendition(s) of the image, it replaces ``image``"""
+    image_id = db.StringField()
 
 
 class ClubEvent(BaseDocument):
@@ -33,7 +39,59 @@ class ClubEvent(BaseDocument):
     end = db.DateTimeField(requried=True)
     description = db.StringField()
     location = db.StringField()
+    """The ImageRendition(s) of the image, it replaces ``image``"""
+    image_id = db.StringField()
+    """The Notion page the event is synced from"""
+    notion_id = db.StringField(unique=True, sparse=True)
+    last_edited = db.DateTimeField()
+    """When the sync that last read the page started"""
+    synced = db.DateTimeField()
 
     meta = {
         "ordering": ["start"]
     }
+
+
+class ImageRendition(BaseDocument):
+    """
+    A resized and compressed copy of a club event or presenter image.
+    ``image_id`` is the sha256 of the source image, so events with the
+    same image share its renditions.
+    """
+    image_id = db.StringField(required=True)
+    size = db.StringField(required=True)
+    format = db.StringField(required=True)
+    width = db.IntField()
+    height = db.IntField()
+    content_type = db.StringField()
+    data = db.BinaryField()
+
+    meta = {
+        "indexes": [
+            {"fields": ["image_id", "format", "size"], "unique": True}
+        ]
+    }
+
+
+class ImageSource(BaseDocument):
+    """
+    Where an image was downloaded from. ``url`` is the file's URL without
+    its query, which Notion signs anew on every query. The validators the
+    server sent with it make the next download conditional, and the image
+    is reused if it's unchanged.
+    """
+    url = db.StringField(unique=True, required=True)
+    image_id = db.StringField(required=True)
+    etag = db.StringField()
+    last_modified = db.StringField()
+
+
+class ClubEventSnapshot(BaseDocument):
+    """
+    The club events ready to serve, built by the refresh that last changed
+    them. Each entry holds an ``event`` as get_events returns it, with its
+    thumbnails inline, and the ``image_v`` and ``presenter_image_v``
+    versions of its images. The id is the version, only the latest is kept.
+    """
+    created = db.DateTimeField(default=datetime.utcnow)
+    events = db.ListField(db.DictField())
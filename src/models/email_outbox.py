@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+    src.models.email_outbox
+    ~~~~~~~~~~~~~~~~~~~~~~~
+    Model definition for the outbox of emails to hackers
+
+    Classes:
+
+        EmailOutbox
+
+"""
+from src import db
+from src.models import BaseDocument
+from datetime import datetime
+
+STATUSES = ("pending", "sending", "sent", "suppressed", "failed")
+
+
+class EmailOutbox(BaseDocument):
+    """
+    One email to send to a hacker. There's at most one per hacker and
+    template, see src.tasks.mail_tasks.drain_email_outbox.
+    """
+    key = db.StringField(unique=True, required=True)  # template:hacker id
+    hacker = db.ObjectIdField(required=True)
+    template = db.StringField(required=True)
+    context = db.DictField()
+    status = db.StringField(choices=STATUSES, default="pending")
+    attempts = db.IntField(default=0)
+    next_attempt = db.DateTimeField(default=datetime.utcnow)
+    lease_until = db.DateTimeField()
+    claim = db.StringField()
+    last_error = db.StringField()
+    created = db.DateTimeField(default=datetime.utcnow)
+    sent_at = db.DateTimeField()
+
+    meta = {
+        "indexes": [
+            ("status", "next_attempt"),
+            "claim"
+        ]
+    }
+
+    @staticmethod
+    def make_key(template: str, hacker_id) -> str:
+        """The idempotency key of an email"""
+        return f"{template}:{hacker_id}"
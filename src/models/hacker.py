@@ -41,7 +41,8 @@ class Hacker(BaseDocument):  # Stored in the "user" collection
 
     meta = {
         "indexes": [
-            "email"
+            "email",
+            ("date", "id")  # pages of get_all_hackers sorted by date
         ]
     }
 
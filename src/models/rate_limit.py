@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+    src.models.rate_limit
+    ~~~~~~~~~~~~~~~~~~~~~
+    Model definition for shared rate limits
+
+    Classes:
+
+        RateLimitBucket
+
+"""
+from src import db
+from src.models import BaseDocument
+
+
+class RateLimitBucket(BaseDocument):
+    """
+    State of a token bucket shared by every process, see
+    src.common.rate_limit. ``version`` is bumped on every write so
+    concurrent updates can detect each other.
+    """
+    name = db.StringField(unique=True, required=True)
+    tokens = db.FloatField(required=True)
+    updated = db.FloatField(required=True)  # unix time
+    version = db.IntField(default=0)
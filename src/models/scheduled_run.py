@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+    src.models.scheduled_run
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+    Model definition for the runs of periodic tasks
+
+    Classes:
+
+        ScheduledRun
+
+"""
+from src import db
+from src.models import BaseDocument
+
+
+class ScheduledRun(BaseDocument):
+    """
+    The last run of a periodic task, see src.tasks.beat. ``name`` is the
+    entry of ``CELERY_PERIODIC_TASKS``.
+    """
+    name = db.StringField(unique=True, required=True)
+    task = db.StringField(required=True)
+    last_run_at = db.DateTimeField(required=True)
+    total_run_count = db.IntField(default=0)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+    src.models.task_lock
+    ~~~~~~~~~~~~~~~~~~~~
+    Model definition for locks shared by every process
+
+    Classes:
+
+        TaskLock
+
+"""
+from src import db
+from src.models import BaseDocument
+
+
+class TaskLock(BaseDocument):
+    """
+    A lock that lets one job of a task run at a time, see
+    src.common.locks. Mongo deletes it once ``expires`` has passed, in
+    case its holder died without releasing it.
+    """
+    name = db.StringField(unique=True, required=True)
+    owner = db.StringField(required=True)  # the Celery task id
+    status = db.StringField(choices=("queued", "running"), required=True)
+    acquired = db.DateTimeField(required=True)
+    expires = db.DateTimeField(required=True)
+
+    meta = {
+        "indexes": [
+            {
+                "fields": ["expires"],
+                "expireAfterSeconds": 0
+            }
+        ]
+    }
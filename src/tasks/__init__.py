@@ -7,25 +7,65 @@
     Functions:
 
         make_celery(app)
+        make_queues(config) -> list
 
 """
 from celery import Celery
+from kombu import Exchange, Queue
 from celery.signals import worker_process_init
+from src.tasks.schedules import make_beat_schedule
 import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
 from sentry_sdk.integrations.celery import CeleryIntegration
 
 
+"""
+The queue tasks go to unless CELERY_TASK_ROUTES says otherwise. It's
+durable and already declared by the broker without priorities, so it's
+declared as it was: RabbitMQ refuses to redeclare a queue with other
+arguments.
+"""
+DEFAULT_QUEUE = "celery"
+
+
+def make_queues(config) -> list:
+    """
+    The queues of ``CELERY_QUEUE_CONCURRENCY``, each with its own direct
+    exchange. All but DEFAULT_QUEUE support ``CELERY_MAX_PRIORITY``
+    priorities.
+    """
+    return [
+        Queue(name, Exchange(name), routing_key=name)
+        if name == DEFAULT_QUEUE else
+        Queue(name, Exchange(name), routing_key=name,
+              max_priority=config["CELERY_MAX_PRIORITY"])
+        for name in config["CELERY_QUEUE_CONCURRENCY"]
+    ]
+
+
 def make_celery(app) -> Celery:
     """Initialize the Celery Application"""
 
+    """
+    Tasks are routed to their own queue so a slow Notion refresh can't
+    hold up the emails. A worker only prefetches one message per process,
+    otherwise the priorities would only apply to the messages it hasn't
+    reserved yet.
+    """
     celery = Celery(
         app.import_name,
         backend=app.config["RESULT_BACKEND"],
         broker=app.config["CELERY_BROKER_URL"],
         include=["src.tasks.mail_tasks", "src.tasks.clubevent_tasks"],
         worker_send_task_events=True,
-        task_send_sent_event=True
+        task_send_sent_event=True,
+        task_queues=make_queues(app.config),
+        task_default_queue=DEFAULT_QUEUE,
+        task_routes=app.config["CELERY_TASK_ROUTES"],
+        task_default_priority=5,
+        worker_prefetch_multiplier=1,
+        beat_schedule=make_beat_schedule(app.config),
+        beat_scheduler="src.tasks.beat:MongoScheduler"
     )
     celery.conf.update(app.config)
 
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+    src.tasks.beat
+    ~~~~~~~~~~~~~~
+    Runs the maintenance tasks of ``CELERY_PERIODIC_TASKS``, e.g. the
+    Notion refresh, from a single Celery beat process, on the schedules
+    of src.tasks.schedules::
+
+        python -m src.tasks.beat
+
+    The last run of each is kept in Mongo, so a restarted beat neither
+    repeats a run nor skips one. A task that never ran is due right away.
+
+    Any other arguments are passed on to ``celery beat``.
+
+    Classes:
+
+        MongoScheduler
+
+    Functions:
+
+        main(argv)
+
+"""
+import sys
+from datetime import datetime, timezone
+from celery.beat import Scheduler
+from src.models.scheduled_run import ScheduledRun
+
+
+class MongoScheduler(Scheduler):
+    """
+    Keeps the last run of each entry as a ScheduledRun instead of in a
+    local shelve file, which is lost with the beat pod
+    """
+
+    def setup_schedule(self):
+        super().setup_schedule()
+        runs = {r["name"]: r for r in ScheduledRun.iterRaw(
+            name__in=list(self.data))}
+        for name, entry in self.data.items():
+            run = runs.get(name)
+            if run is None:
+                entry.last_run_at = datetime.fromtimestamp(0, timezone.utc)
+                continue
+            entry.last_run_at = run["last_run_at"].replace(
+                tzinfo=timezone.utc)
+            entry.total_run_count = run["total_run_count"]
+
+    def reserve(self, entry):
+        """Records the run before it's sent, so a crash can't repeat it"""
+        new_entry = super().reserve(entry)
+        last_run_at = new_entry.last_run_at.astimezone(timezone.utc)
+        ScheduledRun.objects(name=new_entry.name).update_one(
+            set__task=new_entry.task,
+            set__last_run_at=last_run_at.replace(tzinfo=None),
+            set__total_run_count=new_entry.total_run_count,
+            upsert=True)
+        return new_entry
+
+
+def main(argv: list = None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    from src import celery
+    celery.start(["beat", "-S", "src.tasks.beat:MongoScheduler",
+                  "-l", "info", *argv])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,148 +1,557 @@
 # -*- coding: utf-8 -*-
 """
-    src.tasks.mail_tasks
-    ~~~~~~~~~~~~~~~~~~~~
+    src.tasks.clubevent_tasks
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+    Syncs the Club Events from the Notion database.
+
+    Each event is keyed by its Notion page id. Pages that weren't edited
+    since the last refresh are skipped, edited ones are updated in place
+    and events whose page is gone are deleted once all pages are synced,
+    so the events are never missing while a refresh is running.
+
+    Images are ingested as ImageRendition(s) of every size in
+    ``CLUB_EVENT_IMAGE_SIZES`` and format in ``CLUB_EVENT_IMAGE_FORMATS``.
+    Downloads are conditional on the ETag or Last-Modified of the
+    ImageSource an image was last downloaded from, so an edited page
+    whose images didn't change doesn't download them again.
+
+    A refresh that changed the events saves them as the ClubEventSnapshot
+    get_events serves. Only one refresh runs at a time, see REFRESH_LOCK.
 
     Functions:
 
         refresh_notion_clubevents()
+        http_session() -> requests.Session
+        iter_notion_pages(session) -> Iterator[list]
+        clean_notion(page) -> dict
+        sync_clubevents(batches, session) -> dict
 
 """
 from src import celery
-from src.models.club_event import ClubEvent
+from src.common.images import image_id, make_renditions
+from src.common.club_event_snapshot import build_snapshot
+from src.common.locks import acquire_lock, extend_lock, release_lock
+from src.models.club_event import (
+    ClubEvent,
+    ClubEventSnapshot,
+    ImageRendition,
+    ImageSource,
+    Presenter
+)
 from mongoengine.errors import ValidationError
+from mongoengine.fields import ImageGridFsProxy
+from bson import Binary
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from PIL import Image, UnidentifiedImageError
+from flask import current_app as app
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import dateutil.parser
-from datetime import datetime, timedelta
-from io import BytesIO
-# from PIL import Image
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import time
+from uuid import uuid4
+
+"""Only pages with all of these properties are events"""
+NOTION_FILTER = {
+    "and": [
+        {
+            "property": "Name",
+            "text": {"is_not_empty": True}
+        },
+        {
+            "property": "Tags",
+            "multi_select": {"is_not_empty": True}
+        },
+        {
+            "property": "Presenter",
+            "text": {"is_not_empty": True}
+        },
+        {
+            "property": "Date",
+            "date": {"is_not_empty": True}
+        },
+        {
+            "property": "Location",
+            "text": {"is_not_empty": True}
+        },
+        {
+            "property": "Description",
+            "text": {"is_not_empty": True}
+        }
+    ]
+}
+
+
+def _utc(d: str) -> datetime:
+    """A naive UTC datetime, the way Mongo gives it back"""
+    d = dateutil.parser.parse(d)
+    if d.tzinfo is not None:
+        d = d.astimezone(timezone.utc).replace(tzinfo=None)
+    return d
+
+
+def http_session() -> requests.Session:
+    """
+    A Session that keeps a connection pool as big as the download pool
+    and retries connection errors and 429/5xx responses with backoff.
+    The Notion query is a read, so POSTs are retried too.
+    """
+    retry = Retry(
+        total=app.config["NOTION_RETRIES"],
+        backoff_factor=app.config["NOTION_RETRY_BACKOFF"],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"})
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=app.config["NOTION_IMAGE_CONCURRENCY"],
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def iter_notion_pages(session: requests.Session) -> Iterator[list]:
+    """
+    The pages of the Notion database that are events. Follows
+    ``next_cursor`` until ``has_more`` is false, yielding the results of
+    each query as soon as they arrive.
+    """
+    url = (app.config.get("NOTION_API_URI")
+           + f"/databases/{app.config.get('NOTION_DB_ID')}/query")
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {app.config.get('NOTION_TOKEN')}",
+        "Notion-Version": app.config.get("NOTION_VERSION")
+    }
+    body = {"filter": NOTION_FILTER,
+            "page_size": app.config["NOTION_PAGE_SIZE"]}
+
+    while True:
+        res = session.post(url, headers=headers, json=body,
+                           timeout=app.config["NOTION_TIMEOUT_SECONDS"])
+        res.raise_for_status()
+        data = res.json()
+
+        yield data.get("results", [])
+
+        if not data.get("has_more") or not data.get("next_cursor"):
+            return
+        body["start_cursor"] = data["next_cursor"]
+
+
+def clean_notion(r: dict) -> dict:
+    """The ClubEvent fields of a Notion page"""
+    p = r["properties"]
+
+    def fix_date(d: str) -> datetime:
+        if not d:
+            return None
+        return dateutil.parser.parse(d)
+
+    start_date = fix_date(p["Date"]["date"]["start"])
+    end_date = fix_date(p["Date"]["date"]["end"])
+    if end_date is None:
+        end_date = start_date + timedelta(hours=1)
+
+    presenterImage = p["Presenter Image"]["files"]
+    presenterImage = ("" if not presenterImage
+                      else presenterImage[0]["file"]["url"])
+    eventImage = p["Image"]["files"]
+    eventImage = ("" if not eventImage
+                  else eventImage[0]["file"]["url"])
+
+    return {
+        "notion_id": r["id"],
+        "last_edited": _utc(r["last_edited_time"]),
+        "name": p["Name"]["title"][0]["plain_text"],
+        "tags": tuple(
+            map(lambda t: t["name"], p["Tags"]["multi_select"])
+        ),
+        "presenter": {
+            "name": p["Presenter"]["rich_text"][0]["plain_text"],
+            "image": presenterImage
+        },
+        "start": start_date,
+        "end": end_date,
+        "description": p["Description"]["rich_text"][0]["plain_text"],
+        "location": p["Location"]["rich_text"][0]["plain_text"],
+        "image": eventImage
+    }
+
+
+def _download(session: requests.Session, url: str, timeout,
+              headers: dict = None):
+    """Runs in the download pool, so it mustn't touch the app"""
+    if not url:
+        return None
+    res = session.get(url, allow_redirects=True, timeout=timeout,
+                      headers=headers)
+    res.raise_for_status()
+    return res
+
+
+def _source_url(url: str) -> str:
+    """The URL of a file without the signature Notion adds to each query"""
+    return urlsplit(url)._replace(query="", fragment="").geturl()
+
+
+def _fetch_image(session: requests.Session, url: str, timeout,
+                 renditions: dict, known: set,
+                 source: dict = None) -> Optional[tuple]:
+    """
+    Downloads an image and renders it, unless its image_id is ``known``
+    to have renditions already. With the ImageSource the image was last
+    downloaded from, the download is conditional and an unchanged image
+    isn't downloaded again. Returns the image_id, the new renditions and
+    the image's new source, if any.
+
+    Runs in the download pool, so it mustn't touch the app or the
+    database. ``renditions`` holds the ``sizes``, ``formats`` and
+    ``quality`` to render.
+    """
+    headers = {}
+    if source and source.get("etag"):
+        headers["If-None-Match"] = source["etag"]
+    if source and source.get("last_modified"):
+        headers["If-Modified-Since"] = source["last_modified"]
+
+    res = _download(session, url, timeout, headers)
+    if res is None:
+        return None
+    if res.status_code == 304 and headers:
+        return source["image_id"], [], None
+
+    iid = image_id(res.content)
+    new_source = {
+        "url": _source_url(url),
+        "image_id": iid,
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified")
+    }
+    if source and all(source.get(k) == v for k, v in new_source.items()):
+        new_source = None
+
+    if iid in known:
+        return iid, [], new_source
+    return iid, make_renditions(res.content, **renditions), new_source
+
+
+def _store_renditions(renditions: dict, known: set):
+    """
+    Stores the renditions fetched by _fetch_image(), ``{image_id:
+    renditions}``, in one write
+    """
+    docs = [dict(r, image_id=iid, data=Binary(r["data"]))
+            for iid, images in renditions.items() if iid not in known
+            for r in images]
+    if docs:
+        try:
+            ImageRendition._get_collection().insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            """Another refresh stored the same image at the same time"""
+            if any(err["code"] != 11000 for err in e.details["writeErrors"]):
+                raise
+    known.update(renditions)
+
+
+def _store_sources(sources: dict):
+    """Upserts the ImageSource(s) of downloaded images in one write"""
+    if not sources:
+        return
+    ImageSource._get_collection().bulk_write([
+        UpdateOne({"url": url}, {"$set": source}, upsert=True)
+        for url, source in sources.items()
+    ], ordered=False)
+
+
+def _stage_event(event: dict, previous: Optional[dict], synced: datetime,
+                 image_id: str, presenter_image_id: str) -> dict:
+    """
+    The validated document of a cleaned page with the ids of its ingested
+    images, read by the sync started at ``synced``. It replaces the
+    ``previous`` version of the event, if any, keeping its id.
+    """
+    del event["image"]
+    del event["presenter"]["image"]
+
+    ce = ClubEvent(**event, synced=synced)
+    ce.image_id = image_id
+    ce.presenter.image_id = presenter_image_id
+    if previous:
+        ce.id = previous["_id"]
+    ce.validate()
+
+    return ce.to_mongo()
+
 
+def _write_events(staged: list) -> dict:
+    """
+    Inserts the new and replaces the edited events of ``staged``, a list
+    of ``(page_id, document, previous)``, in one bulk write. Returns the
+    error of each event that wasn't written, by its index in ``staged``.
+    """
+    if not staged:
+        return {}
 
-@celery.task
-def refresh_notion_clubevents():
-    from flask import current_app as app
+    ops = [ReplaceOne({"_id": previous["_id"]}, doc) if previous
+           else InsertOne(doc)
+           for _, doc, previous in staged]
+    try:
+        ClubEvent._get_collection().bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        return {err["index"]: err["errmsg"]
+                for err in e.details["writeErrors"]}
+    return {}
+
+
+def _delete_legacy_images(previous: dict):
+    """Deletes the GridFS images an event had from before renditions"""
+    presenter = previous.get("presenter") or {}
+    for field, grid_id in (
+            (ClubEvent._fields["image"], previous.get("image")),
+            (Presenter._fields["image"], presenter.get("image"))):
+        if grid_id:
+            ImageGridFsProxy(grid_id=grid_id, db_alias=field.db_alias,
+                             collection_name=field.collection_name).delete()
+
+
+def _collect_renditions():
+    """Deletes the renditions and sources no event or presenter uses"""
+    used = set(ClubEvent.objects.distinct("image_id")) \
+        | set(ClubEvent.objects.distinct("presenter.image_id"))
+    ImageRendition.objects(image_id__nin=list(used)).delete()
+    ImageSource.objects(image_id__nin=list(used)).delete()
+
+
+"""
+Errors that make a single page invalid. Pillow raises a plain OSError
+for a truncated or corrupt image.
+"""
+_PAGE_ERRORS = (ValidationError, KeyError, IndexError, TypeError, ValueError,
+                requests.RequestException, UnidentifiedImageError, OSError,
+                Image.DecompressionBombError)
+
+"""Notion rounds last_edited_time down to the minute"""
+NOTION_EDIT_PRECISION = timedelta(minutes=1)
+
+
+def _unchanged(previous: Optional[dict], page: dict) -> bool:
+    """
+    Whether the page wasn't edited since ``previous`` was synced from it.
+    An edit in the minute before that sync started can come after the
+    sync read the page with the same last_edited_time, so it isn't
+    trusted until a sync starts a minute after it.
+    """
+    if not previous or not previous.get("synced"):
+        return False
+    last_edited = _utc(page["last_edited_time"])
+    return previous.get("last_edited") == last_edited \
+        and last_edited + NOTION_EDIT_PRECISION <= previous["synced"]
+
+
+def sync_clubevents(batches, session: requests.Session = None,
+                    counts: dict = None) -> dict:
+    """
+    Creates, updates and deletes ClubEvents to match the Notion pages,
+    given in ``batches`` of query results. Returns the number of events in
+    each outcome. They're also kept in ``counts`` as each batch is
+    written, so a caller still has them if fetching a later batch raises.
+
+    The images of a batch's edited pages are downloaded and rendered by
+    a pool of ``NOTION_IMAGE_CONCURRENCY`` threads (greenlets under
+    gevent) while the events before them are saved, with at most two
+    pages per thread in flight. The events and new renditions of a batch
+    are written in one bulk write each, before the next batch is fetched,
+    and deletions wait until all are. If fetching a batch
+    raises, nothing is deleted. Renditions no event uses anymore are
+    deleted last.
+    """
+    session = session or http_session()
+    started = datetime.utcnow()
+    timeout = app.config["NOTION_TIMEOUT_SECONDS"]
+    concurrency = app.config["NOTION_IMAGE_CONCURRENCY"]
+    renditions = dict(sizes=app.config["CLUB_EVENT_IMAGE_SIZES"],
+                      formats=app.config["CLUB_EVENT_IMAGE_FORMATS"],
+                      quality=app.config["CLUB_EVENT_IMAGE_QUALITY"])
+
+    edited = {
+        d["notion_id"]: d
+        for d in ClubEvent.objects(notion_id__ne=None)
+        .only("notion_id", "last_edited", "synced", "image",
+              "presenter.image")
+        .as_pymongo()
+    }
+    known = set(ImageRendition.objects.distinct("image_id"))
+    sources = {d["url"]: d for d in ImageSource.iterRaw(
+        only=("url", "image_id", "etag", "last_modified"))}
+    counts = {} if counts is None else counts
+    counts.update(created=0, updated=0, unchanged=0, deleted=0, invalid=0)
+
+    def invalid(page_id, err):
+        app.logger.warning(f"Invalid Club Event {page_id} from Notion, "
+                           "keeping the previous version")
+        app.logger.info(err)
+        counts["invalid"] += 1
+
+    staged = []
+    renditions_staged = {}
+    sources_staged = {}
+
+    def stage(page_id, event, downloads):
+        try:
+            image_ids = []
+            for image in (d.result() for d in downloads):
+                if image is None:
+                    image_ids.append(None)
+                    continue
+                iid, new_renditions, source = image
+                if new_renditions:
+                    renditions_staged.setdefault(iid, new_renditions)
+                if source:
+                    sources_staged[source["url"]] = source
+                image_ids.append(iid)
+            previous = edited.get(page_id)
+            staged.append((page_id,
+                           _stage_event(event, previous, started,
+                                        *image_ids),
+                           previous))
+        except _PAGE_ERRORS as err:
+            invalid(page_id, err)
+
+    def flush():
+        """The renditions are stored before the events that use them"""
+        _store_renditions(renditions_staged, known)
+        renditions_staged.clear()
+        _store_sources(sources_staged)
+        sources_staged.clear()
+
+        errors = _write_events(staged)
+        for i, (page_id, _, previous) in enumerate(staged):
+            if i in errors:
+                invalid(page_id, errors[i])
+                continue
+            counts["updated" if previous else "created"] += 1
+            if previous:
+                _delete_legacy_images(previous)
+        staged.clear()
+
+    def known_source(url):
+        """Only images that still have renditions can be reused"""
+        source = sources.get(_source_url(url)) if url else None
+        return source if source and source["image_id"] in known else None
+
+    seen = set()
+    in_flight = deque()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for batch in batches:
+            for page in batch:
+                seen.add(page["id"])
+                if _unchanged(edited.get(page["id"]), page):
+                    counts["unchanged"] += 1
+                    continue
+
+                try:
+                    event = clean_notion(page)
+                except _PAGE_ERRORS as err:
+                    invalid(page["id"], err)
+                    continue
+
+                downloads = [
+                    pool.submit(_fetch_image, session, url, timeout,
+                                renditions, known, known_source(url))
+                    for url in (event["image"], event["presenter"]["image"])
+                ]
+                in_flight.append((page["id"], event, downloads))
+                if len(in_flight) >= 2 * concurrency:
+                    stage(*in_flight.popleft())
+
+            while in_flight:
+                stage(*in_flight.popleft())
+            flush()
+
+    """Events of removed pages, and those from before events were synced"""
+    removed = ClubEvent.objects(notion_id__nin=list(seen))
+    images = [
+        image
+        for ce in removed.only("image", "presenter")
+        for image in (ce.image, ce.presenter and ce.presenter.image)
+        if image
+    ]
+    counts["deleted"] = removed.delete()
+    for image in images:
+        image.delete()
+
+    if any(counts[c] for c in ("created", "updated", "deleted", "invalid")):
+        _collect_renditions()
+
+    return counts
+
+
+"""The lock that keeps a single refresh running at a time"""
+REFRESH_LOCK = "refresh_notion_clubevents"
+
+
+def _extending_lock(batches, owner: str, ttl: float):
+    """Extends the refresh lock as each batch of pages arrives"""
+    for batch in batches:
+        extend_lock(REFRESH_LOCK, owner, ttl)
+        yield batch
+
+
+@celery.task(bind=True, ignore_result=True, acks_late=True)
+def refresh_notion_clubevents(self):
+    """
+    Runs unless another refresh holds REFRESH_LOCK, e.g. one started by
+    the schedule while an admin's is running. The endpoint takes the
+    lock for the job it queues, so that job runs.
+    """
     with app.app_context():
+        job_id = self.request.id or str(uuid4())
+        ttl = app.config["NOTION_REFRESH_LOCK_SECONDS"]
+        taken, lock = acquire_lock(REFRESH_LOCK, job_id, ttl)
+        if not taken:
+            app.logger.info(f"Club Event refresh {lock['owner']} is "
+                            f"{lock['status']}, skipped {job_id}")
+            return
+
+        try:
+            _refresh(job_id, ttl)
+        finally:
+            release_lock(REFRESH_LOCK, job_id)
+
+
+def _refresh(job_id: str, ttl: float):
+    start = time.perf_counter()
+    counts = {}
+    try:
+        with http_session() as session:
+            batches = _extending_lock(iter_notion_pages(session), job_id, ttl)
+            sync_clubevents(batches, session, counts)
+    except (requests.RequestException, ValueError) as err:
+        app.logger.warning("Unable to query Notion, stopped the refresh "
+                           "before deleting any event!")
+        app.logger.info(err)
+        return
+    finally:
+        """
+        The batches written before a failure are only served once they're
+        in a snapshot, and the next refresh skips them as unchanged
+        """
+        if any(counts.get(c) for c in ("created", "updated", "deleted")) \
+                or not ClubEventSnapshot.objects.count():
+            build_snapshot()
 
-        def clean_notion(r: dict) -> dict:
-            p = r["properties"]
-
-            def fix_date(d: str) -> datetime:
-                if not d:
-                    return None
-                return dateutil.parser.parse(d)
-
-            start_date = fix_date(p["Date"]["date"]["start"])
-            end_date = fix_date(p["Date"]["date"]["end"])
-            if end_date is None:
-                end_date = start_date + timedelta(hours=1)
-
-            presenterImage = p["Presenter Image"]["files"]
-            presenterImage = ("" if not presenterImage
-                              else presenterImage[0]["file"]["url"])
-            eventImage = p["Image"]["files"]
-            eventImage = ("" if not eventImage
-                          else eventImage[0]["file"]["url"])
-
-            return {
-                "name": p["Name"]["title"][0]["plain_text"],
-                "tags": tuple(
-                    map(lambda t: t["name"], p["Tags"]["multi_select"])
-                ),
-                "presenter": {
-                    "name": p["Presenter"]["rich_text"][0]["plain_text"],
-                    "image": presenterImage
-                },
-                "start": start_date,
-                "end": end_date,
-                "description": p["Description"]["rich_text"][0]["plain_text"],
-                "location": p["Location"]["rich_text"][0]["plain_text"],
-                "image": eventImage
-            }
-
-        ClubEvent.drop_collection()
-
-        res = requests.post(
-            app.config.get("NOTION_API_URI")
-            + f"/databases/{app.config.get('NOTION_DB_ID')}/query",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {app.config.get('NOTION_TOKEN')}",
-                "Notion-Version": app.config.get("NOTION_VERSION")
-            },
-            json={
-                "filter": {
-                    "and": [
-                        {
-                            "property": "Name",
-                            "text": {"is_not_empty": True}
-                        },
-                        {
-                            "property": "Tags",
-                            "multi_select": {"is_not_empty": True}
-                        },
-                        {
-                            "property": "Presenter",
-                            "text": {"is_not_empty": True}
-                        },
-                        {
-                            "property": "Date",
-                            "date": {"is_not_empty": True}
-                        },
-                        {
-                            "property": "Location",
-                            "text": {"is_not_empty": True}
-                        },
-                        {
-                            "property": "Description",
-                            "text": {"is_not_empty": True}
-                        }
-                    ]
-                }
-            }
-        )
-
-        raw_data = res.json().get("results", [])
-
-        data = map(clean_notion, raw_data)
-
-        for event in data:
-            try:
-                if event["image"]:
-                    image = requests.get(event["image"], allow_redirects=True)
-                else:
-                    image = None
-                if event["presenter"]["image"]:
-                    presenter_image = requests.get(event["presenter"]["image"],
-                                                   allow_redirects=True)
-                else:
-                    presenter_image = None
-
-                del event["image"]
-                del event["presenter"]["image"]
-
-                ce = ClubEvent(**event)
-
-                if image is not None:
-                    ce.image.put(
-                        BytesIO(image.content),
-                        content_type=image.headers.get("content-type")
-                    )
-
-                if presenter_image is not None:
-                    p_img_type = presenter_image.headers.get("content-type")
-                    ce.presenter.image.put(
-                        BytesIO(presenter_image.content),
-                        content_type=p_img_type
-                    )
-
-                ce.save()
-
-            except ValidationError as err:
-                app.logger.warning(
-                    "Invalid Club Event(s) from Notion, did not refresh!"
-                )
-                app.logger.info(err)
-            else:
-                app.logger.info(
-                    "Club Event(s) grabbed from Notion, refresh successfull!"
-                )
+    app.logger.info(
+        "Club Event(s) synced from Notion: "
+        + ", ".join(f"{n} {outcome}" for outcome, n in counts.items())
+        + f" in {time.perf_counter() - start:.1f}s"
+    )
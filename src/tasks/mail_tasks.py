@@ -6,21 +6,284 @@
     Functions:
 
         send_async_email()
+        drain_email_outbox()
+        render_email(template_id, hacker, context) -> dict
+        warm_email_templates()
 
+    Variables:
+
+        EMAIL_TEMPLATES
+
+"""
+import time
+from datetime import datetime
+from email.utils import parseaddr
+from smtplib import (
+    SMTPException,
+    SMTPRecipientsRefused,
+    SMTPSenderRefused,
+    SMTPDataError,
+    SMTPNotSupportedError
+)
+from flask import render_template
+from flask_mail import Message, BadHeaderError
+from celery.signals import worker_init
+import dateutil.parser
+from src import app, celery, mail
+from src.common.rate_limit import get_mail_rate_limiter
+
+"""
+Emails that can be sent by id. Each one renders ``<template>.txt`` and
+``<template>.html`` with the hacker and the message's context, ``dates``
+are sent as ISO strings and parsed back before rendering.
 """
-from flask_mail import Message
-from src import celery, mail
+EMAIL_TEMPLATES = {
+    "hacker_acceptance": {
+        "subject": "Knight Hacks - You're in!",
+        "template": "emails/hacker_acceptance",
+        "dates": ("deadline",)
+    },
+    "hacker_confirmation_success": {
+        "subject": "Knight Hacks - Thank you for Confirming!",
+        "template": "emails/hacker_confirmation_success",
+        "dates": ()
+    }
+}
+
+
+"""Errors that only concern one message, the connection is still usable"""
+_MESSAGE_ERRORS = (
+    SMTPRecipientsRefused,
+    SMTPSenderRefused,
+    SMTPDataError,
+    SMTPNotSupportedError,
+    BadHeaderError,
+    AssertionError
+)
+
+
+def _message(subject, recipient, text_body, html_body,
+             msg_id: str = None) -> Message:
+    msg = Message(subject=subject, recipients=[recipient])
+    msg.body = text_body
+    msg.html = html_body
+    if msg_id:
+        msg.msgId = msg_id
+    return msg
+
+
+def _msg_id(key: str) -> str:
+    """A Message-ID that stays the same when an email is retried"""
+    _, sender = parseaddr(app.config.get("MAIL_DEFAULT_SENDER") or "")
+    domain = sender.rpartition("@")[2] or "knighthacks.org"
+    return f"<{key.replace(':', '.')}@{domain}>"
+
+
+def _is_message_error(e: Exception) -> bool:
+    """
+    True if only this message failed. A 421 means the server closed the
+    connection, so the message is retried on a new one.
+    """
+    if not isinstance(e, _MESSAGE_ERRORS):
+        return False
+    if isinstance(e, SMTPRecipientsRefused):
+        return all(code != 421 for code, _ in e.recipients.values())
+    return getattr(e, "smtp_code", None) != 421
+
+
+def _sending_enabled() -> bool:
+    return not app.config.get("DEBUG") and not app.config.get("TESTING")
+
+
+def _send(subject, recipient, text_body, html_body):
+    msg = _message(subject, recipient, text_body, html_body)
+
+    if _sending_enabled():
+        limiter = get_mail_rate_limiter()
+        if limiter is not None:
+            limiter.acquire()
+        mail.send(msg)  # pragma: no cover
+
+
+def _open_connection():
+    conn = mail.connect()
+    conn.__enter__()
+    return conn
+
+
+def _close_connection(conn):
+    try:
+        conn.__exit__(None, None, None)
+    except (SMTPException, OSError):
+        pass
+
 
+def _send_messages(messages: list, statuses: list = None,
+                   before_send=None) -> list:
+    """
+    Sends ``messages`` over a single SMTP session and returns the status
+    of each. A dropped connection is reopened once per message, if it
+    can't be reopened the remaining messages fail with the same error.
 
-@celery.task
+    The statuses are appended to ``statuses`` as the messages are sent,
+    so a caller still has them if this raises part way. ``before_send``
+    is called with the seconds the rate limit waits before each message.
+    """
+    statuses = [] if statuses is None else statuses
+    if not _sending_enabled():
+        statuses.extend(["suppressed"] * len(messages))
+        return statuses
+
+    limiter = get_mail_rate_limiter()
+    conn = None
+    try:
+        for i, msg in enumerate(messages):
+            wait = limiter.reserve() if limiter is not None else 0.0
+            if before_send is not None:
+                before_send(wait)
+            if wait:
+                time.sleep(wait)
+            for attempt in range(2):
+                fresh = conn is None
+                try:
+                    if conn is None:
+                        conn = _open_connection()
+                    conn.send(msg)
+                    statuses.append("sent")
+                    break
+                except (SMTPException, OSError, *_MESSAGE_ERRORS) as e:
+                    if _is_message_error(e):
+                        app.logger.warning(f"Unable to send email to "
+                                           f"{msg.recipients}: {e!r}")
+                        statuses.append(f"error: {e!r}")
+                        break
+                    app.logger.warning(f"SMTP connection failed: {e!r}")
+                    if conn is not None:
+                        _close_connection(conn)
+                        conn = None
+                    if fresh or attempt:
+                        failed = len(messages) - i
+                        statuses.extend([f"error: {e!r}"] * failed)
+                        return statuses
+    finally:
+        if conn is not None:
+            _close_connection(conn)
+
+    return statuses
+
+
+@celery.task(ignore_result=True)
 def send_async_email(subject, recipient, text_body, html_body):
     """Sends an Email"""
-    from flask import current_app as app
     with app.app_context():
-        msg = Message(subject=subject, recipients=[recipient])
-        msg.body = text_body
-        msg.html = html_body
+        _send(subject, recipient, text_body, html_body)
+
+
+def render_email(template_id: str, hacker, context: dict = None) -> dict:
+    """Renders the subject, text and html bodies of an email"""
+    email = EMAIL_TEMPLATES[template_id]
+
+    context = dict(context or {})
+    for key in email["dates"]:
+        if isinstance(context.get(key), str):
+            context[key] = dateutil.parser.isoparse(context[key])
+
+    return dict(
+        subject=email["subject"],
+        recipient=hacker.email,
+        text_body=render_template(email["template"] + ".txt",
+                                  hacker=hacker, **context),
+        html_body=render_template(email["template"] + ".html",
+                                  hacker=hacker, **context))
+
+
+@celery.task(ignore_result=True, acks_late=True)
+def drain_email_outbox():
+    """
+    Sends the due emails of the outbox in batches of ``MAIL_BATCH_SIZE``
+    over a single SMTP session, until none are left. If some were put
+    back for a retry, drains again once the first of them is due.
+
+    The message is acknowledged once the drain is done, if the worker
+    dies it's redelivered and the leases keep emails from being sent
+    twice. A batch's lease is extended before it could run out while
+    waiting on the rate limit, which all workers share.
+
+    Each email's Message-ID is derived from its idempotency key, so a
+    retry of an email that did go out can be recognized as a duplicate.
+    """
+    from src.common.outbox import (
+        claim_batch,
+        extend_lease,
+        record_results,
+        next_due
+    )
+    from src.models.hacker import Hacker
 
-        if not app.config.get("DEBUG") and (
-                not app.config.get("TESTING")):
-            mail.send(msg)  # pragma: no cover
+    lease = app.config["MAIL_OUTBOX_LEASE_SECONDS"]
+
+    retried = False
+    while True:
+        claim, docs = claim_batch(app.config["MAIL_BATCH_SIZE"])
+        if not docs:
+            break
+
+        hackers = {h.id: h for h in Hacker.objects(
+            id__in=list({d["hacker"] for d in docs}))}
+
+        results, pending = [], []
+        for doc in docs:
+            hacker = hackers.get(doc["hacker"])
+            if hacker is None:
+                results.append((doc, "not_found"))
+                continue
+            try:
+                email = render_email(doc["template"], hacker, doc["context"])
+                pending.append(
+                    (doc, _message(**email, msg_id=_msg_id(doc["key"]))))
+            except Exception as e:
+                app.logger.exception(f"Unable to render {doc['key']}")
+                results.append((doc, f"error: {e!r}"))
+
+        renewed = time.monotonic()
+
+        def keep_claim(wait):
+            """Keeps at least half the lease ahead of the next message"""
+            nonlocal renewed
+            now = time.monotonic()
+            if now + wait - renewed < lease / 2:
+                return
+            if not extend_lease(claim, wait):
+                raise RuntimeError(f"Lost the outbox claim {claim}, "
+                                   "its lease ran out")
+            renewed = now + wait
+
+        statuses = []
+        try:
+            _send_messages([msg for _, msg in pending], statuses,
+                           before_send=keep_claim)
+        finally:
+            """Unsent emails are claimed again once the lease runs out"""
+            results.extend((doc, status)
+                           for (doc, _), status in zip(pending, statuses))
+            record_results(claim, results)
+
+        retried = retried or any(s not in ("sent", "suppressed")
+                                 for _, s in results)
+
+    due = next_due() if retried else None
+    if due is not None:
+        countdown = max(0, (due - datetime.utcnow()).total_seconds())
+        drain_email_outbox.apply_async(countdown=countdown)
+
+
+@worker_init.connect
+def warm_email_templates(*args, **kwargs):
+    """
+    Compiles the email templates before the first task needs them. Sent
+    once per worker for every pool, prefork children inherit the cache.
+    """
+    with app.app_context():
+        for email in EMAIL_TEMPLATES.values():
+            for ext in (".txt", ".html"):
+                app.jinja_env.get_template(email["template"] + ext)
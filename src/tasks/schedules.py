@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+    src.tasks.schedules
+    ~~~~~~~~~~~~~~~~~~~
+    The schedule of the maintenance tasks in ``CELERY_PERIODIC_TASKS``,
+    run by src.tasks.beat.
+
+    Each task runs every ``every`` seconds plus a random delay of up to
+    ``jitter`` seconds, so restarts and deploys don't line every run up
+    at once.
+
+    Classes:
+
+        jittered
+
+    Functions:
+
+        make_beat_schedule(config) -> dict
+
+"""
+import random
+from datetime import datetime, timedelta
+from celery.schedules import schedule
+
+
+class jittered(schedule):
+    """
+    A schedule of every ``run_every`` plus up to ``jitter`` seconds. The
+    delay is drawn from the last run, so it stays the same until the
+    next one and across restarts.
+    """
+
+    def __init__(self, run_every=None, jitter: float = 0, **kwargs):
+        super().__init__(run_every, **kwargs)
+        self.jitter = jitter
+
+    def delay(self, last_run_at: datetime) -> timedelta:
+        seed = f"{last_run_at.timestamp()}:{self.seconds}"
+        return timedelta(seconds=random.Random(seed).uniform(0, self.jitter))
+
+    def remaining_estimate(self, last_run_at: datetime) -> timedelta:
+        return super().remaining_estimate(last_run_at
+                                          + self.delay(last_run_at))
+
+    def __repr__(self):
+        return f"<jittered: {self.human_seconds} +{self.jitter}s>"
+
+    def __reduce__(self):
+        return self.__class__, (self.run_every, self.jitter)
+
+
+def make_beat_schedule(config) -> dict:
+    """The ``beat_schedule`` of ``CELERY_PERIODIC_TASKS``"""
+    return {
+        name: {
+            "task": task["task"],
+            "schedule": jittered(timedelta(seconds=task["every"]),
+                                 task.get("jitter", 0))
+        }
+        for name, task in config["CELERY_PERIODIC_TASKS"].items()
+    }
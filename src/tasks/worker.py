@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+    src.tasks.worker
+    ~~~~~~~~~~~~~~~~
+    Starts a Celery worker that consumes the given queues with the
+    concurrency ``CELERY_QUEUE_CONCURRENCY`` sets for them, so each
+    deployment only needs to name its queues::
+
+        python -m src.tasks.worker mail
+        python -m src.tasks.worker notion celery -P gevent
+
+    Any other arguments are passed on to ``celery worker``.
+
+    Functions:
+
+        worker_argv(queues, config, extra) -> list
+        main(argv)
+
+"""
+import sys
+
+
+def worker_argv(queues: list, config, extra: list = ()) -> list:
+    """The ``celery worker`` arguments for ``queues``"""
+    concurrency = config["CELERY_QUEUE_CONCURRENCY"]
+    unknown = [q for q in queues if q not in concurrency]
+    if not queues or unknown:
+        raise ValueError(f"Unknown queue(s) {', '.join(unknown)}, expected "
+                         f"some of {', '.join(concurrency)}")
+
+    return [
+        "worker",
+        "-Q", ",".join(queues),
+        "-c", str(sum(concurrency[q] for q in queues)),
+        "-n", f"{'-'.join(queues)}@%h",
+        "-l", "info",
+        *extra
+    ]
+
+
+def main(argv: list = None):
+    argv = sys.argv[1:] if argv is None else argv
+    """Only the leading arguments are queues, the rest are options"""
+    i = next((i for i, a in enumerate(argv) if a.startswith("-")), len(argv))
+    queues, extra = argv[:i], argv[i:]
+
+    from src import app, celery
+    celery.worker_main(worker_argv(queues, app.config, extra))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# flake8: noqa
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+from src.common.caching import cached_file, gridfs_validators
+from tests.base import BaseTestCase
+
+MODIFIED = datetime(2021, 10, 1, 12, 0, 0)
+
+
+class TestCachedFile(BaseTestCase):
+    """Tests for the conditional file responses"""
+
+    def _respond(self, path="/", headers=None, **kwargs):
+        load = mock.Mock(return_value=b"file")
+        with self.app.test_request_context(path, headers=headers or {}):
+            res = cached_file(load, "abc123", MODIFIED,
+                              content_type="image/png", **kwargs)
+        return res, load
+
+    def test_cached_file(self):
+        res, load = self._respond()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_data(), b"file")
+        self.assertEqual(res.headers["Content-Type"], "image/png")
+        self.assertEqual(res.headers["ETag"], '"abc123"')
+        self.assertEqual(res.headers["Last-Modified"],
+                         "Fri, 01 Oct 2021 12:00:00 GMT")
+        self.assertTrue(res.cache_control.public)
+        self.assertTrue(res.cache_control.no_cache)
+        load.assert_called_once()
+
+    def test_cached_file_if_none_match(self):
+        res, load = self._respond(headers={"If-None-Match": '"abc123"'})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.get_data(), b"")
+        self.assertEqual(res.headers["ETag"], '"abc123"')
+        load.assert_not_called()
+
+    def test_cached_file_if_none_match_changed(self):
+        """If-None-Match wins over a matching If-Modified-Since"""
+        res, load = self._respond(headers={
+            "If-None-Match": '"old"',
+            "If-Modified-Since": "Fri, 01 Oct 2021 12:00:00 GMT"
+        })
+
+        self.assertEqual(res.status_code, 200)
+        load.assert_called_once()
+
+    def test_cached_file_if_modified_since(self):
+        res, load = self._respond(headers={
+            "If-Modified-Since": "Sat, 02 Oct 2021 00:00:00 GMT"})
+
+        self.assertEqual(res.status_code, 304)
+        load.assert_not_called()
+
+        res, load = self._respond(headers={
+            "If-Modified-Since": "Thu, 30 Sep 2021 00:00:00 GMT"})
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_cached_file_versioned(self):
+        res, _ = self._respond("/?v=abc", version="abc123")
+
+        self.assertTrue(res.cache_control.immutable)
+        self.assertEqual(res.cache_control.max_age,
+                         self.app.config["CACHE_IMMUTABLE_MAX_AGE"])
+        self.assertFalse(res.cache_control.no_cache)
+
+    def test_cached_file_stale_version(self):
+        res, _ = self._respond("/?v=def", version="abc123")
+
+        self.assertFalse(res.cache_control.immutable)
+        self.assertTrue(res.cache_control.no_cache)
+
+    def test_cached_file_private(self):
+        res, _ = self._respond(public=False)
+
+        self.assertTrue(res.cache_control.private)
+        self.assertFalse(res.cache_control.public)
+
+    def test_gridfs_validators(self):
+        grid_out = SimpleNamespace(_id="id", md5="d41d8cd9",
+                                   upload_date=MODIFIED)
+        proxy = mock.Mock(get=mock.Mock(return_value=grid_out))
+
+        self.assertEqual(gridfs_validators(proxy), ("d41d8cd9", MODIFIED))
+
+        grid_out.md5 = None
+        self.assertEqual(gridfs_validators(proxy), ("id", MODIFIED))
+
+    def test_gridfs_validators_no_file(self):
+        proxy = mock.Mock(get=mock.Mock(return_value=None))
+
+        self.assertEqual(gridfs_validators(proxy), (None, None))
+        self.assertEqual(gridfs_validators(None), (None, None))
@@ -0,0 +1,90 @@
+# flake8: noqa
+from datetime import datetime
+from unittest import mock
+from src.common.club_event_snapshot import (
+    build_entries,
+    build_snapshot,
+    current_entries
+)
+from src.models.club_event import ClubEvent, ClubEventSnapshot
+from tests.base import BaseTestCase
+
+
+class TestClubEventSnapshot(BaseTestCase):
+    """Tests for the club events snapshot"""
+
+    def setUp(self):
+        self.app.extensions.pop("club_event_snapshot", None)
+
+    def _create_event(self, name, **kwargs):
+        kwargs.setdefault("presenter", {"name": "Foo Bar"})
+        return ClubEvent.createOne(start=datetime(2021, 10, 20, 19),
+                                   end=datetime(2021, 10, 20, 20),
+                                   name=name, **kwargs)
+
+    def test_build_entries(self):
+        self._create_event("with image", image_id="abc",
+                           presenter={"name": "Foo Bar", "image_id": "def"})
+        self._create_event("without image")
+
+        entries = build_entries()
+
+        self.assertEqual([e["event"]["name"] for e in entries],
+                         ["with image", "without image"])
+        self.assertEqual((entries[0]["image_v"],
+                          entries[0]["presenter_image_v"]), ("abc", "def"))
+        self.assertEqual((entries[1]["image_v"],
+                          entries[1]["presenter_image_v"]), (None, None))
+        self.assertIsNone(entries[1]["event"]["image"])
+
+    def test_build_snapshot_keeps_the_latest(self):
+        self._create_event("first")
+        old = build_snapshot()
+        self._create_event("second")
+
+        latest = build_snapshot()
+
+        self.assertEqual(list(ClubEventSnapshot.objects.scalar("id")),
+                         [latest.id])
+        self.assertNotEqual(old.id, latest.id)
+        self.assertEqual(len(latest.events), 2)
+
+    def test_current_entries_without_snapshot(self):
+        self._create_event("first")
+
+        self.assertEqual([e["event"]["name"] for e in current_entries()],
+                         ["first"])
+
+    def test_current_entries_from_snapshot(self):
+        self._create_event("first")
+        build_snapshot()
+        self._create_event("second")
+
+        """Events only change with the next snapshot"""
+        self.assertEqual([e["event"]["name"] for e in current_entries()],
+                         ["first"])
+
+        build_snapshot()
+        self.assertEqual(len(current_entries()), 2)
+
+    def test_current_entries_process_cache(self):
+        self.app.config["CLUB_EVENTS_SNAPSHOT_CACHE_SECONDS"] = 60
+        self._create_event("first")
+        build_snapshot()
+        current_entries()
+
+        with mock.patch.object(ClubEventSnapshot, "iterRaw") as iter_raw:
+            entries = current_entries()
+
+        iter_raw.assert_not_called()
+        self.assertEqual(len(entries), 1)
+
+    def test_current_entries_checks_the_version(self):
+        self._create_event("first")
+        build_snapshot()
+        current_entries()
+
+        with mock.patch.object(ClubEventSnapshot, "findRaw") as find_raw:
+            self.assertEqual(len(current_entries()), 1)
+
+        find_raw.assert_not_called()
@@ -0,0 +1,93 @@
+# flake8: noqa
+import os
+import sys
+import subprocess
+from src import app
+from src.common.concurrency import check_concurrency_mode
+from tests.base import BaseTestCase
+
+"""Runs N slow simulated Mongo calls from greenlets and prints the wall time.
+Each call is a round trip to a local TCP server that answers after DELAY."""
+SLOW_MONGO_SCRIPT = """
+import time
+import src
+import gevent
+import socket
+import socketserver
+import threading
+
+N, DELAY = 5, 0.2
+
+
+class SlowMongo(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.recv(16)
+        time.sleep(DELAY)
+        self.request.sendall(b"ok")
+
+
+server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SlowMongo)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def find_one():
+    with socket.create_connection(server.server_address) as conn:
+        conn.sendall(b"find")
+        return conn.recv(16)
+
+
+start = time.monotonic()
+jobs = [gevent.spawn(find_one) for _ in range(N)]
+gevent.joinall(jobs, raise_error=True)
+print(time.monotonic() - start)
+"""
+
+
+class TestConcurrencyMode(BaseTestCase):
+    """Tests for the Concurrency Mode"""
+
+    def run_slow_calls(self, mode: str) -> float:
+        env = dict(os.environ,
+                   APP_SETTINGS="src.config.TestingConfig",
+                   CONCURRENCY_MODE=mode)
+        out = subprocess.run(
+            [sys.executable, "-c", SLOW_MONGO_SCRIPT],
+            env=env,
+            capture_output=True,
+            check=True,
+            text=True,
+            timeout=60,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        )
+        return float(out.stdout.strip().splitlines()[-1])
+
+    def test_gevent_mode_overlaps_slow_calls(self):
+        elapsed = self.run_slow_calls("gevent")
+
+        """5 calls of 0.2s each, overlapping they take ~0.2s"""
+        self.assertLess(elapsed, 0.5)
+
+    def test_sync_mode_serializes_slow_calls(self):
+        elapsed = self.run_slow_calls("sync")
+
+        self.assertGreaterEqual(elapsed, 1.0)
+
+    def test_check_logs_mode(self):
+        with self.assertLogs(app.logger, "INFO") as logs:
+            mode = check_concurrency_mode(app)
+
+        self.assertEqual(mode, "sync")
+        self.assertIn("Concurrency mode: sync", logs.output[-1])
+
+    def test_check_gevent_without_patching(self):
+        app.config["CONCURRENCY_MODE"] = "gevent"
+
+        with self.assertRaises(RuntimeError):
+            check_concurrency_mode(app)
+
+    def test_check_invalid_mode(self):
+        app.config["CONCURRENCY_MODE"] = "fibers"
+
+        with self.assertRaises(RuntimeError):
+            check_concurrency_mode(app)
@@ -0,0 +1,64 @@
+# flake8: noqa
+from io import BytesIO
+from PIL import Image
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import BadRequest
+from src.common.images import (
+    make_renditions,
+    parse_size,
+    pick_format,
+    pick_rendition
+)
+from tests.base import BaseTestCase
+
+SIZES = {"thumbnail": 20, "small": 160, "large": 500}
+
+
+class TestImages(BaseTestCase):
+    """Tests for the image renditions"""
+
+    def test_make_renditions(self):
+        buf = BytesIO()
+        Image.new("RGBA", (400, 800), (255, 0, 0, 0)).save(buf, "PNG")
+
+        renditions = make_renditions(buf.getvalue(), SIZES, ("webp", "jpeg"))
+
+        self.assertEqual([(r["size"], r["format"]) for r in renditions], [
+            ("large", "webp"), ("large", "jpeg"),
+            ("small", "webp"), ("small", "jpeg"),
+            ("thumbnail", "webp"), ("thumbnail", "jpeg")
+        ])
+        self.assertEqual((renditions[0]["width"], renditions[0]["height"]),
+                         (250, 500))
+        with Image.open(BytesIO(renditions[0]["data"])) as img:
+            self.assertEqual(img.mode, "RGBA")
+        """JPEG has no alpha, transparent pixels turn white"""
+        with Image.open(BytesIO(renditions[1]["data"])) as img:
+            self.assertEqual(img.mode, "RGB")
+            self.assertGreater(min(img.getpixel((10, 10))), 240)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size(None, SIZES), 500)
+        self.assertEqual(parse_size("small", SIZES), 160)
+        self.assertEqual(parse_size("100", SIZES), 100)
+        with self.assertRaises(BadRequest):
+            parse_size("0", SIZES)
+
+    def test_pick_format(self):
+        formats = ("webp", "jpeg")
+
+        self.assertEqual(pick_format("jpeg", MIMEAccept(), formats), "jpeg")
+        self.assertEqual(pick_format(
+            None, MIMEAccept([("image/webp", 1)]), formats), "webp")
+        self.assertEqual(pick_format(
+            None, MIMEAccept([("*/*", 1), ("image/webp", 0)]), formats),
+            "jpeg")
+        with self.assertRaises(BadRequest):
+            pick_format("gif", MIMEAccept(), formats)
+
+    def test_pick_rendition(self):
+        renditions = [{"width": w, "height": w // 2} for w in (500, 20, 160)]
+
+        self.assertEqual(pick_rendition(renditions, 100)["width"], 160)
+        self.assertEqual(pick_rendition(renditions, 160)["width"], 160)
+        self.assertEqual(pick_rendition(renditions, 900)["width"], 500)
@@ -0,0 +1,120 @@
+# flake8: noqa
+import json
+from datetime import datetime, date
+from unittest import mock
+from bson.objectid import ObjectId
+from src.common.json import JSONEncoderBase, JSONEncoderFast
+from src.models.hacker import Hacker
+from tests.base import BaseTestCase
+
+
+class TestJSONEncoderFast(BaseTestCase):
+    """Tests that the fast encoder matches the base encoder"""
+
+    def assertSameOutput(self, obj, **kwargs):
+        for options in ({"separators": (",", ":")},
+                        {"indent": 2, "separators": (",", ": ")},
+                        {"indent": 2, "separators": (", ", ": ")},
+                        {}):
+            for sort_keys in (True, False):
+                for ensure_ascii in (True, False):
+                    kw = dict(options, sort_keys=sort_keys,
+                              ensure_ascii=ensure_ascii, **kwargs)
+                    self.assertEqual(
+                        json.dumps(obj, cls=JSONEncoderFast, **kw),
+                        json.dumps(obj, cls=JSONEncoderBase, **kw),
+                        kw
+                    )
+
+    def test_hackers_queryset(self):
+        for i in range(3):
+            Hacker.createOne(
+                email=f"foobar{i}@email.com",
+                first_name="Zoë 😀",
+                birthday=datetime(2000, 1, 2, 3, 4, 5, 6789),
+                what_learn=["python", "mongo"],
+                mlh={
+                    "mlh_code_of_conduct": True,
+                    "mlh_privacy_and_contest_terms": True
+                }
+            )
+
+        hackers = Hacker.objects().exclude(*Hacker.private_fields)
+
+        self.assertSameOutput({"hackers": hackers, "status": "success"})
+
+    def test_documents_and_ids(self):
+        hacker = Hacker.createOne(email="foobar@email.com")
+
+        self.assertSameOutput([hacker, ObjectId(), {"id": hacker.id}])
+
+    def test_dates(self):
+        self.assertSameOutput({
+            "datetime": datetime(2021, 11, 11, 9, 30),
+            "date": date(2021, 11, 11),
+            "nested": [{"d": datetime(2021, 1, 1, 0, 0, 0, 1)}]
+        })
+
+    def test_strings(self):
+        self.assertSameOutput({
+            "ascii": "plain",
+            "accents": "Zoë, José",
+            "emoji": "🚀 \U0001f600",
+            "control": "a\x00b\x01\n\t\r\x7f\b\f",
+            "separators": "  ",
+            "quotes": "\"\\/"
+        })
+
+    def test_ascii_control_characters(self):
+        self.assertSameOutput({"del": "a\x7fb", "nul": "\x00"})
+
+    def test_numbers(self):
+        self.assertSameOutput([0, -1, 2 ** 63, 2 ** 70, 0.1, 3.5, -0.0,
+                               1e16, 1e-5, 2.5e-07, 123456789.123, True,
+                               None])
+
+        """At the top level, where nothing follows the float"""
+        for number in (1e16, -1e16, 1e-5, -1e-5, 2.5e-07,
+                       1.7976931348623157e308, 5e-324, 0.5, 0.0, 3):
+            self.assertSameOutput(number)
+
+    def test_non_finite_floats(self):
+        hacker = Hacker.createOne(email="foobar@email.com")
+
+        self.assertSameOutput({"a": float("nan"), "b": None})
+        self.assertSameOutput([hacker, [float("inf")], -float("inf")])
+        for cls in (JSONEncoderBase, JSONEncoderFast):
+            with self.assertRaises(ValueError):
+                json.dumps([None, float("nan")], cls=cls, allow_nan=False)
+
+    def test_nulls_stay_on_fast_path(self):
+        obj = {"a": None, "b": [1.5, None], "d": datetime(2021, 1, 1)}
+        with mock.patch.object(JSONEncoderBase, "encode") as slow:
+            json.dumps(obj, cls=JSONEncoderFast, separators=(",", ":"))
+        slow.assert_not_called()
+
+    def test_timestamps_stay_on_fast_path(self):
+        obj = {"d": datetime(2021, 1, 1, 0, 0, 0, 12), "id": "5e3f0e5"}
+        with mock.patch.object(JSONEncoderBase, "encode") as slow:
+            json.dumps(obj, cls=JSONEncoderFast, separators=(",", ":"))
+        slow.assert_not_called()
+
+    def test_iterables(self):
+        self.assertSameOutput({"set": {1}, "tuple": (1, 2),
+                               "gen": range(3)})
+
+    def test_non_string_keys(self):
+        self.assertSameOutput({1: "a", 2: "b"})
+
+    def test_unserializable(self):
+        for cls in (JSONEncoderBase, JSONEncoderFast):
+            with self.assertRaises(TypeError):
+                json.dumps({"o": object()}, cls=cls)
+
+    def test_without_orjson(self):
+        with mock.patch("src.common.json.orjson", None):
+            self.assertSameOutput({"d": datetime(2021, 11, 11),
+                                   "s": "Zoë"})
+
+    def test_app_uses_fast_encoder(self):
+        self.assertIs(self.app.json_encoder, JSONEncoderFast)
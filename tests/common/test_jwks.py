@@ -0,0 +1,167 @@
+# flake8: noqa
+import json
+import threading
+import time
+from src import app
+from src.common.jwks import JWKSKeyStore
+from tests.base import BaseTestCase
+from tests.standins import SigningKey, jwks_standin
+
+
+class TestJWKSKeyStore(BaseTestCase):
+    """Tests for the JWKS Key Store"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = SigningKey("key-1")
+        cls.rotated_key = SigningKey("key-2")
+
+    def test_get_key_is_cached(self):
+        with jwks_standin(self.key) as server:
+            store = JWKSKeyStore(server.url + "/discovery/v2.0/keys")
+
+            for _ in range(5):
+                key = store.get_key("key-1")
+
+            self.assertEqual(key["kid"], "key-1")
+            self.assertEqual(key["n"], self.key.jwk["n"])
+            self.assertEqual(server.hits["/discovery/v2.0/keys"], 1)
+
+    def test_get_key_unknown_kid_refetches(self):
+        with jwks_standin(self.key) as server:
+            store = JWKSKeyStore(server.url + "/discovery/v2.0/keys",
+                                 min_refresh_interval=0)
+            store.get_key("key-1")
+
+            server.keys.append(self.rotated_key)
+
+            self.assertEqual(store.get_key("key-2")["kid"], "key-2")
+            self.assertEqual(server.hits["/discovery/v2.0/keys"], 2)
+
+    def test_get_key_unknown_kid_is_throttled(self):
+        with jwks_standin(self.key) as server:
+            store = JWKSKeyStore(server.url + "/discovery/v2.0/keys",
+                                 min_refresh_interval=3600)
+            store.get_key("key-1")
+
+            self.assertIsNone(store.get_key("not-a-key"))
+            self.assertEqual(server.hits["/discovery/v2.0/keys"], 1)
+
+    def test_get_key_refetches_after_ttl(self):
+        with jwks_standin(self.key) as server:
+            store = JWKSKeyStore(server.url + "/discovery/v2.0/keys", ttl=0)
+            store.get_key("key-1")
+            store.get_key("key-1")
+
+            self.assertEqual(server.hits["/discovery/v2.0/keys"], 2)
+
+    def test_get_key_keeps_stale_keys_if_refresh_fails(self):
+        with jwks_standin(self.key) as server:
+            store = JWKSKeyStore(server.url + "/discovery/v2.0/keys", ttl=0)
+            store.get_key("key-1")
+
+            store.url = server.url + "/missing/"
+
+            self.assertEqual(store.get_key("key-1")["kid"], "key-1")
+
+    def test_failed_refresh_backs_off(self):
+        with jwks_standin(self.key, delay=0.2) as server:
+            store = JWKSKeyStore(server.url + "/discovery/v2.0/keys", ttl=0,
+                                 min_refresh_interval=1)
+            store.get_key("key-1")
+            store.url = server.url + "/missing/"
+            results = []
+
+            def worker():
+                with app.app_context():
+                    results.append(store.get_key("key-1"))
+
+            threads = [threading.Thread(target=worker) for _ in range(5)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            results.append(store.get_key("key-1"))
+
+            self.assertTrue(all(k["kid"] == "key-1" for k in results))
+            self.assertEqual(server.hits["/missing/"], 1)
+
+            """Until the backoff ends"""
+            time.sleep(1)
+            store.get_key("key-1")
+            self.assertEqual(server.hits["/missing/"], 2)
+
+    def test_concurrent_refreshes_are_collapsed(self):
+        with jwks_standin(self.key, delay=0.2) as server:
+            store = JWKSKeyStore(server.url + "/discovery/v2.0/keys")
+            results = []
+
+            def worker():
+                with app.app_context():
+                    results.append(store.get_key("key-1"))
+
+            threads = [threading.Thread(target=worker) for _ in range(10)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            self.assertEqual(len(results), 10)
+            self.assertTrue(all(k["kid"] == "key-1" for k in results))
+            self.assertEqual(server.hits["/discovery/v2.0/keys"], 1)
+
+
+class TestAuthenticate(BaseTestCase):
+    """Tests for the authenticate decorator against a local JWKS"""
+
+    tenant_id = "00000000-0000-0000-0000-000000000000"
+    audience = "api://knighthacks-backend"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = SigningKey("key-1")
+
+    def setUp(self):
+        self.server = jwks_standin(self.key).__enter__()
+        app.extensions.pop("jwks", None)
+        app.extensions.pop("verified_tokens", None)
+        app.config.update(
+            TESTING=False,
+            AZURE_TENANT_ID=self.tenant_id,
+            AZURE_API_AUDIENCE=self.audience,
+            AZURE_JWKS_URL=self.server.url + "/discovery/v2.0/keys"
+        )
+
+    def tearDown(self):
+        super().tearDown()
+        self.server.__exit__(None, None, None)
+        app.extensions.pop("jwks", None)
+        app.extensions.pop("verified_tokens", None)
+        app.config.from_object("src.config.TestingConfig")
+
+    def test_authenticate_fetches_jwks_once(self):
+        token = self.key.sign(self.tenant_id, self.audience,
+                              roles=["Hacker_Read"])
+
+        for _ in range(3):
+            res = self.client.get(
+                "/api/auth/me",
+                headers=[("Authorization", f"Bearer {token}")]
+            )
+            self.assertEqual(res.status_code, 200)
+            data = json.loads(res.data.decode())
+            self.assertEqual(data["roles"], ["Hacker_Read"])
+
+        self.assertEqual(self.server.hits["/discovery/v2.0/keys"], 1)
+
+    def test_authenticate_unknown_key(self):
+        token = SigningKey("key-x").sign(self.tenant_id, self.audience)
+
+        res = self.client.get(
+            "/api/auth/me",
+            headers=[("Authorization", f"Bearer {token}")]
+        )
+
+        self.assertEqual(res.status_code, 401)
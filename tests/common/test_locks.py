@@ -0,0 +1,67 @@
+# flake8: noqa
+from datetime import datetime, timedelta
+from src.common.locks import (
+    acquire_lock,
+    current_lock,
+    extend_lock,
+    release_lock
+)
+from src.models.task_lock import TaskLock
+from tests.base import BaseTestCase
+
+
+class TestLocks(BaseTestCase):
+    """Tests for the locks shared between processes"""
+
+    def setUp(self):
+        """The unique name is dropped with the database between tests"""
+        TaskLock.ensure_indexes()
+
+    def test_acquire_lock(self):
+        taken, lock = acquire_lock("refresh", "job-1", 60, status="queued")
+
+        self.assertTrue(taken)
+        self.assertEqual((lock["owner"], lock["status"]), ("job-1", "queued"))
+        self.assertEqual(current_lock("refresh")["owner"], "job-1")
+
+    def test_held_by_another_owner(self):
+        acquire_lock("refresh", "job-1", 60)
+
+        taken, lock = acquire_lock("refresh", "job-2", 60)
+
+        self.assertFalse(taken)
+        self.assertEqual(lock["owner"], "job-1")
+        self.assertEqual(TaskLock.objects.count(), 1)
+
+    def test_owner_acquires_again(self):
+        acquire_lock("refresh", "job-1", 60, status="queued")
+
+        taken, lock = acquire_lock("refresh", "job-1", 60)
+
+        self.assertTrue(taken)
+        self.assertEqual(lock["status"], "running")
+
+    def test_expired_lock_is_free(self):
+        acquire_lock("refresh", "job-1", -1)
+
+        self.assertIsNone(current_lock("refresh"))
+        taken, lock = acquire_lock("refresh", "job-2", 60)
+
+        self.assertTrue(taken)
+        self.assertEqual(lock["owner"], "job-2")
+
+    def test_extend_lock(self):
+        acquire_lock("refresh", "job-1", 1)
+
+        self.assertTrue(extend_lock("refresh", "job-1", 600))
+        self.assertFalse(extend_lock("refresh", "job-2", 600))
+        self.assertGreater(current_lock("refresh")["expires"],
+                           datetime.utcnow() + timedelta(seconds=500))
+
+    def test_release_lock(self):
+        acquire_lock("refresh", "job-1", 60)
+
+        self.assertFalse(release_lock("refresh", "job-2"))
+        self.assertTrue(release_lock("refresh", "job-1"))
+        self.assertIsNone(current_lock("refresh"))
+        self.assertTrue(acquire_lock("refresh", "job-2", 60)[0])
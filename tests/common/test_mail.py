@@ -0,0 +1,65 @@
+# flake8: noqa
+from unittest import mock
+from src.common.mail import (
+    send_hacker_acceptance_email,
+    send_hacker_acceptance_emails
+)
+from src.models.email_outbox import EmailOutbox
+from src.models.hacker import Hacker
+from tests.base import BaseTestCase
+
+
+class TestSendHackerAcceptanceEmails(BaseTestCase):
+    """Tests for queuing the acceptance emails"""
+
+    def setUp(self):
+        self.app.config.update(TESTING=False, SEND_MAIL=True)
+        self.hackers = [
+            Hacker.createOne(
+                email=f"foobar{i}@email.com",
+                mlh=dict(
+                    mlh_code_of_conduct=True,
+                    mlh_privacy_and_contest_terms=True
+                )
+            )
+            for i in range(3)
+        ]
+
+    def test_single(self):
+        with mock.patch("src.common.mail.drain_email_outbox") as task:
+            send_hacker_acceptance_email(self.hackers[0])
+
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.key, f"hacker_acceptance:{self.hackers[0].id}")
+        self.assertEqual(email.status, "pending")
+        self.assertEqual(
+            email.context,
+            {"deadline": self.app.config["HACKER_CONFIRM_DEADLINE"]
+                .isoformat()})
+        task.delay.assert_called_once_with()
+
+    def test_deduplicates(self):
+        with mock.patch("src.common.mail.drain_email_outbox"):
+            send_hacker_acceptance_emails(self.hackers[:2])
+            status = send_hacker_acceptance_emails(self.hackers)
+
+        self.assertEqual(EmailOutbox.objects.count(), 3)
+        self.assertEqual(status["counts"]["pending"], 3)
+        self.assertIsNone(status["drain_seconds"])
+
+    def test_rate_limited_status(self):
+        self.app.extensions.pop("mail_rate_limit", None)
+        self.app.config.update(MAIL_RATE_LIMIT=2, MAIL_RATE_BURST=1)
+
+        with mock.patch("src.common.mail.drain_email_outbox"):
+            status = send_hacker_acceptance_emails(self.hackers)
+
+        self.app.extensions.pop("mail_rate_limit", None)
+
+        self.assertAlmostEqual(status["drain_seconds"], 1, places=1)
+
+    def test_no_hackers(self):
+        with mock.patch("src.common.mail.drain_email_outbox") as task:
+            self.assertIsNone(send_hacker_acceptance_emails([]))
+
+        task.delay.assert_not_called()
@@ -0,0 +1,97 @@
+# flake8: noqa
+from datetime import datetime, timedelta
+from bson import ObjectId
+from src.common.outbox import (
+    claim_batch,
+    enqueue_emails,
+    next_due,
+    outbox_status,
+    record_results
+)
+from src.models.email_outbox import EmailOutbox
+from src.models.hacker import Hacker
+from tests.base import BaseTestCase
+
+
+class TestOutbox(BaseTestCase):
+    """Tests for the email outbox"""
+
+    def setUp(self):
+        self.hackers = [Hacker(id=ObjectId(), email=f"foobar{i}@email.com")
+                        for i in range(3)]
+
+    def test_enqueue_once_per_template(self):
+        self.assertEqual(enqueue_emails("hacker_acceptance", self.hackers), 3)
+        self.assertEqual(enqueue_emails("hacker_acceptance", self.hackers), 0)
+        self.assertEqual(
+            enqueue_emails("hacker_confirmation_success", self.hackers[:1]), 1)
+
+        self.assertEqual(EmailOutbox.objects.count(), 4)
+
+    def test_claims_are_exclusive(self):
+        enqueue_emails("hacker_acceptance", self.hackers)
+
+        claim, docs = claim_batch(2)
+        other, rest = claim_batch(2)
+
+        self.assertEqual(len(docs), 2)
+        self.assertEqual(len(rest), 1)
+        self.assertNotEqual(claim, other)
+        self.assertEqual(claim_batch(2), (None, []))
+
+    def test_expired_lease_is_reclaimed(self):
+        enqueue_emails("hacker_acceptance", self.hackers[:1])
+        claim, docs = claim_batch(1)
+
+        EmailOutbox.objects.update(
+            lease_until=datetime.utcnow() - timedelta(seconds=1))
+        other, docs = claim_batch(1)
+
+        self.assertEqual(len(docs), 1)
+
+        """The results of the expired claim are ignored"""
+        record_results(claim, [(docs[0], "sent")])
+        self.assertEqual(EmailOutbox.objects.get().status, "sending")
+
+        record_results(other, [(docs[0], "sent")])
+        self.assertEqual(EmailOutbox.objects.get().status, "sent")
+
+    def test_backoff(self):
+        self.app.config.update(MAIL_OUTBOX_BACKOFF_SECONDS=10,
+                               MAIL_OUTBOX_MAX_ATTEMPTS=3)
+        enqueue_emails("hacker_acceptance", self.hackers[:1])
+
+        delays = []
+        for _ in range(3):
+            EmailOutbox.objects.update(next_attempt=datetime.utcnow())
+            claim, docs = claim_batch(1)
+            start = datetime.utcnow()
+            record_results(claim, [(docs[0], "error: SMTPDataError()")])
+            email = EmailOutbox.objects.get()
+            delays.append(round((email.next_attempt - start).total_seconds()))
+
+        self.assertEqual(delays[:2], [10, 20])
+        self.assertEqual(email.status, "failed")
+        self.assertEqual(email.attempts, 3)
+        self.assertEqual(email.last_error, "error: SMTPDataError()")
+
+    def test_not_found_fails(self):
+        enqueue_emails("hacker_acceptance", self.hackers[:1])
+        claim, docs = claim_batch(1)
+
+        record_results(claim, [(docs[0], "not_found")])
+
+        self.assertEqual(EmailOutbox.objects.get().status, "failed")
+        self.assertIsNone(next_due())
+
+    def test_status(self):
+        enqueue_emails("hacker_acceptance", self.hackers)
+        enqueue_emails("hacker_confirmation_success", self.hackers[:1])
+        claim, docs = claim_batch(1)
+        record_results(claim, [(docs[0], "sent")])
+
+        status = outbox_status("hacker_acceptance")
+
+        self.assertEqual(status["counts"]["sent"], 1)
+        self.assertEqual(status["counts"]["pending"], 2)
+        self.assertEqual(sum(outbox_status()["counts"].values()), 4)
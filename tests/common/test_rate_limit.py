@@ -0,0 +1,98 @@
+# flake8: noqa
+import threading
+from unittest import mock
+from src.common.rate_limit import TokenBucket, get_mail_rate_limiter
+from src.models.rate_limit import RateLimitBucket
+from tests.base import BaseTestCase
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(BaseTestCase):
+    """Tests for the shared token bucket"""
+
+    def setUp(self):
+        """The unique name is dropped with the database between tests"""
+        RateLimitBucket.ensure_indexes()
+        self.clock = FakeClock()
+        self.bucket = TokenBucket("test", rate=2, burst=3, clock=self.clock)
+
+    def test_burst_then_rate(self):
+        waits = [self.bucket.reserve() for _ in range(6)]
+
+        self.assertEqual(waits, [0, 0, 0, 0.5, 1.0, 1.5])
+
+    def test_refills_up_to_burst(self):
+        for _ in range(3):
+            self.bucket.reserve()
+
+        self.clock.now += 60
+
+        self.assertEqual([self.bucket.reserve() for _ in range(4)],
+                         [0, 0, 0, 0.5])
+
+    def test_shared_between_instances(self):
+        other = TokenBucket("test", rate=2, burst=3, clock=self.clock)
+
+        for _ in range(3):
+            self.bucket.reserve()
+
+        self.assertEqual(other.reserve(), 0.5)
+        self.assertEqual(RateLimitBucket.objects.count(), 1)
+
+    def test_acquire_sleeps(self):
+        sleep = mock.Mock()
+        for _ in range(4):
+            self.bucket.acquire(sleep=sleep)
+
+        sleep.assert_called_once_with(0.5)
+
+    def test_status(self):
+        self.assertEqual(self.bucket.status(10), {
+            "rate": 2, "burst": 3, "depth": 10, "drain_seconds": 3.5
+        })
+
+        for _ in range(5):
+            self.bucket.reserve()
+
+        """3 sent right away, 2 waiting for tokens and 5 not reserved"""
+        self.assertEqual(self.bucket.status(5), {
+            "rate": 2, "burst": 3, "depth": 7, "drain_seconds": 3.5
+        })
+
+    def test_concurrent_reservations(self):
+        waits = []
+
+        def reserve():
+            for _ in range(5):
+                waits.append(self.bucket.reserve())
+
+        threads = [threading.Thread(target=reserve) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        """Every reservation got its own slot"""
+        self.assertEqual(sorted(waits),
+                         [max(0, (i - 2) / 2) for i in range(20)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            TokenBucket("test", rate=0)
+
+    def test_mail_rate_limiter(self):
+        self.app.extensions.pop("mail_rate_limit", None)
+        self.app.config["MAIL_RATE_LIMIT"] = 0
+        self.assertIsNone(get_mail_rate_limiter())
+
+        self.app.config.update(MAIL_RATE_LIMIT=5, MAIL_RATE_BURST=2)
+        limiter = get_mail_rate_limiter()
+        self.assertEqual((limiter.rate, limiter.burst), (5, 2))
+        self.app.extensions.pop("mail_rate_limit", None)
@@ -0,0 +1,39 @@
+# flake8: noqa
+from src.common.scope import Scope
+from tests.base import BaseTestCase
+
+
+class TestScope(BaseTestCase):
+    """Tests for the Scope Flags"""
+
+    def test_mask_matches_enum_union(self):
+        roles = ["Hacker_Read", "Event_Create"]
+
+        self.assertEqual(Scope.mask(roles), Scope(roles).value)
+
+    def test_mask_all_roles(self):
+        roles = list(Scope.members().keys())
+
+        self.assertEqual(Scope.mask(roles), Scope(roles).value)
+
+    def test_mask_ignores_unknown_roles(self):
+        self.assertEqual(Scope.mask(["Hacker_Read", "Not_A_Role"]),
+                         Scope.Hacker_Read.value)
+
+    def test_mask_empty(self):
+        self.assertEqual(Scope.mask([]), 0)
+        self.assertEqual(Scope.mask(None), 0)
+
+    def test_mask_is_order_independent(self):
+        self.assertEqual(Scope.mask(["Event_Create", "Hacker_Read"]),
+                         Scope.mask(["Hacker_Read", "Event_Create"]))
+
+    def test_names(self):
+        scope = Scope.Hacker_Read | Scope.Event_Update
+
+        self.assertEqual(scope.names, ["Hacker_Read", "Event_Update"])
+
+    def test_members_is_a_copy(self):
+        Scope.members().clear()
+
+        self.assertIn("Hacker_Read", Scope.members())
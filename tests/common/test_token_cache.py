@@ -0,0 +1,147 @@
+# flake8: noqa
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+from jose import jwt
+from src import app
+from src.common.token_cache import VerifiedTokenCache
+from tests.base import BaseTestCase
+from tests.standins import SigningKey, jwks_standin
+
+
+class TestVerifiedTokenCache(BaseTestCase):
+    """Tests for the Verified Token Cache"""
+
+    def test_get_cached_payload(self):
+        cache = VerifiedTokenCache()
+        payload = {"exp": time.time() + 60, "roles": ["Hacker_Read"]}
+
+        cache.put("token", payload)
+
+        self.assertIs(cache.get("token"), payload)
+        self.assertIsNone(cache.get("other token"))
+
+    def test_get_expired_payload(self):
+        cache = VerifiedTokenCache()
+
+        cache.put("token", {"exp": time.time() - 1})
+
+        self.assertIsNone(cache.get("token"))
+        self.assertEqual(len(cache), 0)
+
+    def test_put_without_exp(self):
+        cache = VerifiedTokenCache()
+
+        cache.put("token", {"roles": []})
+
+        self.assertIsNone(cache.get("token"))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        exp = time.time() + 60
+
+        cache.put("a", {"exp": exp})
+        cache.put("b", {"exp": exp})
+        cache.get("a")
+        cache.put("c", {"exp": exp})
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_keyed_by_digest(self):
+        cache = VerifiedTokenCache()
+
+        cache.put("token", {"exp": time.time() + 60})
+
+        self.assertNotIn("token", cache._entries)
+        self.assertIn(VerifiedTokenCache.digest("token"), cache._entries)
+
+
+class TestAuthenticateTokenCache(BaseTestCase):
+    """Tests that authenticate only verifies a token once"""
+
+    tenant_id = "00000000-0000-0000-0000-000000000000"
+    audience = "api://knighthacks-backend"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = SigningKey("key-1")
+
+    def setUp(self):
+        self.server = jwks_standin(self.key).__enter__()
+        app.extensions.pop("jwks", None)
+        app.extensions.pop("verified_tokens", None)
+        app.config.update(
+            TESTING=False,
+            AZURE_TENANT_ID=self.tenant_id,
+            AZURE_API_AUDIENCE=self.audience,
+            AZURE_JWKS_URL=self.server.url + "/discovery/v2.0/keys"
+        )
+
+    def tearDown(self):
+        super().tearDown()
+        self.server.__exit__(None, None, None)
+        app.extensions.pop("jwks", None)
+        app.extensions.pop("verified_tokens", None)
+        app.config.from_object("src.config.TestingConfig")
+
+    def test_token_is_verified_once(self):
+        token = self.key.sign(self.tenant_id, self.audience,
+                              roles=["Hacker_Read"])
+
+        with mock.patch("src.common.decorators.jwt.decode",
+                        wraps=jwt.decode) as decode:
+            for _ in range(3):
+                res = self.client.get(
+                    "/api/hackers/get_all_hackers/",
+                    headers=[("Authorization", f"Bearer {token}")]
+                )
+                self.assertEqual(res.status_code, 404)
+
+        self.assertEqual(decode.call_count, 1)
+
+    def test_cached_payload_is_current_user(self):
+        token = self.key.sign(self.tenant_id, self.audience,
+                              roles=["Hacker_Read"])
+
+        for _ in range(2):
+            res = self.client.get(
+                "/api/auth/me",
+                headers=[("Authorization", f"Bearer {token}")]
+            )
+            data = json.loads(res.data.decode())
+            self.assertEqual(data["roles"], ["Hacker_Read"])
+
+    def test_expired_token_is_not_served_from_cache(self):
+        token = self.key.sign(self.tenant_id, self.audience,
+                              expires_in=timedelta(seconds=-1))
+
+        for _ in range(2):
+            res = self.client.get(
+                "/api/auth/me",
+                headers=[("Authorization", f"Bearer {token}")]
+            )
+            self.assertEqual(res.status_code, 401)
+
+    def test_missing_scope_with_cached_token(self):
+        token = self.key.sign(self.tenant_id, self.audience,
+                              roles=["Event_Create"])
+
+        for _ in range(2):
+            res = self.client.get(
+                "/api/hackers/get_all_hackers/",
+                headers=[("Authorization", f"Bearer {token}")]
+            )
+            self.assertEqual(res.status_code, 403)
+
+    def test_no_roles_is_forbidden(self):
+        token = self.key.sign(self.tenant_id, self.audience)
+
+        res = self.client.get(
+            "/api/hackers/get_all_hackers/",
+            headers=[("Authorization", f"Bearer {token}")]
+        )
+        self.assertEqual(res.status_code, 403)
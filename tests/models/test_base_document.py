@@ -0,0 +1,70 @@
+# flake8: noqa
+from datetime import datetime
+from flask import json
+from src.models.event import Event
+from src.models.hacker import Hacker
+from src.models.sponsor import Sponsor
+from tests.base import BaseTestCase
+
+
+class TestBaseDocumentRaw(BaseTestCase):
+    """Tests for the raw read path of BaseDocument"""
+
+    def assertSameShape(self, cls, excludes=()):
+        documents = list(cls.objects().exclude(*excludes))
+        raw = cls.listRaw(excludes=list(excludes))
+
+        self.assertEqual(json.loads(json.dumps(raw)),
+                         json.loads(json.dumps(documents)))
+
+    def test_list_raw_event(self):
+        now = datetime(2021, 11, 11, 9, 30)
+        Event.createOne(name="foobar", date_time=now, end_date_time=now,
+                        link="https://foobar.com")
+
+        self.assertSameShape(Event)
+        self.assertEqual(Event.listRaw()[0]["id"], Event.listRaw()[0]["_id"])
+
+    def test_list_raw_sponsor(self):
+        Sponsor.createOne(sponsor_name="foobar", socials={"github": "foo"})
+        Sponsor.createOne(sponsor_name="foobaz")
+
+        self.assertSameShape(Sponsor, Sponsor.private_fields)
+
+    def test_list_raw_hacker(self):
+        Hacker.createOne(
+            email="foobar@email.com",
+            first_name="Zoë",
+            date=datetime(2021, 11, 11),
+            mlh=dict(
+                mlh_code_of_conduct=True,
+                mlh_privacy_and_contest_terms=True
+            ),
+            dynamic_field=1
+        )
+
+        self.assertSameShape(Hacker, Hacker.private_fields)
+
+    def test_list_raw_fills_defaults(self):
+        """e.g. documents written before a field was added"""
+        Hacker._get_collection().insert_one({
+            "email": "foobar@email.com",
+            "date": datetime(2021, 11, 11),
+            "mlh": {"mlh_code_of_conduct": True,
+                    "mlh_privacy_and_contest_terms": True}
+        })
+
+        self.assertSameShape(Hacker, Hacker.private_fields)
+
+        hacker = Hacker.listRaw()[0]
+        self.assertIs(hacker["isaccepted"], False)
+        self.assertEqual(hacker["what_learn"], [])
+        self.assertIs(hacker["mlh"]["mlh_send_messages"], False)
+
+    def test_find_raw(self):
+        Sponsor.createOne(sponsor_name="foobar")
+
+        sponsor = Sponsor.findRaw(sponsor_name="foobar")
+
+        self.assertEqual(sponsor, {"sponsor_name": "foobar", "socials": {}})
+        self.assertIsNone(Sponsor.findRaw(sponsor_name="nope"))
@@ -1,13 +1,56 @@
 # flake8: noqa
 import json
-from src.models.club_event import ClubEvent
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+from unittest import mock
+from bson import ObjectId
+from PIL import Image
+from src.common.club_event_snapshot import build_snapshot
+from src.common.images import image_id, make_renditions
+from src.common.locks import current_lock
+from src.models.club_event import ClubEvent, ImageRendition
+from src.models.task_lock import TaskLock
+from src.tasks.clubevent_tasks import REFRESH_LOCK
 from tests.base import BaseTestCase
+from tests.standins import png_image
 from datetime import datetime, timedelta
 
 
 class TestClubEventsBlueprint(BaseTestCase):
     """Tests for the Club Events Endpoints"""
 
+    """refresh_events"""
+
+    def test_refresh_events(self):
+        TaskLock.ensure_indexes()
+
+        with mock.patch("src.tasks.clubevent_tasks."
+                        "refresh_notion_clubevents.apply_async") as apply:
+            res = self.client.put("/api/club/refresh_events/")
+            data = json.loads(res.data.decode())
+
+            self.assertEqual(res.status_code, 201)
+            self.assertEqual(data["job"]["status"], "queued")
+            apply.assert_called_once_with(task_id=data["job"]["id"])
+
+            """Coalesced into the queued job"""
+            res = self.client.put("/api/club/refresh_events/")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.data.decode())["job"], data["job"])
+        apply.assert_called_once()
+
+    def test_refresh_events_not_queued(self):
+        TaskLock.ensure_indexes()
+
+        with mock.patch("src.tasks.clubevent_tasks."
+                        "refresh_notion_clubevents.apply_async",
+                        side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                self.client.put("/api/club/refresh_events/")
+
+        self.assertIsNone(current_lock(REFRESH_LOCK))
+
     """get_events"""
 
     def test_get_events(self):
@@ -211,3 +254,176 @@ class TestClubEventsBlueprint(BaseTestCase):
         self.assertEqual(res.status_code, 200)
         data = json.loads(res.data.decode())
         self.assertEqual(len(data["events"]), 1)
+
+    """get_club_event_image"""
+
+    def _create_event_with_image(self, size=(1000, 500)):
+        data = png_image(size)
+        iid = image_id(data)
+        for r in make_renditions(data, self.app.config["CLUB_EVENT_IMAGE_SIZES"],
+                                 self.app.config["CLUB_EVENT_IMAGE_FORMATS"]):
+            ImageRendition.createOne(image_id=iid, **r)
+
+        return ClubEvent.createOne(
+            start=datetime.now(),
+            end=datetime.now(),
+            name="string",
+            presenter={"name": "string", "image_id": iid},
+            image_id=iid,
+        )
+
+    def test_get_club_event_image(self):
+        event = self._create_event_with_image()
+
+        res = self.client.get(f"/api/club/{event.id}/image/?size=small",
+                              headers=[("Accept", "image/webp,*/*")])
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers["Content-Type"], "image/webp")
+        self.assertIn("Accept", res.headers["Vary"])
+        with Image.open(BytesIO(res.data)) as img:
+            self.assertEqual(img.size, (160, 80))
+
+    def test_get_club_event_image_smallest_that_fits(self):
+        event = self._create_event_with_image()
+
+        res = self.client.get(f"/api/club/{event.id}/image/?size=200"
+                              "&format=jpeg")
+
+        self.assertEqual(res.headers["Content-Type"], "image/jpeg")
+        self.assertNotIn("Vary", res.headers)
+        with Image.open(BytesIO(res.data)) as img:
+            self.assertEqual(img.size, (320, 160))
+
+    def test_get_club_event_image_defaults(self):
+        event = self._create_event_with_image()
+
+        res = self.client.get(f"/api/club/{event.id}/presenter/image/",
+                              headers=[("Accept", "*/*")])
+
+        self.assertEqual(res.headers["Content-Type"], "image/jpeg")
+        with Image.open(BytesIO(res.data)) as img:
+            self.assertEqual(img.size, (500, 250))
+
+    def test_get_club_event_image_invalid(self):
+        event = self._create_event_with_image()
+
+        for query in ("size=huge", "size=-1", "format=gif"):
+            res = self.client.get(f"/api/club/{event.id}/image/?{query}")
+            self.assertEqual(res.status_code, 400, query)
+
+    def test_get_club_event_image_not_found(self):
+        event = ClubEvent.createOne(name="string",
+                                    presenter={"name": "string"})
+
+        res = self.client.get(f"/api/club/{event.id}/image/")
+        self.assertEqual(res.status_code, 404)
+
+        res = self.client.get(f"/api/club/{ObjectId()}/presenter/image/")
+        self.assertEqual(res.status_code, 404)
+
+    def test_get_events_thumbnails(self):
+        self._create_event_with_image()
+
+        res = self.client.get("/api/club/get_events/")
+        data = json.loads(res.data.decode())
+
+        self.assertTrue(data["events"][0]["image"]
+                        .startswith("data:image/webp;base64,"))
+        self.assertEqual(data["events"][0]["presenter"]["image"],
+                         data["events"][0]["image"])
+
+    def test_get_events_image_urls(self):
+        event = self._create_event_with_image()
+        ClubEvent.createOne(start=datetime.now(), end=datetime.now(),
+                            name="no image", presenter={"name": "string"})
+
+        res = self.client.get("/api/club/get_events/?images=url")
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(res.status_code, 200)
+        with_image = next(e for e in data["events"]
+                          if e["name"] == "string")
+        url = urlparse(with_image["image"])
+        self.assertEqual(url.path, f"/api/club/{event.id}/image/")
+        self.assertEqual(parse_qs(url.query), {"size": ["thumbnail"],
+                                               "v": [event.image_id[:16]]})
+        self.assertEqual((url.scheme, url.netloc), ("http", "localhost"))
+        self.assertTrue(with_image["presenter"]["image"].startswith(
+            "http://localhost/api/club/"))
+
+        """Each deployment links to its own host"""
+        res = self.client.get("/api/club/get_events/?images=url",
+                              base_url="https://staging.knighthacks.org")
+        self.assertTrue(json.loads(res.data.decode())["events"][0]["image"]
+                        .startswith("http://staging.knighthacks.org/"))
+
+        no_image = next(e for e in data["events"]
+                        if e["name"] == "no image")
+        self.assertIsNone(no_image["image"])
+
+        res = self.client.get(f"{url.path}?{url.query}")
+        self.assertEqual(res.status_code, 200)
+        with Image.open(BytesIO(res.data)) as img:
+            self.assertEqual(img.size, (20, 10))
+
+    def test_get_events_invalid_images(self):
+        res = self.client.get("/api/club/get_events/?images=gridfs")
+
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_club_event_image_not_modified(self):
+        event = self._create_event_with_image()
+        url = f"/api/club/{event.id}/image/?size=small&format=webp"
+
+        res = self.client.get(url)
+        etag = res.headers["ETag"]
+
+        self.assertEqual(etag, f'"{event.image_id}-small.webp"')
+        self.assertTrue(res.cache_control.no_cache)
+        self.assertIn("Last-Modified", res.headers)
+
+        res = self.client.get(url, headers=[("If-None-Match", etag)])
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b"")
+
+        res = self.client.get(url.replace("webp", "jpeg"),
+                              headers=[("If-None-Match", etag)])
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_get_club_event_image_versioned(self):
+        event = self._create_event_with_image()
+
+        res = self.client.get(f"/api/club/{event.id}/presenter/image/"
+                              f"?size=thumbnail&v={event.image_id[:16]}")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.cache_control.immutable)
+        self.assertTrue(res.cache_control.public)
+        self.assertEqual(res.cache_control.max_age,
+                         self.app.config["CACHE_IMMUTABLE_MAX_AGE"])
+        self.assertIn("Accept", res.vary)
+
+    def test_get_events_from_snapshot(self):
+        for day in (10, 20):
+            ClubEvent.createOne(start=datetime(2021, 10, day, 19),
+                                end=datetime(2021, 10, day, 20),
+                                name=f"October {day}",
+                                presenter={"name": "string"})
+        ClubEvent.createOne(name="unconfirmed", presenter={"name": "string"})
+        build_snapshot()
+
+        res = self.client.get("/api/club/get_events/?start_date="
+                              "2021-10-15T00:00:00-04:00&end_date=2021-11-01")
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["events"][0]["name"], "October 20")
+
+        res = self.client.get("/api/club/get_events/?confirmed=false&count=1")
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(len(data["events"]), 1)
@@ -207,3 +207,235 @@ class TestHackersBlueprint(BaseTestCase):
 
         self.assertEqual(res.status_code, 404)
         self.assertEqual(data["name"], "Not Found")
+
+    def test_get_all_hackers_stream(self):
+        for i in range(5):
+            Hacker.createOne(
+                email=f"foobar{i}@email.com",
+                first_name="Zoë",
+                mlh=dict(
+                    mlh_code_of_conduct=True,
+                    mlh_privacy_and_contest_terms=True
+                )
+            )
+
+        self.app.config["HACKERS_STREAM_BATCH_SIZE"] = 2
+
+        expected = self.client.get("/api/hackers/get_all_hackers/")
+
+        for url in ("/api/hackers/get_all_hackers/?stream",
+                    "/api/hackers/get_all_hackers/?stream=json"):
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, 201)
+            self.assertTrue(res.is_streamed)
+            self.assertEqual(res.mimetype, "application/json")
+            self.assertEqual(json.loads(res.data.decode()),
+                             json.loads(expected.data.decode()))
+
+    def test_get_all_hackers_stream_ndjson(self):
+        for i in range(3):
+            Hacker.createOne(
+                email=f"foobar{i}@email.com",
+                mlh=dict(
+                    mlh_code_of_conduct=True,
+                    mlh_privacy_and_contest_terms=True
+                )
+            )
+
+        res = self.client.get("/api/hackers/get_all_hackers/?stream=ndjson")
+
+        lines = res.data.decode().splitlines()
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.mimetype, "application/x-ndjson")
+        self.assertEqual([json.loads(l)["email"] for l in lines],
+                         [f"foobar{i}@email.com" for i in range(3)])
+
+    def test_get_all_hackers_stream_not_found(self):
+
+        res = self.client.get("/api/hackers/get_all_hackers/?stream=ndjson")
+
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data["name"], "Not Found")
+
+    def test_get_all_hackers_stream_invalid_format(self):
+
+        res = self.client.get("/api/hackers/get_all_hackers/?stream=xml")
+
+        self.assertEqual(res.status_code, 400)
+
+    def _create_hackers(self, n):
+        for i in range(n):
+            Hacker.createOne(
+                email=f"foobar{i}@email.com",
+                first_name=f"Foo{i}",
+                date=datetime(2021, 11, 11 - i % 3),
+                mlh=dict(
+                    mlh_code_of_conduct=True,
+                    mlh_privacy_and_contest_terms=True
+                )
+            )
+
+    def _get_pages(self, query):
+        emails, after = [], None
+        while True:
+            url = f"/api/hackers/get_all_hackers/?{query}"
+            if after:
+                url += f"&after={after}"
+            res = self.client.get(url)
+            data = json.loads(res.data.decode())
+            self.assertEqual(res.status_code, 201)
+            emails.append([h["email"] for h in data["hackers"]])
+            after = data["next"]
+            if after is None:
+                return emails, data
+
+    def test_get_all_hackers_paginated(self):
+        self._create_hackers(5)
+
+        pages, _ = self._get_pages("limit=2")
+
+        self.assertEqual(pages, [
+            ["foobar0@email.com", "foobar1@email.com"],
+            ["foobar2@email.com", "foobar3@email.com"],
+            ["foobar4@email.com"]
+        ])
+
+    def test_get_all_hackers_paginated_by_date(self):
+        self._create_hackers(5)
+
+        pages, data = self._get_pages("limit=2&sort=date&fields=email")
+
+        self.assertEqual(pages, [
+            ["foobar2@email.com", "foobar1@email.com"],
+            ["foobar4@email.com", "foobar0@email.com"],
+            ["foobar3@email.com"]
+        ])
+        self.assertEqual(data["hackers"], [{"email": "foobar3@email.com"}])
+
+    def test_get_all_hackers_page_matches_full_list(self):
+        self._create_hackers(3)
+
+        full = json.loads(self.client.get(
+            "/api/hackers/get_all_hackers/").data.decode())
+        page = json.loads(self.client.get(
+            "/api/hackers/get_all_hackers/?limit=10").data.decode())
+
+        self.assertEqual(page["hackers"], full["hackers"])
+        self.assertIsNone(page["next"])
+
+    def test_get_all_hackers_fields(self):
+        self._create_hackers(2)
+
+        res = self.client.get(
+            "/api/hackers/get_all_hackers/?fields=first_name,email")
+
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(data["hackers"], [
+            {"first_name": "Foo0", "email": "foobar0@email.com"},
+            {"first_name": "Foo1", "email": "foobar1@email.com"}
+        ])
+
+    def test_get_all_hackers_invalid_params(self):
+        self._create_hackers(1)
+
+        for query in ("fields=email_token_hash", "fields=id",
+                      "fields=nope", "fields=", "limit=0", "limit=abc",
+                      "limit=100000", "sort=email&limit=1", "after=abc",
+                      "limit=1&stream"):
+            res = self.client.get(f"/api/hackers/get_all_hackers/?{query}")
+            self.assertEqual(res.status_code, 400, query)
+
+    def test_get_all_hackers_cursor_for_other_sort(self):
+        self._create_hackers(3)
+
+        data = json.loads(self.client.get(
+            "/api/hackers/get_all_hackers/?limit=1").data.decode())
+        res = self.client.get("/api/hackers/get_all_hackers/"
+                              f"?limit=1&sort=date&after={data['next']}")
+
+        self.assertEqual(res.status_code, 400)
+
+    """accept_hackers"""
+
+    def test_accept_hackers(self):
+        self._create_hackers(3)
+        Hacker.objects(email="foobar1@email.com").update(isaccepted=True)
+
+        res = self.client.put("/api/hackers/accept/", json={
+            "emails": ["foobar0@email.com", "foobar1@email.com",
+                       "nobody@email.com"]
+        })
+
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(data["results"], {
+            "foobar0@email.com": "accepted",
+            "foobar1@email.com": "already_accepted",
+            "nobody@email.com": "not_found"
+        })
+        self.assertEqual(
+            sorted(h.email for h in Hacker.objects(isaccepted=True)),
+            ["foobar0@email.com", "foobar1@email.com"])
+
+    def test_accept_hackers_filter(self):
+        self._create_hackers(3)
+
+        res = self.client.put("/api/hackers/accept/", json={
+            "filter": {"date__gte": "2021-11-10", "isaccepted": False}
+        })
+
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(data["results"], {
+            "foobar0@email.com": "accepted",
+            "foobar1@email.com": "accepted"
+        })
+        self.assertFalse(Hacker.objects.get(email="foobar2@email.com").isaccepted)
+
+    def test_accept_hackers_invalid(self):
+        self._create_hackers(2)
+
+        for body in ({}, {"emails": "foobar@email.com"}, {"emails": [1]},
+                     {"emails": [], "filter": {"isaccepted": False}},
+                     {"filter": {}}, {"filter": {"email_token_hash": "x"}},
+                     {"filter": {"nope": 1}}, {"filter": {"email__nope": 1}},
+                     {"emails": ["a@b.com"] * 1001},
+                     {"filter": {"first_name": {"$ne": 1}}},
+                     {"filter": {"first_name": ["Foo0"]}},
+                     {"filter": {"first_name__in": "Foo0"}},
+                     {"filter": {"first_name__in": [{"$ne": 1}]}}):
+            res = self.client.put("/api/hackers/accept/", json=body)
+            self.assertEqual(res.status_code, 400, body)
+
+        self.assertEqual(Hacker.objects(isaccepted=True).count(), 0)
+
+    def test_accept_hackers_filter_operators(self):
+        self._create_hackers(3)
+
+        res = self.client.put("/api/hackers/accept/", json={
+            "filter": {"first_name__in": ["Foo0", "Foo2"],
+                       "email__ne": "foobar2@email.com"}
+        })
+
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(data["results"], {"foobar0@email.com": "accepted"})
+
+    def test_accept_hackers_filter_max(self):
+        self._create_hackers(3)
+        self.app.config["HACKERS_BULK_ACCEPT_MAX"] = 2
+
+        res = self.client.put("/api/hackers/accept/",
+                              json={"filter": {"isaccepted": False}})
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(Hacker.objects(isaccepted=True).count(), 0)
@@ -17,3 +17,25 @@ class TestStatsBlueprint(BaseTestCase):
         self.assertEqual(res.status_code, 200)
 
         self.assertEqual(data["hackers"], 0)
+
+    def test_email_outbox(self):
+        from src.common.outbox import enqueue_emails
+
+        hacker = Hacker.createOne(
+            email="foobar@email.com",
+            mlh=dict(mlh_code_of_conduct=True,
+                     mlh_privacy_and_contest_terms=True))
+        enqueue_emails("hacker_acceptance", [hacker])
+
+        res = self.client.get(
+            "/api/stats/email_outbox/?template=hacker_acceptance")
+        data = json.loads(res.data.decode())
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["counts"]["pending"], 1)
+        self.assertIsNone(data["drain_seconds"])
+
+    def test_email_outbox_unknown_template(self):
+        res = self.client.get("/api/stats/email_outbox/?template=foo")
+
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,277 @@
+# flake8: noqa
+"""Local HTTP stand-ins for the external services the backend talks to"""
+import json
+import time
+import base64
+import socket
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+from aiosmtpd.controller import Controller
+from PIL import Image
+
+
+class StandinServer:
+    """
+    A tiny threaded HTTP server.
+
+    ``routes`` maps ``(method, path)`` to a handler that receives the
+    request handler and returns ``(status, headers, body)``. Every request
+    is counted in ``hits`` by path.
+    """
+
+    def __init__(self, routes=None, delay=0):
+        self.routes = routes or {}
+        self.delay = delay
+        self.hits = {}
+        self._lock = threading.Lock()
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Keeps connections alive like the real services"""
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                path = self.path.split("?")[0]
+                with standin._lock:
+                    standin.hits[path] = standin.hits.get(path, 0) + 1
+                if standin.delay:
+                    time.sleep(standin.delay)
+
+                route = standin.routes.get((self.command, path))
+                if route is None:
+                    status, headers, body = 404, {}, b""
+                else:
+                    status, headers, body = route(self)
+
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode()
+                    headers = {"Content-Type": "application/json", **headers}
+
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _handle
+            do_POST = _handle
+
+        class Server(ThreadingHTTPServer):
+            """The default backlog of 5 drops concurrent connects"""
+            request_queue_size = 128
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _b64(i: int) -> str:
+    raw = i.to_bytes((i.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class SigningKey:
+    """An RSA key pair that can sign Azure-style access tokens"""
+
+    def __init__(self, kid: str):
+        self.kid = kid
+        self._key = rsa.generate_private_key(public_exponent=65537,
+                                             key_size=2048)
+
+    @property
+    def jwk(self) -> dict:
+        numbers = self._key.public_key().public_numbers()
+        return {
+            "kty": "RSA",
+            "kid": self.kid,
+            "use": "sig",
+            "n": _b64(numbers.n),
+            "e": _b64(numbers.e)
+        }
+
+    def sign(self, tenant_id: str, audience: str,
+             expires_in: timedelta = timedelta(hours=1), **claims) -> str:
+        pem = self._key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ).decode()
+        now = datetime.utcnow()
+        payload = {
+            "aud": audience,
+            "iss": f"https://sts.windows.net/{tenant_id}/",
+            "iat": now,
+            "nbf": now,
+            "exp": now + expires_in,
+            **claims
+        }
+        return jwt.encode(payload, pem, algorithm="RS256",
+                          headers={"kid": self.kid})
+
+
+def jwks_standin(*keys: SigningKey, delay=0) -> StandinServer:
+    """A stand-in for the Azure AD ``/discovery/v2.0/keys`` endpoint"""
+    server = StandinServer(delay=delay)
+    server.keys = list(keys)
+    server.routes[("GET", "/discovery/v2.0/keys")] = lambda _: (
+        200, {}, {"keys": [k.jwk for k in server.keys]})
+    return server
+
+
+def notion_page(id: str, edited: str = "2021-10-01T12:00:00.000Z",
+                name: str = "Intro to Python", image: str = "",
+                presenter_image: str = "") -> dict:
+    """A page of the Notion club events database"""
+    def text(value):
+        return {"rich_text": [{"plain_text": value}]}
+
+    def files(url):
+        return {"files": [{"file": {"url": url}}] if url else []}
+
+    return {
+        "object": "page",
+        "id": id,
+        "last_edited_time": edited,
+        "properties": {
+            "Name": {"title": [{"plain_text": name}]},
+            "Tags": {"multi_select": [{"name": "Workshop"}]},
+            "Presenter": text("Foo Bar"),
+            "Presenter Image": files(presenter_image),
+            "Date": {"date": {"start": "2021-10-20T19:00:00.000-04:00",
+                              "end": None}},
+            "Description": text("Lorem ipsum"),
+            "Location": text("HEC 101"),
+            "Image": files(image)
+        }
+    }
+
+
+def png_image(size=(640, 480), color=(255, 0, 0)) -> bytes:
+    """A PNG image to serve as a Notion file"""
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def notion_standin(pages: list, db_id: str = "db",
+                   fail_after: int = None, delay=0) -> StandinServer:
+    """
+    A stand-in for the Notion API's ``POST /v1/databases/<id>/query``.
+    Pages through ``pages`` with ``page_size`` and ``start_cursor`` like
+    Notion does, and answers with a 502 after ``fail_after`` queries.
+    Every request body is kept in ``queries``, ``pages`` and
+    ``fail_after`` can be changed between queries.
+    """
+    server = StandinServer(delay=delay)
+    server.pages = pages
+    server.fail_after = fail_after
+    server.queries = []
+
+    def query(handler):
+        body = json.loads(handler.rfile.read(
+            int(handler.headers["Content-Length"])))
+        server.queries.append(body)
+        if server.fail_after is not None \
+                and len(server.queries) > server.fail_after:
+            return 502, {}, {"object": "error", "code": "bad_gateway"}
+
+        start = int(body.get("start_cursor") or 0)
+        end = start + min(body.get("page_size", 100), 100)
+        has_more = end < len(server.pages)
+        return 200, {}, {
+            "object": "list",
+            "results": server.pages[start:end],
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None
+        }
+
+    server.routes[("POST", f"/v1/databases/{db_id}/query")] = query
+    return server
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SMTPStandin:
+    """
+    A local SMTP server that records every message and session.
+
+    ``delay`` is added to every EHLO to stand in for the TLS handshake
+    and login of a real SMTP session, ``refuse`` is a set of recipients
+    to reject and the connection is dropped after ``drop_after`` messages.
+    """
+
+    def __init__(self, delay=0, refuse=(), drop_after=None):
+        self.delay = delay
+        self.refuse = set(refuse)
+        self.drop_after = drop_after
+        self.messages = []
+        self.sessions = 0
+        self.controller = Controller(self, hostname="127.0.0.1",
+                                     port=_free_port())
+
+    @property
+    def port(self) -> int:
+        return self.controller.port
+
+    @property
+    def recipients(self) -> list:
+        return [r for m in self.messages for r in m["rcpt_tos"]]
+
+    async def handle_EHLO(self, server, session, envelope, hostname,
+                          responses):
+        self.sessions += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address,
+                          rcpt_options):
+        if address in self.refuse:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append({"mail_from": envelope.mail_from,
+                              "rcpt_tos": list(envelope.rcpt_tos),
+                              "content": envelope.content})
+        if self.drop_after and len(self.messages) % self.drop_after == 0:
+            asyncio.get_event_loop().call_soon(server.transport.close)
+        return "250 OK"
+
+    def __enter__(self):
+        self.controller.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.controller.stop()
@@ -0,0 +1,81 @@
+# flake8: noqa
+from datetime import datetime, timedelta, timezone
+from src import celery
+from src.models.scheduled_run import ScheduledRun
+from src.tasks.beat import MongoScheduler
+from src.tasks.schedules import jittered, make_beat_schedule
+from tests.base import BaseTestCase
+
+LAST_RUN = datetime(2021, 10, 1, 12, tzinfo=timezone.utc)
+
+
+class TestJittered(BaseTestCase):
+    """Tests for the jittered schedule"""
+
+    def setUp(self):
+        self.schedule = jittered(timedelta(hours=1), jitter=600)
+
+    def test_delay(self):
+        delay = self.schedule.delay(LAST_RUN)
+
+        self.assertLessEqual(timedelta(0), delay)
+        self.assertLessEqual(delay, timedelta(seconds=600))
+        """The same until the next run"""
+        self.assertEqual(self.schedule.delay(LAST_RUN), delay)
+
+    def test_is_due(self):
+        delay = self.schedule.delay(LAST_RUN)
+
+        self.schedule.nowfun = lambda: LAST_RUN + timedelta(hours=1) + delay \
+            - timedelta(seconds=1)
+        self.assertFalse(self.schedule.is_due(LAST_RUN).is_due)
+
+        self.schedule.nowfun = lambda: LAST_RUN + timedelta(hours=1) + delay
+        self.assertTrue(self.schedule.is_due(LAST_RUN).is_due)
+
+    def test_make_beat_schedule(self):
+        beat_schedule = make_beat_schedule({"CELERY_PERIODIC_TASKS": {
+            "refresh": {"task": "src.tasks.refresh", "every": 60,
+                        "jitter": 5},
+            "drain": {"task": "src.tasks.drain", "every": 30}
+        }})
+
+        self.assertEqual(beat_schedule["refresh"]["task"], "src.tasks.refresh")
+        self.assertEqual(beat_schedule["refresh"]["schedule"].seconds, 60)
+        self.assertEqual(beat_schedule["refresh"]["schedule"].jitter, 5)
+        self.assertEqual(beat_schedule["drain"]["schedule"].jitter, 0)
+
+    def test_beat_schedule(self):
+        self.assertEqual(celery.conf.beat_scheduler,
+                         "src.tasks.beat:MongoScheduler")
+        self.assertEqual(
+            celery.conf.beat_schedule["refresh-notion-clubevents"]["task"],
+            "src.tasks.clubevent_tasks.refresh_notion_clubevents")
+
+
+class TestMongoScheduler(BaseTestCase):
+    """Tests for keeping the last runs of periodic tasks in Mongo"""
+
+    def test_never_run_is_due(self):
+        scheduler = MongoScheduler(app=celery)
+
+        entry = scheduler.schedule["refresh-notion-clubevents"]
+
+        self.assertTrue(entry.is_due().is_due)
+
+    def test_last_run_is_kept(self):
+        scheduler = MongoScheduler(app=celery)
+        entry = scheduler.reserve(scheduler.schedule["drain-email-outbox"])
+
+        run = ScheduledRun.objects.get(name="drain-email-outbox")
+        self.assertEqual(run.task, "src.tasks.mail_tasks.drain_email_outbox")
+        self.assertEqual(run.total_run_count, 1)
+
+        """A restarted beat isn't due until the next run"""
+        restarted = MongoScheduler(app=celery)
+        entry = restarted.schedule["drain-email-outbox"]
+
+        self.assertEqual(entry.total_run_count, 1)
+        self.assertFalse(entry.is_due().is_due)
+        self.assertTrue(
+            restarted.schedule["refresh-notion-clubevents"].is_due().is_due)
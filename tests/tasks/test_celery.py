@@ -0,0 +1,64 @@
+# flake8: noqa
+from src import celery
+from src.tasks.mail_tasks import (
+    drain_email_outbox,
+    send_async_email
+)
+from src.tasks.clubevent_tasks import refresh_notion_clubevents
+from src.tasks.worker import worker_argv
+from tests.base import BaseTestCase
+
+
+class TestCelery(BaseTestCase):
+    """Tests for the Celery setup"""
+
+    def route(self, task):
+        return celery.amqp.router.route({}, task.name)
+
+    def test_routes(self):
+        email = self.route(send_async_email)
+        outbox = self.route(drain_email_outbox)
+        notion = self.route(refresh_notion_clubevents)
+
+        self.assertEqual(email["queue"].name, "mail")
+        self.assertEqual(outbox["queue"].name, "mail")
+        self.assertEqual(notion["queue"].name, "notion")
+        self.assertGreater(email["priority"], outbox["priority"])
+        self.assertEqual(email["queue"].max_priority,
+                         self.app.config["CELERY_MAX_PRIORITY"])
+
+    def test_unrouted_tasks_use_default_queue(self):
+        route = celery.amqp.router.route({}, "src.tasks.foo")
+
+        self.assertEqual(route["queue"].name, "celery")
+        """It's declared as it was before the queues had priorities"""
+        self.assertIsNone(route["queue"].max_priority)
+        self.assertEqual(route["queue"].queue_arguments, None)
+
+    def test_task_policies(self):
+        self.assertTrue(send_async_email.ignore_result)
+        self.assertFalse(send_async_email.acks_late)
+        self.assertTrue(drain_email_outbox.acks_late)
+        self.assertTrue(refresh_notion_clubevents.ignore_result)
+
+
+class TestWorker(BaseTestCase):
+    """Tests for the worker entry point"""
+
+    def test_worker_argv(self):
+        self.app.config["CELERY_QUEUE_CONCURRENCY"] = {
+            "celery": 2, "mail": 4, "notion": 1}
+
+        argv = worker_argv(["notion", "celery"], self.app.config,
+                           ["-P", "gevent"])
+
+        self.assertEqual(argv, ["worker", "-Q", "notion,celery", "-c", "3",
+                                "-n", "notion-celery@%h", "-l", "info",
+                                "-P", "gevent"])
+
+    def test_worker_argv_unknown_queue(self):
+        with self.assertRaises(ValueError):
+            worker_argv(["foo"], self.app.config)
+
+        with self.assertRaises(ValueError):
+            worker_argv([], self.app.config)
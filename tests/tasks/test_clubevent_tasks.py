@@ -0,0 +1,526 @@
+# flake8: noqa
+import threading
+import time
+from datetime import datetime
+from unittest import mock
+from src.models.club_event import (
+    ClubEvent,
+    ClubEventSnapshot,
+    ImageRendition,
+    ImageSource
+)
+from src.common.locks import acquire_lock, current_lock
+from src.models.task_lock import TaskLock
+from src.tasks.clubevent_tasks import (
+    REFRESH_LOCK,
+    clean_notion,
+    _write_events,
+    refresh_notion_clubevents,
+    sync_clubevents
+)
+from tests.base import BaseTestCase
+from tests.standins import (
+    StandinServer,
+    notion_page,
+    notion_standin,
+    png_image
+)
+
+
+def use_notion_standin(app, server):
+    app.config.update(NOTION_API_URI=server.url + "/v1",
+                      NOTION_DB_ID="db",
+                      NOTION_TOKEN="secret",
+                      NOTION_VERSION="2021-08-16",
+                      NOTION_RETRY_BACKOFF=0)
+
+
+class TestSyncClubEvents(BaseTestCase):
+    """Tests for syncing the club events from Notion"""
+
+    def setUp(self):
+        patcher = mock.patch("src.tasks.clubevent_tasks._download",
+                             return_value=None)
+        self.download = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_clean_notion(self):
+        event = clean_notion(notion_page("a"))
+
+        self.assertEqual(event["notion_id"], "a")
+        self.assertEqual(event["last_edited"], datetime(2021, 10, 1, 12))
+        self.assertEqual(event["presenter"], {"name": "Foo Bar", "image": ""})
+        self.assertEqual((event["end"] - event["start"]).seconds, 3600)
+
+    def test_create(self):
+        counts = sync_clubevents([[notion_page("a"), notion_page("b")]])
+
+        self.assertEqual(counts["created"], 2)
+        self.assertEqual(ClubEvent.objects.count(), 2)
+        self.assertEqual(ClubEvent.objects.get(notion_id="a").location,
+                         "HEC 101")
+
+    def test_only_edited_pages_are_updated(self):
+        sync_clubevents([[notion_page("a"), notion_page("b")]])
+        event_id = ClubEvent.objects.get(notion_id="b").id
+        self.download.reset_mock()
+
+        counts = sync_clubevents([[
+            notion_page("a"),
+            notion_page("b", edited="2021-10-02T12:00:00.000Z",
+                        name="Intro to Rust")
+        ]])
+
+        self.assertEqual(counts["unchanged"], 1)
+        self.assertEqual(counts["updated"], 1)
+        event = ClubEvent.objects.get(notion_id="b")
+        self.assertEqual(event.id, event_id)
+        self.assertEqual(event.name, "Intro to Rust")
+        self.assertEqual(event.last_edited, datetime(2021, 10, 2, 12))
+        """Only the edited page's images are downloaded again"""
+        self.assertEqual(self.download.call_count, 2)
+
+    def test_pages_edited_while_synced_are_updated(self):
+        """
+        An edit in the same minute as the sync that read the page keeps
+        its last_edited_time
+        """
+        sync_clubevents([[notion_page("a"), notion_page("b")]])
+        ClubEvent.objects(notion_id="a").update(
+            synced=datetime(2021, 10, 1, 12, 0, 30))
+
+        counts = sync_clubevents([[notion_page("a", name="Intro to Rust"),
+                                   notion_page("b", name="Intro to Rust")]])
+
+        self.assertEqual((counts["updated"], counts["unchanged"]), (1, 1))
+        self.assertEqual(ClubEvent.objects.get(notion_id="a").name,
+                         "Intro to Rust")
+        self.assertGreater(ClubEvent.objects.get(notion_id="a").synced,
+                           datetime(2021, 10, 1, 12, 1))
+
+        counts = sync_clubevents([[notion_page("a")]])
+        self.assertEqual(counts["unchanged"], 1)
+
+    def test_removed_pages_are_deleted(self):
+        ClubEvent.createOne(name="from before the sync")
+        sync_clubevents([[notion_page("a"), notion_page("b")]])
+
+        counts = sync_clubevents([[notion_page("b")]])
+
+        self.assertEqual(counts["deleted"], 1)
+        self.assertEqual([e.notion_id for e in ClubEvent.objects], ["b"])
+
+    def test_invalid_page_keeps_previous_version(self):
+        sync_clubevents([[notion_page("a")]])
+        page = notion_page("a", edited="2021-10-02T12:00:00.000Z")
+        page["properties"]["Name"]["title"] = []
+
+        counts = sync_clubevents([[page]])
+
+        self.assertEqual(counts["invalid"], 1)
+        self.assertEqual(counts["deleted"], 0)
+        self.assertEqual(ClubEvent.objects.get().name, "Intro to Python")
+
+    def test_one_write_per_batch(self):
+        pages = [notion_page(f"page-{i}") for i in range(5)]
+
+        written = []
+
+        def write(staged):
+            written.append(len(staged))
+            return _write_events(staged)
+
+        with mock.patch("src.tasks.clubevent_tasks._write_events", write):
+            counts = sync_clubevents([pages[:3], pages[3:]])
+
+        self.assertEqual(counts["created"], 5)
+        self.assertEqual(written, [3, 2])
+
+    def test_invalid_event_is_reported_per_event(self):
+        def clean(page):
+            event = clean_notion(page)
+            if page["id"] == "b":
+                event["name"] = None
+            return event
+
+        with mock.patch("src.tasks.clubevent_tasks.clean_notion", clean), \
+                self.assertLogs(self.app.logger, "WARNING") as logs:
+            counts = sync_clubevents([[notion_page("a"), notion_page("b"),
+                                       notion_page("c")]])
+
+        self.assertEqual((counts["created"], counts["invalid"]), (2, 1))
+        self.assertIn("Invalid Club Event b from Notion", logs.output[0])
+        self.assertEqual(sorted(e.notion_id for e in ClubEvent.objects),
+                         ["a", "c"])
+
+    def test_write_error_is_reported_per_event(self):
+        """The same page twice, as if another refresh inserted it"""
+        ClubEvent.ensure_indexes()
+
+        counts = sync_clubevents([[notion_page("a"), notion_page("b"),
+                                   notion_page("a")]])
+
+        self.assertEqual((counts["created"], counts["invalid"]), (2, 1))
+        self.assertEqual(ClubEvent.objects.count(), 2)
+
+class TestRefreshNotionClubEvents(BaseTestCase):
+    """Tests for refreshing the club events from the Notion stand-in"""
+
+    def setUp(self):
+        patcher = mock.patch("src.tasks.clubevent_tasks._download",
+                             return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_all_pages(self):
+        pages = [notion_page(f"page-{i}") for i in range(250)]
+
+        with notion_standin(pages) as server:
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents()
+
+        self.assertEqual(ClubEvent.objects.count(), 250)
+        self.assertEqual([q.get("start_cursor") for q in server.queries],
+                         [None, "100", "200"])
+        self.assertIn("filter", server.queries[-1])
+
+    def test_pages_are_synced_as_they_arrive(self):
+        pages = [notion_page(f"page-{i}") for i in range(5)]
+        self.app.config["NOTION_PAGE_SIZE"] = 2
+        stored = []
+
+        with notion_standin(pages) as server:
+            query = server.routes[("POST", "/v1/databases/db/query")]
+
+            def counting_query(handler):
+                stored.append(ClubEvent.objects.count())
+                return query(handler)
+
+            server.routes[("POST", "/v1/databases/db/query")] = \
+                counting_query
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents()
+
+        self.assertEqual(stored, [0, 2, 4])
+
+    def test_failed_page_deletes_nothing(self):
+        sync_clubevents([[notion_page("old")]])
+        pages = [notion_page(f"page-{i}") for i in range(5)]
+        self.app.config["NOTION_PAGE_SIZE"] = 2
+
+        with notion_standin(pages, fail_after=1) as server:
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents()
+
+        self.assertEqual(
+            sorted(e.notion_id for e in ClubEvent.objects),
+            ["old", "page-0", "page-1"])
+
+
+    def test_snapshot(self):
+        pages = [notion_page(f"page-{i}") for i in range(3)]
+
+        with notion_standin(pages) as server:
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents()
+            snapshot = ClubEventSnapshot.objects.get()
+
+            self.assertEqual(
+                [e["event"]["notion_id"] for e in snapshot.events],
+                ["page-0", "page-1", "page-2"])
+
+            """Nothing changed, the snapshot is kept"""
+            refresh_notion_clubevents()
+            self.assertEqual(ClubEventSnapshot.objects.get().id, snapshot.id)
+
+            server.pages[1] = notion_page("page-1", name="Intro to Go",
+                                          edited="2021-10-02T12:00:00.000Z")
+            refresh_notion_clubevents()
+
+        latest = ClubEventSnapshot.objects.get()
+        self.assertNotEqual(latest.id, snapshot.id)
+        self.assertEqual(latest.events[1]["event"]["name"], "Intro to Go")
+
+    def test_snapshot_after_failed_refresh(self):
+        pages = [notion_page(f"page-{i}") for i in range(4)]
+        self.app.config["NOTION_PAGE_SIZE"] = 2
+
+        with notion_standin(pages) as server:
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents()
+            snapshot = ClubEventSnapshot.objects.get()
+
+            server.pages[0] = notion_page("page-0", name="Intro to Go",
+                                          edited="2021-10-02T12:00:00.000Z")
+            server.fail_after = len(server.queries) + 1
+            refresh_notion_clubevents()
+
+            """The edited page of the first batch is served anyway"""
+            latest = ClubEventSnapshot.objects.get()
+            self.assertNotEqual(latest.id, snapshot.id)
+            self.assertEqual(latest.events[0]["event"]["name"],
+                             "Intro to Go")
+
+    def test_single_refresh_at_a_time(self):
+        TaskLock.ensure_indexes()
+        acquire_lock(REFRESH_LOCK, "other-job", 60)
+
+        with notion_standin([notion_page("a")]) as server:
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents()
+
+        self.assertEqual(server.queries, [])
+        self.assertEqual(current_lock(REFRESH_LOCK)["owner"], "other-job")
+
+    def test_refresh_releases_its_lock(self):
+        TaskLock.ensure_indexes()
+        pages = [notion_page(f"page-{i}") for i in range(5)]
+        self.app.config["NOTION_PAGE_SIZE"] = 2
+        owners = []
+
+        with notion_standin(pages) as server:
+            query = server.routes[("POST", "/v1/databases/db/query")]
+
+            def locked_query(handler):
+                owners.append(current_lock(REFRESH_LOCK)["owner"])
+                return query(handler)
+
+            server.routes[("POST", "/v1/databases/db/query")] = locked_query
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents.apply(task_id="job-1")
+
+        self.assertEqual(owners, ["job-1"] * 3)
+        self.assertIsNone(current_lock(REFRESH_LOCK))
+        self.assertEqual(ClubEvent.objects.count(), 5)
+
+class TestImageDownloads(BaseTestCase):
+    """Tests for downloading and ingesting the club event images"""
+
+    def setUp(self):
+        """The unique index goes away with the database after each test"""
+        ImageRendition.ensure_indexes()
+
+    def image_route(self, data, responses=None):
+        """Serves ``responses`` in turn, then the image"""
+        responses = list(responses or [])
+
+        def route(handler):
+            if responses:
+                return responses.pop(0), {}, b""
+            return 200, {"Content-Type": "image/png"}, data
+        return route
+
+    def test_concurrent_downloads(self):
+        self.app.config["NOTION_IMAGE_CONCURRENCY"] = 4
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_image(handler):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return 200, {"Content-Type": "image/png"}, png_image()
+
+        with StandinServer() as images:
+            pages = []
+            for i in range(8):
+                images.routes[("GET", f"/image-{i}")] = slow_image
+                pages.append(notion_page(f"page-{i}",
+                                         image=f"{images.url}/image-{i}"))
+
+            with notion_standin(pages) as server:
+                use_notion_standin(self.app, server)
+                refresh_notion_clubevents()
+
+        self.assertEqual(ClubEvent.objects(image_id__ne=None).count(), 8)
+        self.assertGreater(peak[0], 1)
+        self.assertLessEqual(peak[0], 4)
+
+    def test_renditions(self):
+        with StandinServer() as images:
+            images.routes[("GET", "/image")] = self.image_route(
+                png_image((1000, 500)))
+            images.routes[("GET", "/presenter")] = self.image_route(
+                png_image((100, 100)))
+            pages = [notion_page("a", image=f"{images.url}/image",
+                                 presenter_image=f"{images.url}/presenter")]
+
+            with notion_standin(pages) as server:
+                use_notion_standin(self.app, server)
+                refresh_notion_clubevents()
+
+        event = ClubEvent.objects.get()
+        renditions = {(r.size, r.format): r for r in
+                      ImageRendition.objects(image_id=event.image_id)}
+        self.assertEqual(len(renditions), 8)
+        self.assertEqual((renditions["large", "webp"].width,
+                          renditions["large", "webp"].height), (500, 250))
+        self.assertEqual(renditions["thumbnail", "jpeg"].width, 20)
+        self.assertEqual(renditions["small", "webp"].content_type,
+                         "image/webp")
+        self.assertEqual(renditions["small", "webp"].data[8:12], b"WEBP")
+
+        """Images are never scaled up"""
+        presenter = ImageRendition.objects.get(
+            image_id=event.presenter.image_id, size="large", format="jpeg")
+        self.assertEqual(presenter.width, 100)
+
+    def test_shared_and_unused_renditions(self):
+        data = png_image()
+        with StandinServer() as images:
+            images.routes[("GET", "/a")] = self.image_route(data)
+            images.routes[("GET", "/b")] = self.image_route(data)
+            images.routes[("GET", "/c")] = self.image_route(png_image(
+                color=(0, 0, 255)))
+            pages = [notion_page("a", image=f"{images.url}/a"),
+                     notion_page("b", image=f"{images.url}/b")]
+
+            with notion_standin(pages) as server:
+                use_notion_standin(self.app, server)
+                refresh_notion_clubevents()
+                self.assertEqual(ImageRendition.objects.count(), 8)
+
+                server.pages = [
+                    notion_page("a", edited="2021-10-02T12:00:00.000Z",
+                                image=f"{images.url}/c")
+                ]
+                refresh_notion_clubevents()
+
+        self.assertEqual(
+            set(ImageRendition.objects.distinct("image_id")),
+            {ClubEvent.objects.get().image_id})
+
+    def test_retries(self):
+        with StandinServer() as images:
+            images.routes[("GET", "/image")] = self.image_route(png_image(),
+                                                                [503])
+            pages = [notion_page("a", image=f"{images.url}/image")]
+
+            with notion_standin(pages) as server:
+                use_notion_standin(self.app, server)
+                refresh_notion_clubevents()
+
+        self.assertEqual(images.hits["/image"], 2)
+        self.assertIsNotNone(ClubEvent.objects.get().image_id)
+
+    def test_failed_download_keeps_previous_version(self):
+        sync_clubevents([[notion_page("a")]])
+
+        with StandinServer() as images:
+            images.routes[("GET", "/text")] = lambda _: (200, {}, b"text")
+            pages = [
+                notion_page("a", edited="2021-10-02T12:00:00.000Z",
+                            name="Intro to Rust",
+                            image=f"{images.url}/missing"),
+                notion_page("b", image=f"{images.url}/text")
+            ]
+
+            with notion_standin(pages) as server:
+                use_notion_standin(self.app, server)
+                refresh_notion_clubevents()
+
+        self.assertEqual(ClubEvent.objects.get().name, "Intro to Python")
+
+    def test_truncated_image_is_invalid(self):
+        data = png_image()
+        with StandinServer() as images:
+            images.routes[("GET", "/truncated")] = self.image_route(
+                data[:len(data) // 2])
+            images.routes[("GET", "/image")] = self.image_route(data)
+            pages = [notion_page("a", image=f"{images.url}/truncated"),
+                     notion_page("b", image=f"{images.url}/image")]
+
+            with notion_standin(pages) as server:
+                use_notion_standin(self.app, server)
+                refresh_notion_clubevents()
+
+                """The refresh goes on past it, and so do later ones"""
+                self.assertEqual([e.notion_id for e in ClubEvent.objects],
+                                 ["b"])
+                server.pages = pages[1:]
+                ClubEvent.createOne(name="from before the sync")
+                refresh_notion_clubevents()
+
+        self.assertEqual([e.notion_id for e in ClubEvent.objects], ["b"])
+
+    def versioned_route(self, versions, requests):
+        """
+        Serves ``versions[0]`` with its ETag, and honours If-None-Match.
+        Each request's If-None-Match and response status go in
+        ``requests``.
+        """
+        def route(handler):
+            etag, data = versions[0]
+            if handler.headers.get("If-None-Match") == etag:
+                requests.append((etag, 304))
+                return 304, {"ETag": etag}, b""
+            requests.append((handler.headers.get("If-None-Match"), 200))
+            return 200, {"Content-Type": "image/png", "ETag": etag}, data
+        return route
+
+    def refresh_with_image(self, images, signature, edited):
+        """As if Notion signed the file's URL anew for this query"""
+        pages = [notion_page("a", edited=edited,
+                             image=f"{images.url}/image?sig={signature}")]
+        with notion_standin(pages) as server:
+            use_notion_standin(self.app, server)
+            refresh_notion_clubevents()
+
+    def test_unchanged_image_is_not_downloaded_again(self):
+        requests = []
+        with StandinServer() as images:
+            images.routes[("GET", "/image")] = self.versioned_route(
+                [('"v1"', png_image())], requests)
+            self.refresh_with_image(images, 1, "2021-10-01T12:00:00.000Z")
+            renditions = ImageRendition.objects.count()
+            image_id = ClubEvent.objects.get().image_id
+
+            with mock.patch("src.tasks.clubevent_tasks.make_renditions") \
+                    as render:
+                self.refresh_with_image(images, 2,
+                                        "2021-10-02T12:00:00.000Z")
+
+        render.assert_not_called()
+        self.assertEqual(requests, [(None, 200), ('"v1"', 304)])
+        self.assertEqual(ClubEvent.objects.get().image_id, image_id)
+        self.assertEqual(ImageRendition.objects.count(), renditions)
+        source = ImageSource.objects.get()
+        self.assertEqual((source.url, source.image_id, source.etag),
+                         (f"{images.url}/image", image_id, '"v1"'))
+
+    def test_changed_image_is_downloaded(self):
+        requests = []
+        versions = [('"v1"', png_image(color=(255, 0, 0)))]
+        with StandinServer() as images:
+            images.routes[("GET", "/image")] = self.versioned_route(
+                versions, requests)
+            self.refresh_with_image(images, 1, "2021-10-01T12:00:00.000Z")
+            old = ClubEvent.objects.get().image_id
+
+            versions[0] = ('"v2"', png_image(color=(0, 0, 255)))
+            self.refresh_with_image(images, 2, "2021-10-02T12:00:00.000Z")
+
+        self.assertEqual(requests, [(None, 200), ('"v1"', 200)])
+        new = ClubEvent.objects.get().image_id
+        self.assertNotEqual(new, old)
+        self.assertEqual(ImageSource.objects.get().etag, '"v2"')
+        """The old image's renditions are collected"""
+        self.assertEqual(set(ImageRendition.objects.distinct("image_id")),
+                         {new})
+
+    def test_source_without_renditions_is_downloaded(self):
+        requests = []
+        with StandinServer() as images:
+            images.routes[("GET", "/image")] = self.versioned_route(
+                [('"v1"', png_image())], requests)
+            self.refresh_with_image(images, 1, "2021-10-01T12:00:00.000Z")
+            ImageRendition.drop_collection()
+            ImageRendition.ensure_indexes()
+
+            self.refresh_with_image(images, 2, "2021-10-02T12:00:00.000Z")
+
+        self.assertEqual(requests, [(None, 200), (None, 200)])
+        self.assertGreater(ImageRendition.objects.count(), 0)
@@ -0,0 +1,249 @@
+# flake8: noqa
+from datetime import datetime
+from email import message_from_bytes
+from unittest import mock
+from src import mail
+from src.common.outbox import enqueue_emails
+from src.models.email_outbox import EmailOutbox
+from src.models.hacker import Hacker
+from src.tasks.mail_tasks import (
+    EMAIL_TEMPLATES,
+    drain_email_outbox,
+    _message,
+    _send_messages,
+    render_email,
+    warm_email_templates
+)
+from tests.base import BaseTestCase
+from tests.standins import SMTPStandin
+
+
+class TestMailTasks(BaseTestCase):
+    """Tests for the email tasks"""
+
+    def _create_hacker(self):
+        return Hacker.createOne(
+            email="foobar@email.com",
+            first_name="Foo",
+            last_name="Bar",
+            mlh=dict(
+                mlh_code_of_conduct=True,
+                mlh_privacy_and_contest_terms=True
+            )
+        )
+
+    def test_render_email(self):
+        hacker = self._create_hacker()
+
+        email = render_email("hacker_acceptance", hacker,
+                             {"deadline": "2021-11-11T00:00:00"})
+
+        self.assertEqual(email["subject"], "Knight Hacks - You're in!")
+        self.assertEqual(email["recipient"], "foobar@email.com")
+        self.assertIn("Foo", email["text_body"])
+        self.assertIn("Congratulations Foo Bar!", email["html_body"])
+        self.assertIn(datetime(2021, 11, 11).strftime("%x"),
+                      email["html_body"])
+
+    def test_warm_email_templates(self):
+        self.app.jinja_env.cache.clear()
+
+        warm_email_templates()
+
+        self.assertEqual(len(self.app.jinja_env.cache),
+                         2 * len(EMAIL_TEMPLATES))
+
+
+class TestSendMessages(BaseTestCase):
+    """Tests for sending emails over one SMTP session"""
+
+    def setUp(self):
+        self.hackers = [
+            Hacker.createOne(
+                email=f"foobar{i}@email.com",
+                first_name=f"Foo{i}",
+                mlh=dict(
+                    mlh_code_of_conduct=True,
+                    mlh_privacy_and_contest_terms=True
+                )
+            )
+            for i in range(5)
+        ]
+
+    def send(self, hackers=None):
+        return _send_messages([
+            _message(**render_email("hacker_confirmation_success", h))
+            for h in hackers or self.hackers
+        ])
+
+    def tearDown(self):
+        self.app.config.from_object("src.config.TestingConfig")
+        mail.init_app(self.app)
+        super().tearDown()
+
+    def use_standin(self, server):
+        self.app.config.update(
+            DEBUG=False,
+            TESTING=False,
+            MAIL_SERVER="127.0.0.1",
+            MAIL_PORT=server.port,
+            MAIL_USE_TLS=False,
+            MAIL_USERNAME=None,
+            MAIL_DEFAULT_SENDER="hackers@knighthacks.org",
+            MAIL_SUPPRESS_SEND=False
+        )
+        mail.init_app(self.app)
+
+    def test_one_session(self):
+        with SMTPStandin() as server:
+            self.use_standin(server)
+            statuses = self.send()
+
+        self.assertEqual(statuses, ["sent"] * 5)
+        self.assertEqual(server.sessions, 1)
+        self.assertEqual(server.recipients,
+                         [h.email for h in self.hackers])
+
+    def test_reconnects(self):
+        with SMTPStandin(drop_after=2) as server:
+            self.use_standin(server)
+            statuses = self.send()
+
+        self.assertEqual(statuses, ["sent"] * 5)
+        self.assertEqual(server.sessions, 3)
+        self.assertEqual(len(server.messages), 5)
+
+    def test_per_message_errors(self):
+        with SMTPStandin(refuse={"foobar1@email.com"}) as server:
+            self.use_standin(server)
+            statuses = self.send()
+
+        self.assertEqual(statuses[0], "sent")
+        self.assertTrue(statuses[1].startswith("error: SMTPRecipientsRefused"))
+        self.assertEqual(statuses[2:5], ["sent"] * 3)
+        self.assertEqual(server.sessions, 1)
+
+    def test_server_down(self):
+        with SMTPStandin() as server:
+            self.use_standin(server)
+        """The stand-in has stopped, so nothing listens on its port"""
+
+        statuses = self.send()
+
+        self.assertEqual(len(statuses), 5)
+        self.assertTrue(all(s.startswith("error: ") for s in statuses))
+
+    def test_rate_limited(self):
+        self.app.extensions.pop("mail_rate_limit", None)
+        self.app.config.update(MAIL_RATE_LIMIT=10, MAIL_RATE_BURST=2)
+
+        with SMTPStandin() as server, \
+                mock.patch("src.common.rate_limit.time.sleep") as sleep:
+            self.use_standin(server)
+            statuses = self.send()
+
+        self.app.extensions.pop("mail_rate_limit", None)
+
+        self.assertEqual(statuses, ["sent"] * 5)
+        self.assertEqual(sleep.call_count, 3)
+        for call, expected in zip(sleep.call_args_list, (0.1, 0.2, 0.3)):
+            self.assertAlmostEqual(call.args[0], expected, places=1)
+
+    def test_suppressed_while_testing(self):
+        self.assertEqual(self.send(), ["suppressed"] * 5)
+
+
+class TestDrainEmailOutbox(TestSendMessages):
+    """Tests for draining the email outbox"""
+
+    def test_drain(self):
+        enqueue_emails("hacker_confirmation_success", self.hackers)
+        self.app.config.update(MAIL_BATCH_SIZE=2)
+
+        with SMTPStandin() as server:
+            self.use_standin(server)
+            drain_email_outbox()
+
+        self.assertEqual(EmailOutbox.objects(status="sent").count(), 5)
+        self.assertEqual(server.sessions, 3)
+        msg = message_from_bytes(server.messages[0]["content"])
+        self.assertEqual(
+            msg["Message-ID"].strip(),
+            f"<hacker_confirmation_success.{self.hackers[0].id}"
+            "@knighthacks.org>")
+
+    def test_drain_retries(self):
+        enqueue_emails("hacker_confirmation_success", self.hackers)
+        Hacker.objects(email="foobar4@email.com").delete()
+
+        with SMTPStandin(refuse={"foobar1@email.com"}) as server, \
+                mock.patch.object(drain_email_outbox, "apply_async") as again:
+            self.use_standin(server)
+            drain_email_outbox()
+
+        self.assertEqual(EmailOutbox.objects(status="sent").count(), 3)
+        refused = EmailOutbox.objects.get(hacker=self.hackers[1].id)
+        self.assertEqual(refused.status, "pending")
+        self.assertEqual(refused.attempts, 1)
+        self.assertTrue(refused.last_error.startswith(
+            "error: SMTPRecipientsRefused"))
+        self.assertEqual(
+            EmailOutbox.objects.get(hacker=self.hackers[4].id).status,
+            "failed")
+
+        countdown = again.call_args.kwargs["countdown"]
+        self.assertAlmostEqual(
+            countdown, self.app.config["MAIL_OUTBOX_BACKOFF_SECONDS"],
+            delta=1)
+
+    def test_drain_extends_lease_while_rate_limited(self):
+        """Five emails at one per 400s outlast a 600s lease"""
+        enqueue_emails("hacker_confirmation_success", self.hackers)
+        self.app.extensions.pop("mail_rate_limit", None)
+        self.app.config.update(MAIL_RATE_LIMIT=0.0025, MAIL_RATE_BURST=1)
+        leases = []
+
+        def sleep(seconds):
+            leases.append(EmailOutbox.objects(status="sending")
+                          .distinct("lease_until"))
+
+        with SMTPStandin() as server, \
+                mock.patch("src.tasks.mail_tasks.time.sleep", sleep):
+            self.use_standin(server)
+            start = datetime.utcnow()
+            drain_email_outbox()
+
+        self.app.extensions.pop("mail_rate_limit", None)
+
+        self.assertEqual(EmailOutbox.objects(status="sent").count(), 5)
+        self.assertEqual(len(leases), 4)
+        for i, (lease,) in enumerate(leases, 1):
+            """Before the i-th wait, the lease covers it and a lease more"""
+            self.assertGreaterEqual(
+                (lease - start).total_seconds(),
+                400 * i + self.app.config["MAIL_OUTBOX_LEASE_SECONDS"] - 1)
+
+    def test_drain_records_sent_before_error(self):
+        enqueue_emails("hacker_confirmation_success", self.hackers)
+        self.app.extensions.pop("mail_rate_limit", None)
+        self.app.config.update(MAIL_RATE_LIMIT=10, MAIL_RATE_BURST=10)
+        reserve = mock.Mock(side_effect=[0.0, 0.0, RuntimeError("contention")])
+
+        with SMTPStandin() as server, mock.patch(
+                "src.common.rate_limit.TokenBucket.reserve", reserve):
+            self.use_standin(server)
+            with self.assertRaises(RuntimeError):
+                drain_email_outbox()
+
+        self.app.extensions.pop("mail_rate_limit", None)
+
+        self.assertEqual(len(server.messages), 2)
+        self.assertEqual(EmailOutbox.objects(status="sent").count(), 2)
+        self.assertEqual(EmailOutbox.objects(status="sending").count(), 3)
+
+    def test_drain_suppressed_while_testing(self):
+        enqueue_emails("hacker_confirmation_success", self.hackers)
+
+        drain_email_outbox()
+
+        self.assertEqual(EmailOutbox.objects(status="suppressed").count(), 5)